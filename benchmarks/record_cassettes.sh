@@ -0,0 +1,33 @@
+#!/usr/bin/env bash
+# Rebuild the ingestion benchmark cassettes from pinned source releases.
+#
+# Each cassette replays the GitHub contents API for one release of a repository:
+#   small   requests 2.32.3   (psf/requests)
+#   medium  sciris 3.2.0      (sciris/sciris)
+#   large   networkx 3.3      (networkx/networkx), without its test directories
+#
+# The source distributions on PyPI are used as pinned checkouts, so the cassettes do not
+# change when the repositories do. Run from the repository root.
+set -euo pipefail
+
+out="benchmarks/cassettes"
+work="$(mktemp -d)"
+trap 'rm -rf "$work"' EXIT
+
+record() {
+    local name="$1" spec="$2" repo_url="$3"
+    pip download --quiet --no-deps --no-binary :all: "$spec" -d "$work"
+    tar -xzf "$work/${spec/==/-}.tar.gz" -C "$work"
+    local checkout="$work/${spec/==/-}"
+    # Drop packaging metadata and, for the large cassette, the test suites
+    rm -rf "$checkout"/*.egg-info
+    if [ "$name" = large ]; then
+        find "$checkout" -type d -name tests -prune -exec rm -rf {} +
+    fi
+    mcp_pack bench_db --record "$checkout" --repo-url "$repo_url" --cassette-out "$out/$name.json.gz"
+}
+
+mkdir -p "$out"
+record small requests==2.32.3 https://github.com/psf/requests
+record medium sciris==3.2.0 https://github.com/sciris/sciris
+record large networkx==3.3 https://github.com/networkx/networkx
@@ -1,20 +1,23 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from pathlib import Path
 import asyncio
+import json
 import dotenv
 import logging
-from langchain_core.messages import HumanMessage, SystemMessage
+import anyio
+import httpx
+from langchain_core.messages import AIMessageChunk, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.tools import ToolException
 from langchain_mcp_adapters.client import MultiServerMCPClient
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langgraph.prebuilt import ToolNode, tools_condition
 from langchain_openai import ChatOpenAI
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 import config
 
-app = FastAPI()
-
 model = ChatOpenAI(model="gpt-4o")
 
 dotenv.load_dotenv()
@@ -24,81 +27,214 @@ logger = logging.getLogger(__name__)
 logging.basicConfig(filename='app.log', encoding='utf-8', level=logging.INFO)
 logger.info("============Starting FastAPI app...===============")
 
-# Mount static files for serving Mermaid.js
-# app.mount("/static", StaticFiles(directory="static"), name="static")
+# Errors meaning the connection to an MCP server was lost, after which the client is rebuilt
+CONNECTION_ERRORS = (ConnectionError, httpx.HTTPError, anyio.ClosedResourceError,
+                     anyio.BrokenResourceError, anyio.EndOfStream)
+
+# Seconds a request waits for the MCP servers to be connected
+CONNECT_TIMEOUT = 30
+
 
 class QueryRequest(BaseModel):
     query: str
     selected_lib: str
 
+
+def handle_tool_error(error: ToolException) -> str:
+    """Return errors reported by a tool to the model. Other errors, such as lost connections, propagate."""
+    return f"Error: {error}"
+
+
+def build_graph(tools: list):
+    """Build and compile the tutoring graph for a list of MCP tools."""
+    model_with_tools = model.bind_tools(tools)
+
+    def call_model(state: MessagesState):
+        response = model_with_tools.invoke(state["messages"])
+        return {"messages": response}
+
+    def generate_quarto(state: MessagesState):
+        """
+        Save the final response content as a Quarto file and provide a download button.
+        """
+        # Use the provided Quarto template
+        tutorial_content = state["messages"][-1].content
+        tutorial_content = tutorial_content.replace("```python", "```{python}")
+        markdown_content = f"""---\ntitle: "Tutorial"\nauthor: "AI Tutor"\ndate: "April 30, 2025"\nformat: html\n---\n{tutorial_content}
+        """
+        markdown_content = HumanMessage(content=markdown_content, role="quarto")
+        return {"messages": markdown_content}
+
+    def route_formatting(state: MessagesState):
+        last_message = state["messages"][-1]
+        if getattr(last_message, "tool_calls", None):
+            return "tools"
+        return "generate_quarto"
+
+    builder = StateGraph(MessagesState)
+    builder.add_node(call_model)
+    builder.add_node(ToolNode(tools, handle_tool_errors=handle_tool_error))
+    builder.add_node(generate_quarto)
+    builder.add_edge(START, "call_model")
+    builder.add_conditional_edges(
+        "call_model",
+        route_formatting,
+    )
+    builder.add_edge("tools", "call_model")
+    # builder.add_edge("call_model", "generate_quarto")
+    # builder.add_edge("generate_quarto", END)
+    return builder, builder.compile()
+
+
+# workaround for the dynamic tool in conditional edge, since it cannot be drawn
+# TODO: Investigate why the dynamic tool cannot be drawn
+def custom_mermaid(builder):
+    edges = list(builder.edges)  # only static ones
+    logger.info(f" edges: {builder.branches}")
+    mermaid = ["graph TD"]
+    for source, target in edges:
+        logger.info(f" edges source: {source}, target: {target}")
+        mermaid.append(f"    {source} --> {target}")
+    # Add conditional branches manually
+    mermaid.append("    call_model -.->|if need tools| tools")
+    mermaid.append("    call_model -.->|else| generate_quarto")
+    return "\n".join(mermaid)
+
+
+class AgentRuntime:
+    """Holds the MCP client sessions, their tools and the compiled graph for the app's lifetime.
+
+    The client is entered and exited by one background task, as the SSE sessions require,
+    and is rebuilt whenever a request reports a lost connection.
+    """
+
+    def __init__(self):
+        self.graph = None
+        self.mermaid_syntax = ""
+        self._ready = asyncio.Event()
+        self._reconnect = asyncio.Event()
+        self._stopping = False
+        self._task = None
+
+    async def start(self):
+        """Start connecting to the MCP servers in the background."""
+        self._task = asyncio.create_task(self._serve())
+
+    async def stop(self):
+        """Close the MCP sessions."""
+        self._stopping = True
+        self._reconnect.set()
+        if self._task is not None:
+            await self._task
+
+    async def _serve(self):
+        """Keep one connected client, its tools and the compiled graph, reconnecting on request."""
+        delay = 1
+        while not self._stopping:
+            try:
+                async with MultiServerMCPClient(config.MCP_SERVERS) as client:
+                    tools = client.get_tools()
+                    builder, self.graph = build_graph(tools)
+                    self.mermaid_syntax = custom_mermaid(builder)
+                    logger.info(f"Connected to {len(config.MCP_SERVERS)} MCP servers with {len(tools)} tools")
+                    delay = 1
+                    self._ready.set()
+                    await self._reconnect.wait()
+                    self._reconnect.clear()
+            except Exception as e:
+                logger.error(f"Failed to connect to the MCP servers, retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    def request_reconnect(self, graph):
+        """Drop the sessions a failed graph used; requests wait until the client is rebuilt.
+
+        Other requests that ran on the same sessions fail too, but only the first one
+        reconnects, so that they do not tear down the rebuilt client.
+        """
+        if graph is self.graph and self._ready.is_set():
+            self._ready.clear()
+            self._reconnect.set()
+
+    async def get_graph(self):
+        """Return the compiled graph, waiting for the MCP servers to be connected."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=CONNECT_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="MCP servers are not reachable")
+        return self.graph
+
+
+runtime = AgentRuntime()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await runtime.start()
+    yield
+    await runtime.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Mount static files for serving Mermaid.js
+# app.mount("/static", StaticFiles(directory="static"), name="static")
+
+
+def input_messages(request: QueryRequest) -> list:
+    """Return the system and user messages of a request."""
+    system_message = {"role": "system",
+                    "content": f"""You are a professional tutor specializing in teaching how to run Python code.
+                    Your goal is to create a detailed tutorial for users based on their queries.
+                    Provide runnable Python code, including setup (use magic %pip install inside python code block) and data generation, so the user can follow step by step.
+                    you should use {request.selected_lib} python library to accomplish this task"""}
+    return [
+        system_message,
+        {"role": "user", "content": request.query}
+    ]
+
+
 @app.post("/get-response")
 async def get_response(request: QueryRequest):
-    async with MultiServerMCPClient(
-      config.MCP_SERVERS
-    ) as client:
-        tools = client.get_tools()
-
-        def call_model(state: MessagesState):
-            response = model.bind_tools(tools).invoke(state["messages"])
-            return {"messages": response}
-
-        def generate_quarto(state: MessagesState):
-            """
-            Save the final response content as a Quarto file and provide a download button.
-            """
-            # Use the provided Quarto template
-            tutorial_content = state["messages"][-1].content
-            tutorial_content = tutorial_content.replace("```python", "```{python}")
-            markdown_content = f"""---\ntitle: "Tutorial"\nauthor: "AI Tutor"\ndate: "April 30, 2025"\nformat: html\n---\n{tutorial_content}
-            """
-            markdown_content = HumanMessage(content=markdown_content, role="quarto")
-            return {"messages": markdown_content}
-
-        def route_formatting(state: MessagesState):
-            last_message = state["messages"][-1]
-            if getattr(last_message, "tool_calls", None):
-                return "tools"
-            return "generate_quarto"
-
-        builder = StateGraph(MessagesState)
-        builder.add_node(call_model)
-        builder.add_node(ToolNode(tools))
-        builder.add_node(generate_quarto)
-        builder.add_edge(START, "call_model")
-        builder.add_conditional_edges(
-            "call_model",
-            route_formatting,
-        )
-        builder.add_edge("tools", "call_model")
-        # builder.add_edge("call_model", "generate_quarto")
-        # builder.add_edge("generate_quarto", END)
-        graph = builder.compile()
-
-        # workaround for the dynamic tool in conditional edge, since it cannot be drawn
-        # TODO: Investigate why the dynamic tool cannot be drawn
-        def custom_mermaid(builder):
-            edges = list(builder.edges)  # only static ones
-            logger.info(f" edges: {builder.branches}")
-            mermaid = ["graph TD"]
-            for source, target in edges:
-                logger.info(f" edges source: {source}, target: {target}")
-                mermaid.append(f"    {source} --> {target}")
-            # Add conditional branches manually
-            mermaid.append("    call_model -.->|if need tools| tools")
-            mermaid.append("    call_model -.->|else| generate_quarto")
-            return "\n".join(mermaid)
-        
-        system_message = {"role": "system", 
-                        "content": f"""You are a professional tutor specializing in teaching how to run Python code. 
-                        Your goal is to create a detailed tutorial for users based on their queries. 
-                        Provide runnable Python code, including setup (use magic %pip install inside python code block) and data generation, so the user can follow step by step.
-                        you should use {request.selected_lib} python library to accomplish this task"""}
-        input_messages=[ 
-            system_message,
-            {"role": "user", "content": request.query}
-        ]
-        response = await graph.ainvoke({"messages": input_messages})
-        # mermaid_syntax = graph.get_graph().draw_mermaid()
-        mermaid_syntax = custom_mermaid(builder)
-        return {"response": response, "mermaid_syntax": mermaid_syntax}
+    graph = await runtime.get_graph()
+    try:
+        response = await graph.ainvoke({"messages": input_messages(request)})
+    except CONNECTION_ERRORS as e:
+        # An MCP server restarted or dropped the session; reconnect and retry once
+        logger.warning(f"Lost connection to an MCP server, reconnecting: {e}")
+        runtime.request_reconnect(graph)
+        graph = await runtime.get_graph()
+        response = await graph.ainvoke({"messages": input_messages(request)})
+    # mermaid_syntax = graph.get_graph().draw_mermaid()
+    return {"response": response, "mermaid_syntax": runtime.mermaid_syntax}
+
+
+@app.post("/stream-response")
+async def stream_response(request: QueryRequest):
+    """Stream the model tokens and tool results as newline-delimited JSON events."""
+    graph = await runtime.get_graph()
+
+    async def events():
+        yield json.dumps({"type": "start", "mermaid_syntax": runtime.mermaid_syntax}) + "\n"
+        try:
+            async for message, metadata in graph.astream({"messages": input_messages(request)},
+                                                         stream_mode="messages"):
+                if isinstance(message, ToolMessage):
+                    yield json.dumps({"type": "tool_result", "name": message.name,
+                                      "content": message.content}, default=str) + "\n"
+                elif isinstance(message, AIMessageChunk):
+                    for tool_call in message.tool_call_chunks:
+                        if tool_call.get("name"):
+                            yield json.dumps({"type": "tool_call", "name": tool_call["name"]}) + "\n"
+                    if message.content:
+                        yield json.dumps({"type": "token", "node": metadata.get("langgraph_node"),
+                                          "content": message.content}, default=str) + "\n"
+        except CONNECTION_ERRORS as e:
+            # Part of the answer may have been sent already, so the client retries instead
+            logger.warning(f"Lost connection to an MCP server, reconnecting: {e}")
+            runtime.request_reconnect(graph)
+            yield json.dumps({"type": "error", "detail": "Lost connection to an MCP server, please retry"}) + "\n"
+            return
+        yield json.dumps({"type": "end"}) + "\n"
 
+    return StreamingResponse(events(), media_type="application/x-ndjson")
@@ -0,0 +1,299 @@
+import base64
+import functools
+import gzip
+import io
+import json
+import os
+import resource
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote, urlparse
+
+from .create_db import GitModuleHelpDB, parse_repo_url
+
+# Files whose content the ingestion fetches; other files only appear in directory listings
+CONTENT_SUFFIXES = ('.py', '.ipynb', '.rst')
+README_NAMES = ('readme.md', 'readme.rst')
+
+
+def open_cassette(path: str, mode: str = 'r'):
+    """Open a cassette file for text reading or writing, gzip-compressed if its name ends with '.gz'."""
+    if path.endswith('.gz'):
+        # No timestamp in the header, so that re-recording an unchanged cassette changes no bytes
+        return io.TextIOWrapper(gzip.GzipFile(path, mode + 'b', mtime=0), encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def _content_response(name: str, path: str, data: bytes) -> Dict[str, Any]:
+    """Build a GitHub contents API response for a file."""
+    return {
+        'name': name,
+        'path': path,
+        'type': 'file',
+        'encoding': 'base64',
+        'content': base64.b64encode(data).decode('ascii'),
+    }
+
+
+def cassette_from_directory(directory: str, repo_url: str, include_notebooks: bool = False,
+                            include_rst: bool = False, exclude_tests: bool = False) -> Dict[str, Any]:
+    """Build a cassette of GitHub contents API responses from a local checkout.
+
+    Args:
+        directory: Root of the local repository checkout
+        repo_url: GitHub URL the responses are served for
+        include_notebooks: Whether replays include Jupyter notebooks
+        include_rst: Whether replays include RST files
+        exclude_tests: Whether replays exclude test files and directories
+
+    Returns:
+        The cassette
+    """
+    responses: Dict[str, Any] = {}
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        relative = os.path.relpath(root, directory)
+        prefix = '' if relative == '.' else relative.replace(os.sep, '/') + '/'
+
+        listing = [{'name': d, 'path': prefix + d, 'type': 'dir'} for d in dirs]
+        for name in sorted(files):
+            full_path = os.path.join(root, name)
+            if not os.path.isfile(full_path) or os.path.islink(full_path):
+                continue
+            listing.append({'name': name, 'path': prefix + name, 'type': 'file'})
+            if name.endswith(CONTENT_SUFFIXES) or name.lower() in README_NAMES:
+                with open(full_path, 'rb') as f:
+                    responses[prefix + name] = _content_response(name, prefix + name, f.read())
+        responses[prefix.rstrip('/')] = listing
+
+    return {
+        'repo_url': repo_url,
+        'include_notebooks': include_notebooks,
+        'include_rst': include_rst,
+        'exclude_tests': exclude_tests,
+        'responses': responses,
+    }
+
+
+def record_cassette(repo_url: str, github_token: Optional[str] = None, include_notebooks: bool = False,
+                    include_rst: bool = False, exclude_tests: bool = False) -> Dict[str, Any]:
+    """Record the GitHub contents API responses fetched while analyzing a repository.
+
+    Notebook and RST summaries are not requested from OpenAI while recording.
+    """
+    owner, repo = parse_repo_url(repo_url)
+    db = GitModuleHelpDB(qdrant_url=':memory:', github_token=github_token)
+    db.openai_api_key = None
+
+    prefix = f'{db.github_api_url}/repos/{owner}/{repo}/contents/'
+    responses: Dict[str, Any] = {}
+    make_request = db._make_github_request
+
+    def recording_request(url: str, retry_count: int = 0) -> Optional[Dict[str, Any]]:
+        response = make_request(url, retry_count)
+        if response is not None and url.startswith(prefix):
+            responses[unquote(url[len(prefix):]).strip('/')] = response
+        return response
+
+    db._make_github_request = recording_request # type: ignore
+    db.analyze_repository(repo_url, include_notebooks=include_notebooks,
+                          include_rst=include_rst, exclude_tests=exclude_tests)
+    return {
+        'repo_url': repo_url,
+        'include_notebooks': include_notebooks,
+        'include_rst': include_rst,
+        'exclude_tests': exclude_tests,
+        'responses': responses,
+    }
+
+
+class FakeGitHubAPI:
+    """A local stand-in for the GitHub contents API that replays a cassette.
+
+    Use as a context manager; `url` is the base URL to pass as github_api_url.
+    """
+
+    def __init__(self, cassette: Dict[str, Any]):
+        self.cassette = cassette
+        self.requests = 0
+        self.url = ''
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _handler(self):
+        """Return the request handler class bound to this instance."""
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                api.requests += 1
+                parts = urlparse(self.path).path.split('/', 5)
+                key = unquote(parts[5]).strip('/') if len(parts) > 5 and parts[4] == 'contents' else None
+                response = api.cassette['responses'].get(key) if key is not None else None
+                body = json.dumps(response if response is not None else {'message': 'Not Found'}).encode()
+                self.send_response(200 if response is not None else 404)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('X-RateLimit-Remaining', '5000')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any):
+                pass
+
+        return Handler
+
+    def __enter__(self) -> 'FakeGitHubAPI':
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.url = f'http://127.0.0.1:{self._server.server_address[1]}'
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info: Any):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+class StageTimer:
+    """Accumulates the wall time of instance methods wrapped as benchmark stages.
+
+    Nested and recursive calls within a stage are only timed once.
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self._depth: Dict[str, int] = defaultdict(int)
+        self._wrapped: List[tuple] = []
+
+    def wrap(self, obj: Any, attr: str, stage: str):
+        """Replace obj.attr by a version that adds its wall time to stage."""
+        method = getattr(obj, attr)
+
+        @functools.wraps(method)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            if self._depth[stage]:
+                return method(*args, **kwargs)
+            self._depth[stage] += 1
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.seconds[stage] += time.perf_counter() - start
+                self._depth[stage] -= 1
+
+        setattr(obj, attr, timed)
+        self._wrapped.append((obj, attr))
+
+    def restore(self):
+        """Remove all wrappers, restoring the class methods."""
+        for obj, attr in reversed(self._wrapped):
+            delattr(obj, attr)
+        self._wrapped.clear()
+
+
+def peak_rss_mb() -> float:
+    """Return the peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def benchmark_cassette(cassette: Dict[str, Any], repeat: int = 3, qdrant_url: str = ':memory:',
+                       **db_kwargs: Any) -> Dict[str, Any]:
+    """Benchmark GitModuleHelpDB.process_repository against a replayed cassette.
+
+    Args:
+        cassette: Cassette to replay
+        repeat: Number of timed runs
+        qdrant_url: Qdrant URL, ':memory:' for an embedded in-process Qdrant
+        **db_kwargs: Further GitModuleHelpDB arguments (e.g. encoder settings)
+
+    Returns:
+        Per-run wall time per stage, GitHub requests, points and points/s, plus the
+        median wall time and the peak RSS of the process
+    """
+    repo_url = cassette['repo_url']
+    runs = []
+    with FakeGitHubAPI(cassette) as api:
+        setup_start = time.perf_counter()
+        db = GitModuleHelpDB(qdrant_url=qdrant_url, github_api_url=api.url, **db_kwargs)
+        db.openai_api_key = None
+        setup_seconds = time.perf_counter() - setup_start
+
+        for _ in range(repeat):
+            db.file_cache.clear()
+            db.dir_cache.clear()
+            api.requests = 0
+            timer = StageTimer()
+            timer.wrap(db, '_make_github_request', 'github')
+            timer.wrap(db, 'analyze_repository', 'analyze')
+            timer.wrap(db.encoder, 'encode', 'encode')
+            for attr in ('create_collection', 'upsert', 'upload_points', 'update_collection_aliases'):
+                timer.wrap(db.client, attr, 'qdrant')
+
+            start = time.perf_counter()
+            try:
+                db.process_repository(
+                    repo_url,
+                    include_notebooks=cassette['include_notebooks'],
+                    include_rst=cassette['include_rst'],
+                    exclude_tests=cassette['exclude_tests']
+                )
+            finally:
+                timer.restore()
+            wall_seconds = time.perf_counter() - start
+
+            points = db.client.count(repo_url.split('/')[-1]).count
+            stages = dict(timer.seconds)
+            stages['parse'] = stages.pop('analyze', 0.0) - stages.get('github', 0.0)
+            runs.append({
+                'wall_seconds': wall_seconds,
+                'stages': stages,
+                'github_requests': api.requests,
+                'points': points,
+                'points_per_second': points / wall_seconds if wall_seconds else 0.0,
+            })
+
+    return {
+        'repo_url': repo_url,
+        'setup_seconds': setup_seconds,
+        'median_wall_seconds': statistics.median(run['wall_seconds'] for run in runs),
+        'github_requests': runs[-1]['github_requests'],
+        'points': runs[-1]['points'],
+        'peak_rss_mb': peak_rss_mb(),
+        'runs': runs,
+    }
+
+
+def find_regressions(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+                     max_regression: float) -> List[str]:
+    """Compare benchmark results with a baseline and describe every regression."""
+    baseline_by_repo = {result['repo_url']: result for result in baseline}
+    regressions = []
+    for result in results:
+        previous = baseline_by_repo.get(result['repo_url'])
+        if previous is None:
+            continue
+        if result['median_wall_seconds'] > previous['median_wall_seconds'] * (1 + max_regression):
+            regressions.append(f"{result['repo_url']}: wall time {result['median_wall_seconds']:.2f}s "
+                               f"vs baseline {previous['median_wall_seconds']:.2f}s")
+        if result['github_requests'] > previous['github_requests']:
+            regressions.append(f"{result['repo_url']}: {result['github_requests']} GitHub requests "
+                               f"vs baseline {previous['github_requests']}")
+    return regressions
+
+
+def print_report(result: Dict[str, Any]):
+    """Print a human readable summary of the benchmark of one cassette."""
+    print(f"\n{result['repo_url']}")
+    print(f"  setup (model and client load): {result['setup_seconds']:.2f}s")
+    for i, run in enumerate(result['runs'], start=1):
+        stages = ', '.join(f'{stage} {seconds:.2f}s' for stage, seconds in sorted(run['stages'].items()))
+        print(f"  run {i}: {run['wall_seconds']:.2f}s ({stages}), {run['github_requests']} requests, "
+              f"{run['points']} points, {run['points_per_second']:.1f} points/s")
+    print(f"  median wall time: {result['median_wall_seconds']:.2f}s, peak RSS: {result['peak_rss_mb']:.0f} MB")
@@ -0,0 +1,259 @@
+import asyncio
+import json
+import os
+import random
+import re
+import shlex
+import time
+from collections import Counter, defaultdict
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from mcp import ClientSession
+
+# Share of each kind of call in the default workload
+DEFAULT_MIX = {'search': 0.6, 'source': 0.3, 'summary': 0.1}
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Parse a workload mix such as 'search=0.6,source=0.3,summary=0.1'."""
+    mix: Dict[str, float] = {}
+    for item in text.split(','):
+        kind, _, weight = item.partition('=')
+        if kind.strip() not in DEFAULT_MIX:
+            raise ValueError(f"Unknown call kind '{kind.strip()}', expected one of {', '.join(DEFAULT_MIX)}")
+        mix[kind.strip()] = float(weight)
+    return mix
+
+
+def load_queries(path: str) -> List[str]:
+    """Read search queries from a file with one query per line, skipping blank and # lines."""
+    with open(path, encoding='utf-8') as f:
+        queries = [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+    if not queries:
+        raise ValueError(f"No queries found in {path}")
+    return queries
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Return the q-th percentile (0-100) of values by the nearest-rank method."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(-(-q * len(ordered) // 100)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _texts(result: Any) -> List[str]:
+    """Return the text items of a tool result."""
+    return [item.text for item in result.content if getattr(item, 'type', None) == 'text']
+
+
+@asynccontextmanager
+async def connect(transport: str, target: str) -> AsyncIterator[ClientSession]:
+    """Open an initialized MCP client session.
+
+    Args:
+        transport: 'stdio' to launch the server as a subprocess, or 'sse' to connect to a running server
+        target: Server command line for stdio, or the URL of the SSE endpoint
+
+    Yields:
+        The client session
+    """
+    if transport == 'sse':
+        from mcp.client.sse import sse_client
+        streams = sse_client(target)
+    else:
+        from mcp import StdioServerParameters
+        from mcp.client.stdio import stdio_client
+        command, *args = shlex.split(target)
+        streams = stdio_client(StdioServerParameters(command=command, args=args, env=dict(os.environ)))
+    async with streams as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            yield session
+
+
+class Workload:
+    """Draws tool calls from a weighted mix of searches, source code lookups and summaries."""
+
+    def __init__(self, tools: Dict[str, Dict[str, List[str]]], queries: List[str],
+                 names: Dict[str, List[str]], mix: Dict[str, float]):
+        """Initialize the Workload instance.
+
+        Args:
+            tools: Tool names per module and call kind
+            queries: Search queries to draw from
+            names: Function and class names per module, used for source code lookups
+            mix: Relative weight of each kind of call
+        """
+        self.tools = tools
+        self.queries = queries
+        self.names = names
+        self.mix = {kind: weight for kind, weight in mix.items() if weight > 0}
+
+    @classmethod
+    async def discover(cls, session: ClientSession, queries: List[str], mix: Dict[str, float],
+                       modules: Optional[List[str]] = None) -> 'Workload':
+        """Build a workload from the tools the server lists.
+
+        Names for source code lookups are fetched with each module's get_<module>_functions tool.
+        """
+        tool_names = {tool.name for tool in (await session.list_tools()).tools}
+        found = sorted(match.group(1) for match in map(re.compile(r'^get_(.+)_summary$').match, tool_names) if match)
+        if modules:
+            missing = set(modules) - set(found)
+            if missing:
+                raise ValueError(f"Server does not serve module(s): {', '.join(sorted(missing))}")
+            found = modules
+        if not found:
+            raise ValueError("Server does not list any get_<module>_summary tool")
+
+        tools: Dict[str, Dict[str, List[str]]] = {}
+        names: Dict[str, List[str]] = {}
+        for module in found:
+            tools[module] = {
+                'search': [name for name in (f'search_{module}_docstring', f'search_{module}_docs') if name in tool_names],
+                'source': [f'get_{module}_source_code'] if f'get_{module}_source_code' in tool_names else [],
+                'summary': [f'get_{module}_summary'],
+            }
+            names[module] = []
+            if f'get_{module}_functions' in tool_names:
+                texts = _texts(await session.call_tool(f'get_{module}_functions', {}))
+                if len(texts) == 1 and texts[0].startswith('['):
+                    texts = json.loads(texts[0])
+                names[module] = [name for name in texts if not name.startswith('Error:')]
+            if not names[module]:
+                tools[module]['source'] = []
+
+        if 'source' in mix and not any(tools[module]['source'] for module in found):
+            print("Warning: no names for source code lookups found, dropping them from the mix")
+        return cls(tools, queries, names, mix)
+
+    def next_call(self, rng: random.Random) -> Tuple[str, str, Dict[str, Any]]:
+        """Draw the next call as (kind, tool name, arguments)."""
+        while True:
+            kind = rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+            candidates = [module for module in self.tools if self.tools[module][kind]]
+            if candidates:
+                break
+            self.mix.pop(kind)
+            if not self.mix:
+                raise ValueError("None of the requested calls are served")
+        module = rng.choice(candidates)
+        tool = rng.choice(self.tools[module][kind])
+        if kind == 'summary':
+            return kind, tool, {}
+        if kind == 'source':
+            return kind, tool, {'name': rng.choice(self.names[module])}
+        query = rng.choice(self.queries)
+        return kind, tool, {'topic': query} if tool.endswith('_docs') else {'query': query}
+
+
+async def _run_calls(session: ClientSession, workload: Workload, rng: random.Random, deadline: float,
+                     timeout: float, records: Optional[List[Tuple[str, float, Optional[str]]]]):
+    """Issue calls one after another until the deadline, recording (kind, latency, error) of each."""
+    while time.perf_counter() < deadline:
+        kind, tool, arguments = workload.next_call(rng)
+        error = None
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(session.call_tool(tool, arguments), timeout)
+            if result.isError:
+                error = 'tool_error'
+        except asyncio.TimeoutError:
+            error = 'timeout'
+        except Exception as e:
+            error = type(e).__name__
+        if records is not None:
+            records.append((kind, time.perf_counter() - start, error))
+
+
+def summarize(records: List[Tuple[str, float, Optional[str]]], elapsed: float) -> Dict[str, Any]:
+    """Summarize call records as throughput, latency percentiles in ms and error rates."""
+    latencies = [latency * 1000 for _, latency, _ in records]
+    errors = Counter(error for _, _, error in records if error)
+    total_errors = sum(errors.values())
+    return {
+        'calls': len(records),
+        'throughput': len(records) / elapsed if elapsed else 0.0,
+        'error_rate': total_errors / len(records) if records else 0.0,
+        'errors': dict(errors),
+        'latency_ms': {
+            'mean': sum(latencies) / len(latencies) if latencies else 0.0,
+            'p50': percentile(latencies, 50),
+            'p90': percentile(latencies, 90),
+            'p99': percentile(latencies, 99),
+            'max': max(latencies, default=0.0),
+        },
+    }
+
+
+async def benchmark_server(transport: str, target: str, queries: List[str], concurrency: int = 8,
+                           duration: float = 30.0, warmup: float = 5.0, mix: Optional[Dict[str, float]] = None,
+                           modules: Optional[List[str]] = None, timeout: float = 30.0,
+                           seed: int = 0) -> Dict[str, Any]:
+    """Drive an MCP server with concurrent simulated agents and measure its performance.
+
+    Over SSE every agent opens its own connection. Over stdio the server is launched once
+    and all agents share its session, as concurrent requests of one client.
+
+    Args:
+        transport: 'stdio' or 'sse'
+        target: Server command line for stdio, or the URL of the SSE endpoint
+        queries: Search queries to draw from
+        concurrency: Number of agents issuing calls concurrently
+        duration: Seconds of measured load
+        warmup: Seconds of unmeasured load before the measurement
+        mix: Relative weight of search, source code and summary calls
+        modules: Modules to query (defaults to every module the server serves)
+        timeout: Seconds before a call counts as timed out
+        seed: Seed of the random call sequence
+
+    Returns:
+        Overall and per-kind throughput, latency percentiles and error rates
+    """
+    async with AsyncExitStack() as stack:
+        session = await stack.enter_async_context(connect(transport, target))
+        workload = await Workload.discover(session, queries, mix or DEFAULT_MIX, modules)
+        sessions = [session]
+        for _ in range(concurrency - 1):
+            sessions.append(await stack.enter_async_context(connect(transport, target))
+                            if transport == 'sse' else session)
+
+        if warmup > 0:
+            deadline = time.perf_counter() + warmup
+            await asyncio.gather(*(_run_calls(sessions[i], workload, random.Random(f'warmup-{seed}-{i}'),
+                                              deadline, timeout, None) for i in range(concurrency)))
+
+        records: List[Tuple[str, float, Optional[str]]] = []
+        start = time.perf_counter()
+        await asyncio.gather(*(_run_calls(sessions[i], workload, random.Random(f'{seed}-{i}'),
+                                          start + duration, timeout, records) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    by_kind: Dict[str, List[Tuple[str, float, Optional[str]]]] = defaultdict(list)
+    for record in records:
+        by_kind[record[0]].append(record)
+    return {
+        'transport': transport,
+        'target': target,
+        'concurrency': concurrency,
+        'duration': elapsed,
+        'modules': sorted(workload.tools),
+        'overall': summarize(records, elapsed),
+        'by_kind': {kind: summarize(kind_records, elapsed) for kind, kind_records in sorted(by_kind.items())},
+    }
+
+
+def print_report(result: Dict[str, Any]):
+    """Print a human readable summary of a server benchmark."""
+    print(f"\n{result['transport']} {result['target']}: {result['concurrency']} concurrent agents, "
+          f"{result['duration']:.1f}s, modules {', '.join(result['modules'])}")
+    print(f"  {'kind':<10}{'calls':>8}{'calls/s':>10}{'errors':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for label, summary in [('all', result['overall']), *result['by_kind'].items()]:
+        latency = summary['latency_ms']
+        print(f"  {label:<10}{summary['calls']:>8}{summary['throughput']:>10.1f}{summary['error_rate']:>9.1%}"
+              f"{latency['p50']:>10.1f}{latency['p90']:>10.1f}{latency['p99']:>10.1f}{latency['max']:>10.1f}")
+    if result['overall']['errors']:
+        print(f"  errors: {', '.join(f'{error} x{count}' for error, count in result['overall']['errors'].items())}")
@@ -0,0 +1,247 @@
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+
+class QueryEmbeddingCache:
+    """A bounded LRU cache mapping normalized query text to its embedding.
+
+    The cache is shared by the search tools of a ModuleQueryServer so that repeated
+    queries skip model inference entirely.
+    """
+
+    def __init__(self, encoder: Any, max_size: int = 1024):
+        """Initialize the QueryEmbeddingCache instance.
+
+        Args:
+            encoder: SentenceTransformer (or compatible) model used on cache misses
+            max_size: Maximum number of embeddings to keep (0 disables caching)
+        """
+        self.encoder = encoder
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[str, List[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize query text so that trivially different queries share an entry."""
+        return ' '.join(text.split())
+
+    def encode(self, text: str) -> List[float]:
+        """Return the embedding of a query, encoding it only on a cache miss."""
+        key = self.normalize(text)
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            self.misses += 1
+
+        embedding: List[float] = self.encoder.encode(key).tolist()
+        self._store(key, embedding)
+        return embedding
+
+    def encode_many(self, texts: List[str]) -> List[List[float]]:
+        """Return the embeddings of several queries, encoding all misses in one forward pass."""
+        keys = [self.normalize(text) for text in texts]
+        embeddings: Dict[str, List[float]] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self.hits += 1
+                    self._cache.move_to_end(key)
+                    embeddings[key] = self._cache[key]
+                elif key not in embeddings:
+                    self.misses += 1
+                    embeddings[key] = []
+
+        missing = [key for key, embedding in embeddings.items() if not embedding]
+        if missing:
+            for key, embedding in zip(missing, self.encoder.encode(missing)):
+                embeddings[key] = embedding.tolist()
+                self._store(key, embeddings[key])
+        return [embeddings[key] for key in keys]
+
+    def _store(self, key: str, embedding: List[float]):
+        """Insert an embedding and evict the least recently used entries."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._cache[key] = embedding
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached embeddings and reset the statistics."""
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit-rate statistics for the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._cache),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class Uncached:
+    """Wraps a tool response that is returned but not cached, such as a degraded result."""
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+class ToolResultCache:
+    """A TTL and memory bounded cache of tool responses with request coalescing.
+
+    Entries are keyed by tool name, arguments and collection version, so a rebuilt
+    collection never serves stale results. Identical requests that arrive while a
+    computation is in flight await the same result instead of running again; if the
+    caller running it is cancelled, one of the waiters runs it again for the others.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 300.0):
+        """Initialize the ToolResultCache instance.
+
+        Args:
+            max_bytes: Approximate memory budget for cached responses (0 disables caching)
+            ttl: Time in seconds after which an entry expires (0 means no expiry)
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._bytes = 0
+        self._entries: OrderedDict[Hashable, Tuple[float, int, Any]] = OrderedDict()
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(tool: str, args: Dict[str, Any], collection: str, version: str | None) -> Tuple:
+        """Build a cache key from a tool call and the collection version it ran against."""
+        return (collection, version, tool, json.dumps(args, sort_keys=True, default=str))
+
+    @staticmethod
+    def _sizeof(value: Any) -> int:
+        """Estimate the memory footprint of a response by its serialized size."""
+        return len(json.dumps(value, default=str))
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached response for key, computing it in a worker thread on a miss.
+
+        Args:
+            key: Cache key, usually built with make_key
+            compute: Blocking callable producing the response, or the response wrapped in
+                Uncached to return it without caching it
+
+        Returns:
+            The cached or freshly computed response
+        """
+        # A request joining an in-flight computation is counted as coalesced, not as a miss
+        found, value = self._lookup(key, count_miss=key not in self._in_flight)
+        if found:
+            return value
+
+        joined = False
+        while (in_flight := self._in_flight.get(key)) is not None:
+            if not joined:
+                self.coalesced += 1
+                joined = True
+            try:
+                return await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                # Only the caller running the computation was cancelled: run it again for the waiters
+                if not in_flight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value = await asyncio.to_thread(compute)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            if isinstance(value, Uncached):
+                value = value.value
+            else:
+                self._store(key, value)
+            future.set_result(value)
+        finally:
+            del self._in_flight[key]
+        return value
+
+    def _lookup(self, key: Hashable, count_miss: bool = True) -> Tuple[bool, Any]:
+        """Return (True, value) for a live entry, or (False, None) on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, size, value = entry
+                if not self.ttl or expires_at > time.monotonic():
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return True, value
+                del self._entries[key]
+                self._bytes -= size
+            if count_miss:
+                self.misses += 1
+            return False, None
+
+    def _store(self, key: Hashable, value: Any):
+        """Insert a response and evict the least recently used entries over budget."""
+        if self.max_bytes <= 0:
+            return
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def invalidate(self, collection: str | None = None):
+        """Drop cached responses for one collection, or all of them."""
+        with self._lock:
+            for key in list(self._entries):
+                if collection is None or key[0] == collection:
+                    self._bytes -= self._entries.pop(key)[1]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit-rate and memory statistics for the cache.
+
+        Coalesced requests were not computed again, so the hit rate counts them as hits.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            }
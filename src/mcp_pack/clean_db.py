@@ -1,13 +1,19 @@
 import argparse
 import os
+import time
+from typing import List, Optional
 from dotenv import load_dotenv
 import qdrant_client
 from qdrant_client import models
 
+from .db_utils import parse_timestamp, read_metadata
+from .versions import alias_targets, list_versions, module_names, prune_versions
+
 class QdrantCleaner:
     """A class for cleaning up Qdrant database collections.
     
-    This class provides functionality to delete collections from a Qdrant database.
+    This class provides functionality to delete collections from a Qdrant database, to prune
+    them by policy and to trigger the optimizers that compact them.
     """
     
     def __init__(self, qdrant_url: str = 'http://localhost:6333'):
@@ -19,9 +25,12 @@ class QdrantCleaner:
         self.qdrant_url = qdrant_url
         self.client = qdrant_client.QdrantClient(qdrant_url)
     
-    def delete_all_collections(self) -> list:
+    def delete_all_collections(self, dry_run: bool = False) -> list:
         """Delete all collections from the Qdrant database.
         
+        Args:
+            dry_run: Only return the collections that would be deleted
+            
         Returns:
             List of deleted collection names
         """
@@ -30,50 +39,163 @@ class QdrantCleaner:
         
         for collection in collections.collections:
             collection_name = collection.name
-            self.client.delete_collection(collection_name)
+            if not dry_run:
+                self.client.delete_collection(collection_name)
             deleted_collections.append(collection_name)
         
         return deleted_collections
+
+    def collections_of(self, collection_name: str) -> List[str]:
+        """Return the collections that deleting a collection or module alias removes.
+        
+        Args:
+            collection_name: Name of the collection or alias
+            
+        Returns:
+            The collection itself, or every version of an alias; empty if neither exists
+        """
+        live = alias_targets(self.client).get(collection_name)
+        if live is not None:
+            return sorted({live, *list_versions(self.client, collection_name)})
+        return [collection_name] if self.client.collection_exists(collection_name) else []
     
     def delete_collection(self, collection_name: str) -> bool:
         """Delete a specific collection from the Qdrant database.
         
+        A module alias is deleted together with every collection version of the module.
+        
         Args:
-            collection_name: Name of the collection to delete
+            collection_name: Name of the collection or alias to delete
             
         Returns:
             True if collection was deleted, False otherwise
         """
         try:
+            if alias_targets(self.client).get(collection_name) is not None:
+                for version in self.collections_of(collection_name):
+                    self.client.delete_collection(version)
+                return True
             self.client.delete_collection(collection_name)
             return True
         except Exception as e:
             print(f"Error deleting collection {collection_name}: {str(e)}")
             return False
 
+    def prune_versions(self, keep: int, dry_run: bool = False) -> List[str]:
+        """Keep only the most recent versions of every module alias.
+        
+        Args:
+            keep: Number of most recent versions to keep per alias, the live one included
+            dry_run: Only return the collections that would be deleted
+            
+        Returns:
+            List of deleted collection names
+        """
+        deleted = []
+        for alias in alias_targets(self.client):
+            deleted.extend(prune_versions(self.client, alias, keep=keep, dry_run=dry_run))
+        return deleted
+
+    def delete_unused(self, days: float, dry_run: bool = False) -> List[str]:
+        """Delete modules that no server has queried for a number of days.
+        
+        Servers record the last query time in the metadata point; a module that was never
+        queried counts from its build date. Collections without either date are kept.
+        
+        Args:
+            days: Number of days without queries after which a module is deleted
+            dry_run: Only return the modules that would be deleted
+            
+        Returns:
+            List of deleted module names (aliases are deleted with all their versions)
+        """
+        cutoff = time.time() - days * 86400
+        deleted = []
+        for name in module_names(self.client):
+            metadata = read_metadata(self.client, name, with_payload=["created_at", "last_queried_at"]) or {}
+            last_used = parse_timestamp(metadata.get('last_queried_at') or metadata.get('created_at'))
+            if last_used is None or last_used >= cutoff:
+                continue
+            if dry_run or self.delete_collection(name):
+                deleted.append(name)
+        return deleted
+
+    def optimize_collections(self) -> List[str]:
+        """Trigger the optimizers of every collection, merging small segments and vacuuming deleted points.
+        
+        Returns:
+            List of collection names whose optimizers were triggered
+        """
+        triggered = []
+        for collection in self.client.get_collections().collections:
+            # An empty optimizer configuration update makes Qdrant re-run its optimizers
+            self.client.update_collection(collection.name, optimizers_config=models.OptimizersConfigDiff())
+            triggered.append(collection.name)
+        return triggered
+
+
+def apply_policies(cleaner: QdrantCleaner, keep_last: Optional[int] = None, unused_days: Optional[float] = None,
+                   optimize: bool = False, dry_run: bool = False):
+    """Prune collections by policy and trigger optimization, printing what is done."""
+    action = "Would delete" if dry_run else "Deleted"
+    if unused_days is not None:
+        for name in cleaner.delete_unused(unused_days, dry_run=dry_run):
+            print(f"{action} '{name}' (not queried for {unused_days:g} days)")
+    if keep_last is not None:
+        for name in cleaner.prune_versions(keep_last, dry_run=dry_run):
+            print(f"{action} old version '{name}'")
+    if optimize and not dry_run:
+        for name in cleaner.optimize_collections():
+            print(f"Triggered optimization of '{name}'")
+
+def clean(cleaner: QdrantCleaner, collection: Optional[str] = None, keep_last: Optional[int] = None,
+          unused_days: Optional[float] = None, optimize: bool = False, dry_run: bool = False):
+    """Run one clean_db invocation, printing what is (or with dry_run, would be) deleted.
+
+    The pruning policies take precedence; without any, the collection is deleted, or every
+    collection if none is given.
+    """
+    if keep_last is not None or unused_days is not None or optimize:
+        apply_policies(cleaner, keep_last=keep_last, unused_days=unused_days,
+                       optimize=optimize, dry_run=dry_run)
+    elif collection:
+        if dry_run:
+            targets = cleaner.collections_of(collection)
+            if targets:
+                print(f"Would delete collection: {collection}")
+                for name in targets:
+                    print(f"- {name}")
+            else:
+                print(f"Collection not found: {collection}")
+        elif cleaner.delete_collection(collection):
+            print(f"Successfully deleted collection: {collection}")
+        else:
+            print(f"Failed to delete collection: {collection}")
+    else:
+        deleted = cleaner.delete_all_collections(dry_run=dry_run)
+        if deleted:
+            print("Would delete the following collections:" if dry_run
+                  else "Successfully deleted the following collections:")
+            for name in deleted:
+                print(f"- {name}")
+        else:
+            print("No collections were deleted (database may be empty)")
+
 def main():
     load_dotenv()
     
     parser = argparse.ArgumentParser(description='Clean Qdrant database collections')
     parser.add_argument('--qdrant-url', help='Qdrant server URL', default='http://localhost:6333')
-    parser.add_argument('--collection', help='Specific collection to delete (optional, if not provided, all collections will be deleted)')
+    parser.add_argument('--collection', help='Specific collection or module alias to delete, with all its versions (optional, if not provided, all collections will be deleted)')
+    parser.add_argument('--keep-last', type=int, help='Keep only the N most recent versions of every module')
+    parser.add_argument('--unused-days', type=float, help='Delete modules not queried for this many days')
+    parser.add_argument('--optimize', action='store_true', help='Trigger the optimizers of every collection to merge segments and vacuum deleted points')
+    parser.add_argument('--dry-run', action='store_true', help='Print what would be deleted, without deleting')
     args = parser.parse_args()
     
     cleaner = QdrantCleaner(qdrant_url=args.qdrant_url)
-    
-    if args.collection:
-        if cleaner.delete_collection(args.collection):
-            print(f"Successfully deleted collection: {args.collection}")
-        else:
-            print(f"Failed to delete collection: {args.collection}")
-    else:
-        deleted = cleaner.delete_all_collections()
-        if deleted:
-            print("Successfully deleted the following collections:")
-            for collection in deleted:
-                print(f"- {collection}")
-        else:
-            print("No collections were deleted (database may be empty)")
+    clean(cleaner, collection=args.collection, keep_last=args.keep_last, unused_days=args.unused_days,
+          optimize=args.optimize, dry_run=args.dry_run)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -2,14 +2,15 @@ import argparse
 import sys
 import os
 from dotenv import load_dotenv
-from .create_db import GitModuleHelpDB
-from .clean_db import QdrantCleaner
-from .list_db import QdrantLister
-from .server import ModuleQueryServer
 from .version import __version__
 
+# Subcommand modules pull in heavy dependencies (torch, nbconvert, openai, qdrant_client),
+# so they are imported inside the command that needs them to keep CLI startup fast.
+
 def create_db_command(args):
     """Execute the create_db command."""
+    from .create_db import GitModuleHelpDB
+
     # Get GitHub token from environment or args
     env_github_token = os.environ.get('GITHUB_TOKEN')
     github_token = args.github_token or env_github_token
@@ -24,7 +25,14 @@ def create_db_command(args):
         db_path=args.db_path,
         qdrant_url=args.qdrant_url,
         github_token=github_token,
-        openai_api_key=openai_api_key
+        openai_api_key=openai_api_key,
+        encoder_model=args.encoder_model,
+        encoder_backend=args.encoder_backend,
+        encoder_threads=args.encoder_threads,
+        model_cache_dir=args.model_cache_dir,
+        dedup_threshold=None if args.no_dedup else args.dedup_threshold,
+        keep_versions=args.keep_versions,
+        pca_dims=args.pca_dims
     )
     
     # Fix repository URL format if it starts with @
@@ -32,56 +40,245 @@ def create_db_command(args):
     if repo_url.startswith('@'):
         repo_url = repo_url[1:]
     
-    db.process_repository(
-        repo_url,
-        module_name=args.module_name,
-        output_dir=args.output_dir,
-        verbose=args.verbose,
-        include_notebooks=args.include_notebooks,
-        include_rst=args.include_rst,
-        exclude_tests=args.exclude_tests
-    )
+    def process():
+        return db.process_repository(
+            repo_url,
+            module_name=args.module_name,
+            output_dir=args.output_dir,
+            verbose=args.verbose,
+            include_notebooks=args.include_notebooks,
+            include_rst=args.include_rst,
+            exclude_tests=args.exclude_tests
+        )
+
+    if args.profile:
+        from .profiling import profile_run
+
+        profile_run(args.profile, f"create_db_{repo_url.rstrip('/').split('/')[-1]}", process)
+    else:
+        process()
 
 def clean_db_command(args):
     """Execute the clean_db command."""
+    from .clean_db import QdrantCleaner, clean
+
     cleaner = QdrantCleaner(qdrant_url=args.qdrant_url)
-    
-    if args.collection:
-        if cleaner.delete_collection(args.collection):
-            print(f"Successfully deleted collection: {args.collection}")
-        else:
-            print(f"Failed to delete collection: {args.collection}")
-    else:
-        deleted = cleaner.delete_all_collections()
-        if deleted:
-            print("Successfully deleted the following collections:")
-            for collection in deleted:
-                print(f"- {collection}")
-        else:
-            print("No collections were deleted (database may be empty)")
+    clean(cleaner, collection=args.collection, keep_last=args.keep_last, unused_days=args.unused_days,
+          optimize=args.optimize, dry_run=args.dry_run)
 
 def list_db_command(args):
     """Execute the list_db command."""
-    lister = QdrantLister(qdrant_url=args.qdrant_url)
-    collections = lister.list_collections()
+    from .list_db import QdrantLister, print_collections
 
-    if collections:
-        print("Collections in Qdrant:")
-        for collection in collections:
-            print(f"- {collection}")
-    else:
-        print("No collections found in Qdrant.")
+    print_collections(QdrantLister(qdrant_url=args.qdrant_url), stats=args.stats)
 
-def create_server_command(args):
-    """Execute the create_server command."""
-    server = ModuleQueryServer(
-        module_name=args.module_name,
+def add_encoder_command(args):
+    """Execute the add_encoder command."""
+    from .create_db import GitModuleHelpDB
+
+    db = GitModuleHelpDB(
         qdrant_url=args.qdrant_url,
         encoder_model=args.encoder_model,
-        collection_name=args.collection_name
+        encoder_backend=args.encoder_backend,
+        encoder_threads=args.encoder_threads,
+        model_cache_dir=args.model_cache_dir,
+        keep_versions=args.keep_versions,
+        pca_dims=args.pca_dims
     )
-    server.register_tools()
-    server.run(transport=args.transport, port=args.port)
+    try:
+        db.add_encoder(args.collection)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+def create_server_command(args):
+    """Execute the create_server command."""
+    from .server import create_module_servers
+
+    if args.all_collections:
+        from .list_db import QdrantLister
+
+        # Aliases and unversioned collections; versions are reached through their alias
+        collection_names = QdrantLister(qdrant_url=args.qdrant_url).list_modules()
+        modules = [(name, name) for name in collection_names]
+    elif args.module_name:
+        collection_names = args.collection_name or [None] * len(args.module_name)
+        if len(collection_names) != len(args.module_name):
+            print("Error: --collection-name must be given once per --module-name.")
+            sys.exit(1)
+        modules = list(zip(args.module_name, collection_names))
+    else:
+        print("Error: either --module-name or --all-collections is required.")
+        sys.exit(1)
+
+    if not modules:
+        print("Error: no collections found in Qdrant.")
+        sys.exit(1)
+
+    if args.workers > 1 and args.transport != 'sse':
+        print("Error: --workers requires the sse transport.")
+        sys.exit(1)
+
+    encoder_threads = args.encoder_threads
+    if args.workers > 1 and encoder_threads is None:
+        # Split the cores between the workers instead of oversubscribing them
+        encoder_threads = max(1, (os.cpu_count() or 1) // args.workers)
+
+    profiler = None
+    if args.profile:
+        from .profiling import ToolProfiler
+
+        profiler = ToolProfiler(args.profile, sample_rate=args.profile_sample_rate, top_n=args.profile_top)
+
+    reranker = None
+    if args.rerank_model:
+        from .rerank import Reranker
+
+        reranker = Reranker(args.rerank_model, candidates=args.rerank_candidates, budget_ms=args.rerank_budget_ms,
+                            cache_folder=args.model_cache_dir, local_files_only=args.offline)
+
+    warmup_queries = None
+    if args.warmup_queries:
+        from .bench_server import load_queries
+
+        warmup_queries = load_queries(args.warmup_queries)
+
+    def build_servers():
+        servers = create_module_servers(
+            modules,
+            profiler=profiler,
+            reranker=reranker,
+            qdrant_url=args.qdrant_url,
+            encoder_model=args.encoder_model,
+            encoder_backend=args.encoder_backend,
+            encoder_threads=encoder_threads,
+            model_cache_dir=args.model_cache_dir,
+            query_cache_size=args.query_cache_size,
+            result_cache_bytes=args.result_cache_mb * 1024 * 1024,
+            result_cache_ttl=args.result_cache_ttl,
+            max_response_chars=args.max_response_chars,
+            local_files_only=args.offline,
+            warmup_queries=warmup_queries
+        )
+        for server in servers:
+            # Inference in the prefork parent would start torch and OpenMP thread pools, which
+            # forked workers inherit broken; the workers choose the encoder in their warm-up
+            server.register_tools(select_encoder=args.workers <= 1)
+        return servers
+
+    if args.workers > 1:
+        from .workers import PreforkServer
+
+        # ONNX Runtime starts its thread pool when the model loads, and thread pools do not
+        # survive a fork, so ONNX models are loaded in each worker instead of in the parent
+        PreforkServer(build_servers, args.workers, port=args.port,
+                      preload=args.encoder_backend != 'onnx').run()
+        return
+
+    build_servers()[0].run(transport=args.transport, port=args.port)
+
+def bench_db_command(args):
+    """Execute the bench_db command."""
+    import json
+    from .bench_db import (benchmark_cassette, cassette_from_directory, find_regressions,
+                           open_cassette, print_report, record_cassette)
+
+    if args.record:
+        if not args.cassette_out:
+            print("Error: --cassette-out is required with --record.")
+            sys.exit(1)
+        if os.path.isdir(args.record):
+            if not args.repo_url:
+                print("Error: --repo-url is required when recording from a local directory.")
+                sys.exit(1)
+            cassette = cassette_from_directory(args.record, args.repo_url, include_notebooks=args.include_notebooks,
+                                               include_rst=args.include_rst, exclude_tests=args.exclude_tests)
+        else:
+            cassette = record_cassette(args.record, github_token=args.github_token or os.environ.get('GITHUB_TOKEN'),
+                                       include_notebooks=args.include_notebooks, include_rst=args.include_rst,
+                                       exclude_tests=args.exclude_tests)
+        with open_cassette(args.cassette_out, 'w') as f:
+            json.dump(cassette, f)
+        print(f"Recorded {len(cassette['responses'])} responses to {args.cassette_out}")
+        return
+
+    if not args.cassettes:
+        print("Error: at least one cassette (or --record) is required.")
+        sys.exit(1)
+
+    results = []
+    for path in args.cassettes:
+        with open_cassette(path) as f:
+            cassette = json.load(f)
+        result = benchmark_cassette(
+            cassette,
+            repeat=args.repeat,
+            qdrant_url=args.qdrant_url,
+            encoder_model=args.encoder_model,
+            encoder_backend=args.encoder_backend,
+            encoder_threads=args.encoder_threads,
+            model_cache_dir=args.model_cache_dir
+        )
+        print_report(result)
+        results.append(result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = find_regressions(results, json.load(f), args.max_regression)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for regression in regressions:
+                print(f"- {regression}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+def bench_server_command(args):
+    """Execute the bench_server command."""
+    import asyncio
+    import json
+    from .bench_server import benchmark_server, load_queries, parse_mix, print_report
+
+    if args.transport == 'stdio' and not args.server_command:
+        print("Error: --server-command is required with the stdio transport.")
+        sys.exit(1)
+    target = args.url if args.transport == 'sse' else args.server_command
+
+    try:
+        result = asyncio.run(benchmark_server(
+            args.transport,
+            target,
+            load_queries(args.queries),
+            concurrency=args.concurrency,
+            duration=args.duration,
+            warmup=args.warmup,
+            mix=parse_mix(args.mix),
+            modules=args.module_name,
+            timeout=args.timeout,
+            seed=args.seed
+        ))
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    result['label'] = args.label
+    print_report(result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+def add_encoder_arguments(parser, multiple_models: bool = False):
+    """Add the options selecting and tuning the embedding model to a subcommand parser."""
+    if multiple_models:
+        parser.add_argument('--encoder-model', nargs='+', help='SentenceTransformer model(s) to load; each collection is queried with the fastest one matching its vectors', default=['all-MiniLM-L6-v2'])
+    else:
+        parser.add_argument('--encoder-model', help='SentenceTransformer model to use', default='all-MiniLM-L6-v2')
+    parser.add_argument('--encoder-backend', help='Inference backend for the encoder', default='torch', choices=['torch', 'onnx'])
+    parser.add_argument('--encoder-threads', type=int, help='Number of CPU threads used by the encoder', default=None)
+    parser.add_argument('--model-cache-dir', help='Directory where model and tokenizer files are cached', default=None)
 
 def main():
     """Main CLI entry point."""
@@ -111,25 +308,91 @@ def main():
     create_parser.add_argument('--qdrant-url', help='Qdrant server URL', default='http://localhost:6333')
     create_parser.add_argument('--github-token', help='GitHub personal access token', default=None)
     create_parser.add_argument('--openai-api-key', help='OpenAI API key', default=None)
+    add_encoder_arguments(create_parser)
+    create_parser.add_argument('--dedup-threshold', type=float, help='Docstring and code similarity (0-1) above which functions and classes of the same name are merged as near duplicates', default=0.9)
+    create_parser.add_argument('--no-dedup', action='store_true', help='Index every definition, without merging duplicates')
+    create_parser.add_argument('--pca-dims', type=int, help='Reduce embeddings to this many dimensions with PCA before indexing, and print a recall-versus-size report', default=None)
+    create_parser.add_argument('--keep-versions', type=int, help='Number of most recent collection versions to keep for rollback (the live one included)', default=2)
+    create_parser.add_argument('--profile', metavar='DIR', help='Profile the whole run with cProfile and write the profile and a hotspot summary to DIR', default=None)
     
     # Clean DB command
     clean_parser = subparsers.add_parser('clean_db', help='Clean Qdrant database collections')
     clean_parser.add_argument('--qdrant-url', help='Qdrant server URL', default='http://localhost:6333')
-    clean_parser.add_argument('--collection', help='Specific collection to delete (optional, if not provided, all collections will be deleted)')
+    clean_parser.add_argument('--collection', help='Specific collection or module alias to delete, with all its versions (optional, if not provided, all collections will be deleted)')
+    clean_parser.add_argument('--keep-last', type=int, help='Keep only the N most recent versions of every module')
+    clean_parser.add_argument('--unused-days', type=float, help='Delete modules not queried for this many days')
+    clean_parser.add_argument('--optimize', action='store_true', help='Trigger the optimizers of every collection to merge segments and vacuum deleted points')
+    clean_parser.add_argument('--dry-run', action='store_true', help='Print what would be deleted, without deleting')
     
     # List DB command
     list_parser = subparsers.add_parser('list_db', help='List all collections in the Qdrant database')
     list_parser.add_argument('--qdrant-url', help='Qdrant server URL', default='http://localhost:6333')
+    list_parser.add_argument('--stats', action='store_true', help='Show points, indexed vectors, segments, estimated payload and vector size, build date, source commit and last query time')
+    
+    # Add Encoder command
+    add_encoder_parser = subparsers.add_parser('add_encoder', help='Add vectors of another embedding model to a collection without downtime')
+    add_encoder_parser.add_argument('collection', help='Collection (module alias) to add the vectors to')
+    add_encoder_parser.add_argument('--qdrant-url', help='Qdrant server URL', default='http://localhost:6333')
+    add_encoder_arguments(add_encoder_parser)
+    add_encoder_parser.add_argument('--pca-dims', type=int, help='Reduce the new embeddings to this many dimensions with PCA', default=None)
+    add_encoder_parser.add_argument('--keep-versions', type=int, help='Number of most recent collection versions to keep for rollback (the live one included)', default=2)
     
     # Create Server command
     server_parser = subparsers.add_parser('create_server', help='Create and run a ModuleQueryServer')
-    server_parser.add_argument('--module-name', help='Name of the module to query', required=True)
+    server_parser.add_argument('--module-name', nargs='+', help='Name of the module(s) to query')
+    server_parser.add_argument('--all-collections', action='store_true', help='Serve every collection in Qdrant, using collection names as module names')
     server_parser.add_argument('--qdrant-url', help='Qdrant server URL', default='http://localhost:6333')
-    server_parser.add_argument('--encoder-model', help='SentenceTransformer model to use', default='all-MiniLM-L6-v2')
-    server_parser.add_argument('--collection-name', help='Name of the Qdrant collection (defaults to module_name)')
+    server_parser.add_argument('--collection-name', nargs='+', help='Name of the Qdrant collection for each module (defaults to module_name)')
     server_parser.add_argument('--transport', help='Transport method for the MCP server', default='stdio', choices=['stdio', 'sse'])
     server_parser.add_argument('--port', type=int, help='Port number for the MCP server', default=8000)
+    server_parser.add_argument('--workers', type=int, help='Number of SSE worker processes sharing the port and the loaded model', default=1)
+    add_encoder_arguments(server_parser, multiple_models=True)
+    server_parser.add_argument('--query-cache-size', type=int, help='Number of query embeddings to cache (0 disables caching)', default=1024)
+    server_parser.add_argument('--result-cache-mb', type=int, help='Memory budget in MB for cached tool results (0 disables caching)', default=64)
+    server_parser.add_argument('--result-cache-ttl', type=float, help='Seconds before a cached tool result expires (0 means no expiry)', default=300.0)
+    server_parser.add_argument('--max-response-chars', type=int, help='Maximum characters of source code or docs per response page (0 disables paging)', default=20000)
+    server_parser.add_argument('--rerank-model', help="CrossEncoder model reranking docstring search candidates, e.g. 'cross-encoder/ms-marco-MiniLM-L-6-v2' (disabled by default)", default=None)
+    server_parser.add_argument('--rerank-candidates', type=int, help='Number of vector search candidates reranked per query', default=20)
+    server_parser.add_argument('--rerank-budget-ms', type=float, help='Time budget in milliseconds for reranking one query before falling back to vector order', default=100.0)
+    server_parser.add_argument('--offline', action='store_true', help='Load the encoder only from a local model directory or the model cache, without contacting the Hugging Face Hub')
+    server_parser.add_argument('--warmup-queries', help='File of queries (one per line) searched at startup to warm up and fill the query cache', default=None)
+    server_parser.add_argument('--profile', metavar='DIR', help='Profile a sample of tool calls with cProfile and write per-call profiles and a hotspot summary to DIR', default=None)
+    server_parser.add_argument('--profile-sample-rate', type=float, help='Fraction of tool calls to profile when --profile is given', default=0.1)
+    server_parser.add_argument('--profile-top', type=int, help='Number of functions listed in the hotspot summary', default=30)
     
+    # Bench DB command
+    bench_parser = subparsers.add_parser('bench_db', help='Benchmark repository ingestion against recorded GitHub API responses')
+    bench_parser.add_argument('cassettes', nargs='*', help='Cassette files of recorded GitHub API responses to replay (.json or .json.gz)')
+    bench_parser.add_argument('--record', metavar='REPO_URL_OR_DIR', help='Record a cassette from a GitHub repository, or build one from a local checkout, instead of benchmarking')
+    bench_parser.add_argument('--cassette-out', help='Path of the cassette written by --record (gzip-compressed if it ends with .gz)')
+    bench_parser.add_argument('--repo-url', help='GitHub URL served by a cassette built from a local checkout')
+    bench_parser.add_argument('--include-notebooks', action='store_true', help='Include Jupyter notebooks when recording')
+    bench_parser.add_argument('--include-rst', action='store_true', help='Include RST files when recording')
+    bench_parser.add_argument('--exclude-tests', action='store_true', help='Exclude test files and directories when recording')
+    bench_parser.add_argument('--github-token', help='GitHub personal access token used when recording', default=None)
+    bench_parser.add_argument('--repeat', type=int, help='Number of timed runs per cassette', default=3)
+    bench_parser.add_argument('--qdrant-url', help="Qdrant server URL (':memory:' for an embedded Qdrant)", default=':memory:')
+    bench_parser.add_argument('--output', help='Write the results as JSON to this file', default=None)
+    bench_parser.add_argument('--baseline', help='JSON results of an earlier run; exit with an error on regressions', default=None)
+    bench_parser.add_argument('--max-regression', type=float, help='Tolerated relative increase of the median wall time', default=0.2)
+    add_encoder_arguments(bench_parser)
+
+    # Bench Server command
+    bench_server_parser = subparsers.add_parser('bench_server', help='Measure throughput and latency of an MCP server under concurrent load')
+    bench_server_parser.add_argument('--queries', required=True, help='File of search queries, one per line')
+    bench_server_parser.add_argument('--transport', help='Transport used to reach the server', default='sse', choices=['stdio', 'sse'])
+    bench_server_parser.add_argument('--url', help='URL of the SSE endpoint of a running server', default='http://localhost:8000/sse')
+    bench_server_parser.add_argument('--server-command', help="Command line launching the server over stdio, e.g. 'mcp_pack create_server --module-name sciris'", default=None)
+    bench_server_parser.add_argument('--module-name', nargs='+', help='Module(s) to query (defaults to every module the server serves)', default=None)
+    bench_server_parser.add_argument('--concurrency', type=int, help='Number of simulated agents issuing calls concurrently', default=8)
+    bench_server_parser.add_argument('--duration', type=float, help='Seconds of measured load', default=30.0)
+    bench_server_parser.add_argument('--warmup', type=float, help='Seconds of unmeasured load before the measurement', default=5.0)
+    bench_server_parser.add_argument('--mix', help='Relative weight of search, source code and summary calls', default='search=0.6,source=0.3,summary=0.1')
+    bench_server_parser.add_argument('--timeout', type=float, help='Seconds before a call counts as timed out', default=30.0)
+    bench_server_parser.add_argument('--seed', type=int, help='Seed of the random call sequence', default=0)
+    bench_server_parser.add_argument('--label', help='Label stored with the results, e.g. the server version or backend', default=None)
+    bench_server_parser.add_argument('--output', help='Write the results as JSON to this file', default=None)
+
     args = parser.parse_args()
     
     if args.command == 'create_db':
@@ -138,8 +401,14 @@ def main():
         clean_db_command(args)
     elif args.command == 'list_db':
         list_db_command(args)
+    elif args.command == 'add_encoder':
+        add_encoder_command(args)
     elif args.command == 'create_server':
         create_server_command(args)
+    elif args.command == 'bench_db':
+        bench_db_command(args)
+    elif args.command == 'bench_server':
+        bench_server_command(args)
     else:
         parser.print_help()
         sys.exit(1)
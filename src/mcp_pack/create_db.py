@@ -2,22 +2,31 @@ import ast
 import os
 import time
 import random
+import uuid
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import json
 import qdrant_client
 from qdrant_client import models
-from sentence_transformers import SentenceTransformer
 import requests
 import base64
 from urllib.parse import urlparse
 from dotenv import load_dotenv
-import nbformat
-from nbconvert import PythonExporter
-import openai
 import argparse
 
-from .db_utils import string_to_uuid
+from .db_utils import SPECIAL_POINTS, TIMESTAMP_FORMAT, read_metadata, string_to_uuid
+from .dedup import deduplicate
+from .encoders import encoder_record, load_encoder, vector_name
+from .exports import find_package_init, is_api_path, package_exports
+from .projection import REPORT_DIMS, Projection, print_recall_report, recall_report
+from .sparse import SPARSE_VECTOR_NAME, document_sparse_vectors
+from .versions import alias_targets, new_build_id, prune_versions, switch_alias, versioned_name, wait_until_indexed
+from .xref import REFERENCE_FIELDS, build_xref_index, extract_references, import_table, module_path
+
+def embedding_text(doc: Dict[str, Any]) -> str:
+    """Return the text a documentation item's dense vectors are computed from."""
+    return f'{doc["name"]}:\n{doc["docstring_header"]}'
+
 
 def parse_repo_url(repo_url: str) -> Tuple[str, str]:
     """Parse a GitHub repository URL into owner and repo name."""
@@ -36,7 +45,12 @@ class GitModuleHelpDB:
     
     def __init__(self, db_path: str | None = None, qdrant_url: str = 'http://localhost:6333',
                  model: str | None = 'gpt-4o',
-                 github_token: str | None = None, openai_api_key: str | None = None):
+                 github_token: str | None = None, openai_api_key: str | None = None,
+                 encoder_model: str = 'all-MiniLM-L6-v2', encoder_backend: str = 'torch',
+                 encoder_threads: int | None = None, model_cache_dir: str | None = None,
+                 github_api_url: str = 'https://api.github.com',
+                 dedup_threshold: float | None = 0.9, keep_versions: int = 2,
+                 pca_dims: int | None = None):
         """Initialize the GitModuleHelpDB instance.
         
         Args:
@@ -45,12 +59,28 @@ class GitModuleHelpDB:
             github_token: GitHub personal access token for API access (optional)
             docs_folder: Optional path to a folder containing .ipynb docs
             openai_api_key: API key for OpenAI (optional, required for summarization)
+            encoder_model: SentenceTransformer model used to embed documentation
+            encoder_backend: Inference backend for the encoder ('torch' or 'onnx')
+            encoder_threads: Number of CPU threads used by the encoder (optional)
+            model_cache_dir: Directory where model and tokenizer files are cached (optional)
+            github_api_url: Base URL of the GitHub API (e.g. for GitHub Enterprise or a local stand-in)
+            dedup_threshold: Docstring and code similarity above which definitions of the same
+                name are merged as near duplicates (None disables deduplication)
+            keep_versions: Number of most recent collection versions kept per repository
+            pca_dims: Number of dimensions the embeddings are reduced to with PCA before
+                indexing (None indexes the full embeddings)
         """
         self.db_path = db_path
         self.qdrant_url = qdrant_url
-        self.encoder = SentenceTransformer("all-MiniLM-L6-v2")
+        self.encoder_model = encoder_model
+        self.encoder = load_encoder(encoder_model, backend=encoder_backend,
+                                    num_threads=encoder_threads, cache_folder=model_cache_dir)
         self.client = qdrant_client.QdrantClient(qdrant_url)
         self.github_token = github_token
+        self.github_api_url = github_api_url.rstrip('/')
+        self.dedup_threshold = dedup_threshold
+        self.keep_versions = keep_versions
+        self.pca_dims = pca_dims
         self.headers = {'Authorization': f'Bearer {github_token}'} if github_token else {}
         self.openai_api_key = openai_api_key or os.getenv("OPENAI_API_KEY")
         self.module_name: str | None = None
@@ -94,6 +124,86 @@ class GitModuleHelpDB:
         lines = source.split('\n')
         return '\n'.join(lines[start_lineno-1:end_lineno])
     
+    def _get_signature(self, node: ast.AST) -> str:
+        """Get the signature line of a function or class definition."""
+        if isinstance(node, ast.FunctionDef):
+            returns = f' -> {ast.unparse(node.returns)}' if node.returns else ''
+            return f'def {node.name}({ast.unparse(node.args)}){returns}'
+        if isinstance(node, ast.ClassDef):
+            bases = ', '.join(ast.unparse(base) for base in node.bases + node.keywords)
+            return f'class {node.name}({bases})' if bases else f'class {node.name}'
+        return ""
+    
+    def _get_qualnames(self, tree: ast.AST, prefix: str = '') -> Dict[ast.AST, str]:
+        """Map each function and class definition in a tree to its dotted qualified name."""
+        qualnames: Dict[ast.AST, str] = {}
+        for child in ast.iter_child_nodes(tree):
+            if isinstance(child, (ast.FunctionDef, ast.ClassDef)):
+                qualnames[child] = f'{prefix}{child.name}'
+                qualnames.update(self._get_qualnames(child, f'{prefix}{child.name}.'))
+            else:
+                qualnames.update(self._get_qualnames(child, prefix))
+        return qualnames
+    
+    def _build_symbol_index(self, docs: List[Dict[str, Any]],
+                            exports: Optional[Dict[str, Tuple[Optional[str], str]]] = None) -> List[Dict[str, Any]]:
+        """Build the public symbol table: the functions and classes the package exports.
+
+        Each exported name maps to the top-level definition in the file it is imported from,
+        or else to the least nested definition of that name outside tests, examples and setup
+        scripts. Without exports (no package __init__ was found), every top-level,
+        non-underscore function and class in those files is public. Aliases merged into a doc
+        by deduplication are listed with the canonical docstring.
+        """
+        definitions: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for doc in docs:
+            if doc['type'] not in ('function', 'class'):
+                continue
+            for definition in [doc, *doc.get('aliases', [])]:
+                if '.' in (definition.get('qualname') or definition['name']):
+                    continue
+                definitions.setdefault((definition['file'], definition['name']), {
+                    'name': definition['name'],
+                    'kind': doc['type'],
+                    'signature': definition.get('signature', ''),
+                    'docstring': doc['docstring'],
+                    'file': definition['file'],
+                })
+
+        by_name: Dict[str, Dict[str, Any]] = {}
+        for (file, name), entry in sorted(definitions.items(), key=lambda item: (item[0][0].count('/'), item[0])):
+            if is_api_path(file):
+                by_name.setdefault(name, entry)
+
+        if exports is None:
+            return [entry for name, entry in by_name.items() if not name.startswith('_')]
+        symbols = []
+        for exported, (file, name) in exports.items():
+            entry = definitions.get((file, name)) if file else None
+            entry = entry or by_name.get(name)
+            # Exported constants, modules and re-exports of other packages have no definition here
+            if entry is not None:
+                symbols.append({**entry, 'name': exported})
+        return symbols
+
+    def _find_exports(self, owner: str, repo: str,
+                      py_files: List[Dict[str, Any]]) -> Optional[Dict[str, Tuple[Optional[str], str]]]:
+        """Return the names the repository's top-level package exports, or None if it has no package."""
+        py_paths = {file['path'] for file in py_files}
+        init_path = find_package_init(py_paths, repo)
+        if init_path is None:
+            return None
+        package_name = os.path.basename(os.path.dirname(init_path)) or repo
+
+        def read(path: str) -> Optional[str]:
+            return self._get_github_file_content(owner, repo, path) if path in py_paths else None
+
+        try:
+            return package_exports(init_path, read, package_name)
+        except (SyntaxError, ValueError) as e:
+            print(f"Error reading the exports of {init_path}: {str(e)}")
+            return None
+    
     def _make_github_request(self, url: str, retry_count: int = 0) -> Optional[Dict[str, Any]]:
         """Make a GitHub API request with rate limit handling and exponential backoff.
         
@@ -146,6 +256,19 @@ class GitModuleHelpDB:
             time.sleep(wait_time)
             return self._make_github_request(url, retry_count + 1)
     
+    def _get_source_commit(self, owner: str, repo: str) -> Optional[str]:
+        """Return the SHA of the default branch head, or None if it cannot be fetched.
+        
+        A single request without retries: the commit is informational and must not delay a build.
+        """
+        try:
+            response = requests.get(f'{self.github_api_url}/repos/{owner}/{repo}/commits/HEAD',
+                                    headers={**self.headers, 'Accept': 'application/vnd.github.sha'},
+                                    timeout=10)
+            return response.text.strip() if response.ok else None
+        except requests.RequestException:
+            return None
+    
     def _get_github_file_content(self, owner: str, repo: str, path: str) -> str:
         """Get the content of a file from a GitHub repository."""
         # Check cache first
@@ -153,7 +276,7 @@ class GitModuleHelpDB:
         if cache_key in self.file_cache:
             return self.file_cache[cache_key]
         
-        url = f'https://api.github.com/repos/{owner}/{repo}/contents/{path}'
+        url = f'{self.github_api_url}/repos/{owner}/{repo}/contents/{path}'
         response_json = self._make_github_request(url)
         
         if not response_json:
@@ -190,7 +313,7 @@ class GitModuleHelpDB:
         if cache_key in self.dir_cache:
             return self.dir_cache[cache_key]
         
-        url: str = f'https://api.github.com/repos/{owner}/{repo}/contents/{path}'
+        url: str = f'{self.github_api_url}/repos/{owner}/{repo}/contents/{path}'
         response_json: dict[str, Any] | None = self._make_github_request(url)
         
         if not response_json:
@@ -250,17 +373,26 @@ class GitModuleHelpDB:
         """Analyze a Python file from GitHub and extract function and class information."""
         source = self._get_github_file_content(owner, repo, file_path)
         tree = ast.parse(source)
+        qualnames = self._get_qualnames(tree)
+        imports, star_imports = import_table(tree, module_path(file_path), file_path.endswith('__init__.py'))
         results = []
         
         for node in ast.walk(tree):
             if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
                 docstring, docstring_header = self._extract_docstring(node)
+                calls, bases = extract_references(node, imports)
                 result = {
                     'name': node.name,
+                    'qualname': qualnames[node],
                     'type': 'function' if isinstance(node, ast.FunctionDef) else 'class',
                     'docstring': docstring,
                     'docstring_header': docstring_header,
                     'source_code': self._get_source_code(node, source),
+                    'signature': self._get_signature(node),
+                    'calls': calls,
+                    'bases': bases,
+                    'imports': sorted(set(imports.values())),
+                    'star_imports': star_imports,
                     'file': file_path,
                     'repo': f'{owner}/{repo}'
                 }
@@ -303,6 +435,9 @@ class GitModuleHelpDB:
                 except Exception as e:
                     print(f"Error processing {file['path']}: {str(e)}")
         
+        # The package __init__ defines the public API listed by the symbol table
+        exports = self._find_exports(owner, repo, files['py'])
+
         # Process notebooks
         if files['ipynb']:
             notebook_docs: list = self._process_notebooks(repo_url, files['ipynb'])
@@ -319,7 +454,7 @@ class GitModuleHelpDB:
         else:
             readme_docs = []
 
-        return {'results': all_results, 'readme_docs': readme_docs}
+        return {'results': all_results, 'readme_docs': readme_docs, 'exports': exports}
     
     def _process_readme(self, repo_url: str, readme_files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Process README files in the repository."""
@@ -355,6 +490,8 @@ class GitModuleHelpDB:
             f"### Document ### \n{py_code[:4000]}"
         )
         try:
+            import openai
+
             client = openai.Client()
             response = client.chat.completions.create(
                 model= self.model,
@@ -372,6 +509,9 @@ class GitModuleHelpDB:
     
     def _process_notebooks(self, repo_url: str, notebooks: List[Dict[str, Any]]) -> list:
         """Process .ipynb files in the repository, convert to .py, summarize, and return docs."""
+        # Imported lazily since only notebook ingestion needs them
+        import nbformat
+        from nbconvert import PythonExporter
         
         # Parse the repository URL
         parsed_url = urlparse(repo_url)
@@ -430,68 +570,253 @@ class GitModuleHelpDB:
                     print(f"Error processing rst file {rst['name']}: {e}")
         return docs
     
-    def create_database(self, name: str, results: dict[str, Any]):
+    def _fit_projection(self, docs: List[Dict[str, Any]], vectors: Any) -> Projection | None:
+        """Fit the PCA projection of the document embeddings and print its recall-versus-size report.
+        
+        The report searches the names of a sample of documented objects, which are shorter and
+        less specific than the indexed texts, as stand-ins for agent queries.
+        
+        Returns:
+            The projection, or None if there are too few documents to fit it
+        """
+        if self.pca_dims >= len(vectors[0]):
+            print(f"Skipping PCA: the embeddings already have {len(vectors[0])} dimensions")
+            return None
+        if len(docs) <= self.pca_dims:
+            print(f"Skipping PCA: {len(docs)} documents are too few to fit {self.pca_dims} dimensions")
+            return None
+        sample = random.Random(0).sample(docs, min(len(docs), 200))
+        queries = self.encoder.encode([doc['name'] for doc in sample])
+        print_recall_report(recall_report(vectors, queries, REPORT_DIMS + (self.pca_dims,)), chosen=self.pca_dims)
+        projection = Projection.fit(vectors, self.pca_dims)
+        print(f"Indexing {projection.dims}-dimensional PCA vectors "
+              f"({projection.explained_variance:.1%} of the variance)")
+        return projection
+    
+    def create_database(self, name: str, results: dict[str, Any], build_id: str | None = None):
         """Create a new database collection and upload documentation."""
 
+        docs = results['results']
+        readme_docs = results['readme_docs']
+
+        # Skip docs whose docstring_header is empty
+        indexed_docs = [(idx, doc) for idx, doc in enumerate(docs) if doc["docstring_header"]]
+        dense_vectors = self.encoder.encode([embedding_text(doc) for _, doc in indexed_docs]) if indexed_docs else []
+
+        # Optionally index compact vectors; servers project queries with the stored projection
+        projection = None
+        if self.pca_dims and indexed_docs:
+            projection = self._fit_projection([doc for _, doc in indexed_docs], dense_vectors)
+        if projection is not None:
+            dense_vectors = projection.apply(dense_vectors)
+        dimension = projection.dims if projection is not None else self.encoder.get_sentence_embedding_dimension()
+
+        # Dense vectors are named after their model, so that vectors of further models can be
+        # added later (see add_encoder) and servers can verify which model they need
+        dense_name = vector_name(self.encoder_model)
+
         # Create a collection
         self.client.create_collection(
             collection_name=name,
-            vectors_config=models.VectorParams(
-                size=self.encoder.get_sentence_embedding_dimension(),
-                distance=models.Distance.COSINE,
-            ),
+            vectors_config={
+                dense_name: models.VectorParams(size=dimension, distance=models.Distance.COSINE)
+            },
+            # BM25-style lexical vectors for exact identifier matches; Qdrant applies the IDF
+            sparse_vectors_config={
+                SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF)
+            },
         )
 
-        docs = results['results']
-        readme_docs = results['readme_docs']
+        # Get repository info from the first doc
+        source_docs = readme_docs or docs
+        owner, repo = source_docs[0]['repo'].split('/') if source_docs else ('', name)
 
+        # Get README content from the files dictionary
+        readme_content = None
         if readme_docs:
-            # Get repository info from the first doc
-            repo_parts = docs[0]['repo'].split('/')
-            owner, repo = repo_parts[0], repo_parts[1]
-            
-            # Get README content from the files dictionary
-            readme_content = None
             files = self._get_github_files(owner, repo)
             if files['readme']:
                 readme_content = self._get_github_file_content(owner, repo, files['readme'][0]['path'])
-            
-            # Create metadata point with README
-            metadata_point = models.PointStruct(
-                id=string_to_uuid("readme"),
-                vector=[0.0] * (self.encoder.get_sentence_embedding_dimension() or 1),
-                payload={
-                    "type": "metadata",
-                    "readme_content": readme_content if readme_content else "No README found",
-                    "repository": f"{owner}/{repo}",
-                    "repository_url": f"https://github.com/{owner}/{repo}",
-                    "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
-                    "total_docs": len(docs)
+        
+        # Create metadata point with README. The build ID identifies this version of the
+        # collection so that servers can invalidate their caches after a rebuild. Like the
+        # symbol table and cross-reference points, it has no vectors, so searches never hit it.
+        metadata_point = models.PointStruct(
+            id=string_to_uuid("readme"),
+            vector={},
+            payload={
+                "type": "metadata",
+                "readme_content": readme_content if readme_content else "No README found",
+                "repository": f"{owner}/{repo}",
+                "repository_url": f"https://github.com/{owner}/{repo}",
+                "created_at": time.strftime(TIMESTAMP_FORMAT),
+                "source_commit": self._get_source_commit(owner, repo),
+                "build_id": build_id or uuid.uuid4().hex,
+                "total_docs": len(docs),
+                "encoders": {
+                    dense_name: encoder_record(self.encoder, self.encoder_model, dimension,
+                                               projection.to_payload() if projection is not None else None)
                 }
-            )
-            
-            # Upload metadata point
-            self.client.upsert(
-                collection_name=name,
-                points=[metadata_point]
+            }
+        )
+        
+        # Store the public symbol table so that servers can list symbols and look up
+        # docstrings without importing the module, and every definition's name and qualified
+        # name for name completion and fuzzy lookups
+        symbols_point = models.PointStruct(
+            id=string_to_uuid("symbols"),
+            vector={},
+            payload={
+                "type": "symbols",
+                "symbols": self._build_symbol_index(docs, results.get('exports')),
+                "names": sorted({
+                    name
+                    for doc in docs if doc['type'] in ('function', 'class')
+                    for definition in [doc, *doc.get('aliases', [])]
+                    for name in (definition['name'], definition.get('qualname'))
+                    if name
+                })
+            }
+        )
+        
+        # Store the cross-reference index so that servers answer callers, callees and
+        # subclasses from memory
+        xref_point = models.PointStruct(
+            id=string_to_uuid("xref"),
+            vector={},
+            payload={
+                "type": "xref",
+                "index": results.get('xref') or build_xref_index(docs)
+            }
+        )
+        
+        # Upload metadata, symbol table and cross-reference points
+        self.client.upsert(
+            collection_name=name,
+            points=[metadata_point, symbols_point, xref_point]
+        )
+
+        if indexed_docs:
+            sparse_vectors = document_sparse_vectors(
+                [f'{doc["name"]} {" ".join(doc.get("alias_names", []))} {doc.get("signature", "")} {doc["docstring_header"]}'
+                 for _, doc in indexed_docs]
             )
 
-        if docs:
-            # Upload the docs
             self.client.upload_points(
                 collection_name=name,
                 points=[
                     models.PointStruct(
                         id=idx, 
-                        vector=self.encoder.encode(f'{doc["name"]}:\n{doc["docstring_header"]}').tolist(), 
+                        vector={dense_name: dense.tolist(), SPARSE_VECTOR_NAME: sparse},
                         payload=doc
                     )
-                    for idx, doc in enumerate(docs)
-                    if doc["docstring_header"]  # Skip if docstring_header is empty
+                    for (idx, doc), dense, sparse in zip(indexed_docs, dense_vectors, sparse_vectors)
                 ],
+                wait=True,
             )
         return self.client.get_collections()
     
+    def _publish_version(self, name: str, build: Callable[[str, str], Any]):
+        """Build a new collection version and switch the alias of a module to it.
+        
+        Servers keep querying the current version through the alias while the new one is
+        built, and see the new one once it is fully uploaded and indexed.
+        
+        Args:
+            name: Alias of the module
+            build: Callable filling a new collection, given its name and build ID
+        """
+        build_id = new_build_id()
+        collection_name = versioned_name(name, build_id)
+        print(f"Building collection '{collection_name}'")
+        try:
+            build(collection_name, build_id)
+            if not wait_until_indexed(self.client, collection_name):
+                print(f"Collection '{collection_name}' is still being indexed; switching to it anyway")
+        except BaseException:
+            print(f"Build failed; '{name}' keeps serving its current version")
+            self.client.delete_collection(collection_name)
+            raise
+        previous = switch_alias(self.client, name, collection_name)
+        print(f"Alias '{name}' now points to '{collection_name}'"
+              + (f" (was '{previous}')" if previous else ""))
+        for stale in prune_versions(self.client, name, keep=self.keep_versions):
+            print(f"Deleted old collection version '{stale}'")
+    
+    def add_encoder(self, name: str, batch_size: int = 256):
+        """Add the dense vectors of this instance's encoder to a module's collection.
+        
+        The vectors are computed from the texts stored in the point payloads, so the
+        repository is not analyzed again. Qdrant cannot add a vector to an existing
+        collection, so the points are copied with their current vectors into a new collection
+        version, which replaces the current one through the alias; servers keep serving
+        throughout and can then choose between the models.
+        
+        Args:
+            name: Alias of the module (its collection name)
+            batch_size: Number of points copied and encoded per batch
+        """
+        source = alias_targets(self.client).get(name, name)
+        metadata = read_metadata(self.client, source) or {}
+        encoders = metadata.get('encoders')
+        if not encoders:
+            raise ValueError(f"Collection '{name}' predates named vectors; rebuild it with create_db first.")
+        dense_name = vector_name(self.encoder_model)
+        if dense_name in encoders:
+            print(f"Collection '{name}' already has '{dense_name}' vectors")
+            return
+
+        # Texts of the documentation points, to encode and fit an optional projection on
+        docs = []
+        offset = None
+        while True:
+            records, offset = self.client.scroll(collection_name=source, limit=batch_size, offset=offset,
+                                                 with_payload=True, with_vectors=False)
+            docs.extend((record.id, record.payload) for record in records
+                        if (record.payload or {}).get('docstring_header'))
+            if offset is None:
+                break
+        vectors = self.encoder.encode([embedding_text(payload) for _, payload in docs]) if docs else []
+        projection = self._fit_projection([payload for _, payload in docs], vectors) if self.pca_dims and docs else None
+        if projection is not None:
+            vectors = projection.apply(vectors)
+        dimension = projection.dims if projection is not None else self.encoder.get_sentence_embedding_dimension()
+        new_vectors = {point_id: vector.tolist() for (point_id, _), vector in zip(docs, vectors)}
+
+        special_ids = {string_to_uuid(point) for point in SPECIAL_POINTS}
+
+        def build(collection_name: str, build_id: str):
+            config = self.client.get_collection(source).config.params
+            self.client.create_collection(
+                collection_name=collection_name,
+                vectors_config={**config.vectors,
+                                dense_name: models.VectorParams(size=dimension, distance=models.Distance.COSINE)},
+                sparse_vectors_config=config.sparse_vectors,
+            )
+            offset = None
+            while True:
+                records, offset = self.client.scroll(collection_name=source, limit=batch_size, offset=offset,
+                                                     with_payload=True, with_vectors=True)
+                points = []
+                for record in records:
+                    payload = record.payload or {}
+                    if record.id == string_to_uuid("readme"):
+                        payload = {**payload, "build_id": build_id, "encoders": {
+                            **encoders,
+                            dense_name: encoder_record(self.encoder, self.encoder_model, dimension,
+                                                       projection.to_payload() if projection is not None else None)
+                        }}
+                    # Special points get no vectors (older versions stored zero vectors there)
+                    vector = {} if record.id in special_ids else {
+                        **record.vector, dense_name: new_vectors.get(record.id, [0.0] * dimension)}
+                    points.append(models.PointStruct(id=record.id, vector=vector, payload=payload))
+                self.client.upsert(collection_name=collection_name, points=points)
+                if offset is None:
+                    break
+
+        print(f"Adding '{dense_name}' vectors of {self.encoder_model} to {len(docs)} points of '{name}'")
+        self._publish_version(name, build)
+    
     def process_repository(self, repo_url: str, module_name: str | None = None, output_dir: str | None = None, verbose: bool = False, include_notebooks: bool = False, include_rst: bool = False, exclude_tests: bool = False) -> List[Dict[str, Any]]:
         """Process a GitHub repository and create its documentation database.
         
@@ -511,15 +836,6 @@ class GitModuleHelpDB:
         self.module_name = module_name or repo_url.split('/')[-1]
         repo_name: str = repo_url.split('/')[-1]
 
-        # Check if collection exists
-        collections = self.client.get_collections()
-        collection_names: list[str] = [collection.name for collection in collections.collections]
-        
-        if repo_name in collection_names:
-            # raise ValueError(f"Collection '{repo_name}' already exists.")
-            print(f"Collection '{repo_name}' already exists. Deleting it first...")
-            self.client.delete_collection(repo_name)
-
         # Analyze the repository
         print(f"Analyzing repository: {repo_url}")
         results: dict[str, Any] = self.analyze_repository(
@@ -529,6 +845,19 @@ class GitModuleHelpDB:
             exclude_tests=exclude_tests
         )
         print(f"Found {len(results['results'])} documented items")
+
+        # Index cross-references before deduplication, so that calls from merged copies count
+        results['xref'] = build_xref_index(results['results'])
+        # The servers read references from the index only, so they are not stored with every point
+        for doc in results['results']:
+            for field in REFERENCE_FIELDS:
+                doc.pop(field, None)
+
+        # Merge vendored copies, identical overloads and re-exported wrappers before embedding
+        if self.dedup_threshold is not None:
+            results['results'], stats = deduplicate(results['results'], threshold=self.dedup_threshold)
+            print(f"Merged {stats['exact']} exact and {stats['near']} near duplicates: "
+                  f"{stats['before']} -> {stats['after']} items")
         
         # Save results to a JSONL file if output directory is specified
         if output_dir:
@@ -537,8 +866,8 @@ class GitModuleHelpDB:
                 for item in results:
                     f.write(json.dumps(item) + '\n')
         
-        # Create the database
-        self.create_database(repo_name, results)
+        self._publish_version(repo_name, lambda collection_name, build_id:
+                              self.create_database(collection_name, results, build_id=build_id))
         
         # Print results if verbose
         if verbose:
@@ -1,5 +1,26 @@
+import time
 import uuid
+from typing import Any, Dict, Optional
+
+# Format of the created_at and last_queried_at timestamps in the metadata point (local time)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Points holding a collection's metadata, symbol table and cross-reference index
+SPECIAL_POINTS = ("readme", "symbols", "xref")
 
 def string_to_uuid(s: str) -> str:
     # uuid.NAMESPACE_DNS is a built-in constant namespace
-    return str(uuid.uuid5(uuid.NAMESPACE_DNS, s))
\ No newline at end of file
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, s))
+
+def read_metadata(client: Any, collection_name: str, with_payload: Any = True) -> Optional[Dict[str, Any]]:
+    """Return the payload of a collection's metadata point, or None if it has none."""
+    records = client.retrieve(collection_name=collection_name, ids=[string_to_uuid("readme")],
+                              with_payload=with_payload)
+    return (records[0].payload or {}) if records else None
+
+def parse_timestamp(value: Optional[str]) -> Optional[float]:
+    """Return the epoch time of a metadata timestamp, or None if it is missing or malformed."""
+    try:
+        return time.mktime(time.strptime(value, TIMESTAMP_FORMAT)) if value else None
+    except ValueError:
+        return None
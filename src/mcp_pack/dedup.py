@@ -0,0 +1,184 @@
+import ast
+import hashlib
+import re
+import textwrap
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, List, Set, Tuple
+
+# Number of MinHash permutations, split into LSH bands of BAND_ROWS rows each
+NUM_PERMUTATIONS = 64
+BAND_ROWS = 4
+
+# Docstrings with fewer shingles are too generic to be compared ("Return the value.")
+MIN_SHINGLES = 8
+SHINGLE_SIZE = 3
+
+# Directories holding third-party copies; definitions elsewhere are preferred as canonical
+VENDOR_DIRS = {'vendor', '_vendor', 'vendored', 'extern', 'externals', 'third_party'}
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.blake2b(f'a{i}'.encode(), digest_size=8).digest(), 'big') % _MERSENNE_PRIME | 1,
+     int.from_bytes(hashlib.blake2b(f'b{i}'.encode(), digest_size=8).digest(), 'big') % _MERSENNE_PRIME)
+    for i in range(NUM_PERMUTATIONS)
+]
+
+
+def source_fingerprint(source: str) -> str:
+    """Hash source code normalized to its syntax tree, ignoring formatting, comments and indentation."""
+    try:
+        normalized = ast.dump(ast.parse(textwrap.dedent(source)), annotate_fields=False)
+    except SyntaxError:
+        normalized = ' '.join(source.split())
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+def shingles(text: str) -> Set[str]:
+    """Return the word shingles of a text, lowercased and stripped of punctuation."""
+    words = re.findall(r'\w+', text.lower())
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(items: Set[str]) -> List[int]:
+    """Return the MinHash signature of a set of shingles."""
+    hashes = [zlib.crc32(item.encode('utf-8')) for item in items]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    """Return the Jaccard similarity of two sets."""
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def code_shingles(source: str) -> Set[str]:
+    """Return the shingles of a definition's code without its docstring, so that only the code is compared."""
+    try:
+        tree = ast.parse(textwrap.dedent(source))
+    except SyntaxError:
+        return shingles(source)
+    for node in ast.walk(tree):
+        body = getattr(node, 'body', None)
+        if (isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and body
+                and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant)
+                and isinstance(body[0].value.value, str)):
+            node.body = body[1:] or [ast.Pass()]
+    return shingles(ast.unparse(tree))
+
+
+def _dedup_name(doc: Dict[str, Any]) -> str:
+    """Return the name definitions must share to be merged: the qualified name of methods, so that
+    a method is never merged with one of the same name in another class (an override and its base)."""
+    qualname = doc.get('qualname') or doc['name']
+    return qualname if '.' in qualname else doc['name']
+
+
+def _canonical_rank(doc: Dict[str, Any], position: int) -> Tuple:
+    """Sort key choosing the canonical copy: public, not vendored, shallowest path, first seen."""
+    parts = doc.get('file', '').split('/')
+    return (doc['name'].startswith('_'), bool(VENDOR_DIRS & set(parts)), len(parts), position)
+
+
+def deduplicate(docs: List[Dict[str, Any]], threshold: float = 0.9) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Merge exact and near-duplicate function and class definitions.
+
+    Definitions with the same name and the same normalized source are exact duplicates
+    (vendored copies, identical overloads across files). Definitions of the same kind and
+    name whose docstrings and code both have a Jaccard similarity of at least threshold
+    are near duplicates (copies edited slightly); candidates are found with MinHash and
+    locality-sensitive hashing of the docstrings and then verified exactly. Methods are
+    only merged with methods of the same qualified name, never with an override or a
+    method of another class. Each group keeps one canonical doc, with the
+    other definitions listed in its 'aliases', 'alias_names' and 'alias_qualnames'.
+
+    Args:
+        docs: Analyzed documentation items; only functions and classes are deduplicated
+        threshold: Minimum docstring and code Jaccard similarity of near duplicates
+
+    Returns:
+        The deduplicated docs in their original order, and counts of removed duplicates
+    """
+    parent = list(range(len(docs)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i: int, j: int) -> bool:
+        root_i, root_j = find(i), find(j)
+        if root_i == root_j:
+            return False
+        parent[max(root_i, root_j)] = min(root_i, root_j)
+        return True
+
+    code_docs = [i for i, doc in enumerate(docs) if doc.get('type') in ('function', 'class')]
+
+    # Exact duplicates: same name and normalized source
+    exact = 0
+    first_by_fingerprint: Dict[Tuple[str, str], int] = {}
+    for i in code_docs:
+        key = (_dedup_name(docs[i]), source_fingerprint(docs[i].get('source_code', '')))
+        if key in first_by_fingerprint:
+            exact += union(first_by_fingerprint[key], i)
+        else:
+            first_by_fingerprint[key] = i
+
+    # Near duplicates: same name, similar docstrings found through LSH buckets of MinHash bands, and similar code
+    near = 0
+    doc_shingles = {i: shingles(docs[i].get('docstring', '')) for i in first_by_fingerprint.values()}
+    buckets: Dict[Tuple, List[int]] = defaultdict(list)
+    for i, items in doc_shingles.items():
+        if len(items) < MIN_SHINGLES:
+            continue
+        signature = minhash(items)
+        for band in range(0, NUM_PERMUTATIONS, BAND_ROWS):
+            buckets[(docs[i]['type'], _dedup_name(docs[i]), band, tuple(signature[band:band + BAND_ROWS]))].append(i)
+    compared: Set[Tuple[int, int]] = set()
+    code_cache: Dict[int, Set[str]] = {}
+
+    def source_shingles(i: int) -> Set[str]:
+        if i not in code_cache:
+            code_cache[i] = code_shingles(docs[i].get('source_code', ''))
+        return code_cache[i]
+
+    for bucket in buckets.values():
+        for a_pos, i in enumerate(bucket):
+            for j in bucket[a_pos + 1:]:
+                if (i, j) in compared or find(i) == find(j):
+                    continue
+                compared.add((i, j))
+                if (_jaccard(doc_shingles[i], doc_shingles[j]) >= threshold
+                        and _jaccard(source_shingles(i), source_shingles(j)) >= threshold):
+                    near += union(i, j)
+
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for i in code_docs:
+        groups[find(i)].append(i)
+    canonical_of: Dict[int, int] = {}
+    for members in groups.values():
+        canonical = min(members, key=lambda i: _canonical_rank(docs[i], i))
+        for i in members:
+            canonical_of[i] = canonical
+
+    deduplicated = []
+    for i, doc in enumerate(docs):
+        if canonical_of.get(i, i) != i:
+            continue
+        members = groups.get(find(i), [])
+        if len(members) > 1:
+            aliases = [
+                {key: docs[j].get(key, '') for key in ('name', 'qualname', 'signature', 'file')}
+                for j in members if j != i
+            ]
+            doc = {
+                **doc,
+                'aliases': aliases,
+                'alias_names': sorted({alias['name'] for alias in aliases} - {doc['name']}),
+                'alias_qualnames': sorted({alias['qualname'] for alias in aliases if alias['qualname']}
+                                          - {doc.get('qualname')}),
+            }
+        deduplicated.append(doc)
+
+    return deduplicated, {'before': len(docs), 'after': len(deduplicated), 'exact': exact, 'near': near}
@@ -0,0 +1,147 @@
+import platform
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sentence_transformers import SentenceTransformer
+
+ENCODER_BACKENDS = ("torch", "onnx")
+
+# Text whose embedding is stored with each named vector, to verify that a server's encoder matches
+PROBE_TEXT = "Return the weighted moving average of an array, ignoring NaN values."
+
+# Minimum cosine similarity between a server's probe embedding and the stored one. Quantized
+# ONNX and PyTorch versions of a model agree far above this; different models fall far below.
+PROBE_MIN_SIMILARITY = 0.98
+
+# Loaded encoders are shared by every database builder and server in the process
+_encoders: Dict[Tuple, SentenceTransformer] = {}
+_encoders_lock = threading.Lock()
+
+
+def default_onnx_file() -> str:
+    """Return the int8-quantized ONNX file matching this CPU, as published for all-MiniLM-L6-v2."""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "onnx/model_qint8_arm64.onnx"
+    return "onnx/model_quint8_avx2.onnx"
+
+
+def _onnx_model_kwargs(num_threads: Optional[int], onnx_file: Optional[str]) -> dict:
+    """Build the keyword arguments used to load a quantized ONNX Runtime model on CPU."""
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise ImportError(
+            "The 'onnx' encoder backend requires onnxruntime and optimum. "
+            "Install them with: pip install 'mcp-pack[onnx]'"
+        ) from e
+
+    session_options = onnxruntime.SessionOptions()
+    if num_threads:
+        session_options.intra_op_num_threads = num_threads
+        session_options.inter_op_num_threads = 1
+    return {
+        "file_name": onnx_file or default_onnx_file(),
+        "provider": "CPUExecutionProvider",
+        "session_options": session_options,
+    }
+
+
+def load_encoder(
+    model_name: str = "all-MiniLM-L6-v2",
+    backend: str = "torch",
+    num_threads: Optional[int] = None,
+    cache_folder: Optional[str] = None,
+    onnx_file: Optional[str] = None,
+    local_files_only: bool = False,
+) -> SentenceTransformer:
+    """Load a sentence embedding model, reusing an already loaded instance when possible.
+
+    Args:
+        model_name: SentenceTransformer model name or path to a local model directory
+        backend: 'torch' for the PyTorch model or 'onnx' for an int8-quantized ONNX Runtime model
+        num_threads: Number of CPU threads used for inference (defaults to the library default)
+        cache_folder: Directory where downloaded model and tokenizer files are kept between runs
+        onnx_file: ONNX file within the model repository (defaults to the quantized file for this CPU)
+        local_files_only: Load only from a local model directory or the cache, without contacting the Hugging Face Hub
+
+    Returns:
+        The loaded SentenceTransformer
+    """
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{backend}', expected one of {ENCODER_BACKENDS}")
+
+    key = (model_name, backend, num_threads, cache_folder, onnx_file, local_files_only)
+    with _encoders_lock:
+        if key in _encoders:
+            return _encoders[key]
+
+        if backend == "onnx":
+            encoder = SentenceTransformer(
+                model_name,
+                backend="onnx",
+                device="cpu",
+                cache_folder=cache_folder,
+                local_files_only=local_files_only,
+                model_kwargs=_onnx_model_kwargs(num_threads, onnx_file),
+            )
+        else:
+            if num_threads:
+                import torch
+
+                torch.set_num_threads(num_threads)
+            encoder = SentenceTransformer(model_name, cache_folder=cache_folder,
+                                          local_files_only=local_files_only)
+
+        _encoders[key] = encoder
+        return encoder
+
+
+def vector_name(model_name: str) -> str:
+    """Return the name of the collection vector holding a model's embeddings ('all-minilm-l6-v2')."""
+    base = model_name.rstrip('/').split('/')[-1]
+    return re.sub(r'[^a-z0-9]+', '-', base.lower()).strip('-') or 'dense'
+
+
+def encoder_record(encoder: SentenceTransformer, model_name: str, dims: int,
+                   projection: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Describe the encoder of a named vector for the metadata point.
+
+    Args:
+        encoder: Encoder the vectors were computed with
+        model_name: Model name or path the encoder was loaded from
+        dims: Dimension of the stored vectors
+        projection: Payload of the PCA projection applied to the embeddings (optional)
+
+    Returns:
+        The model name, stored dimension, probe embedding and projection
+    """
+    return {
+        "model": model_name,
+        "dims": dims,
+        "probe": encoder.encode(PROBE_TEXT).tolist(),
+        "projection": projection,
+    }
+
+
+def verify_encoder(encoder: SentenceTransformer, record: Dict[str, Any]) -> bool:
+    """Return whether an encoder reproduces the probe embedding of a named vector's encoder."""
+    probe: List[float] = record.get("probe") or []
+    embedding = encoder.encode(PROBE_TEXT).tolist()
+    if len(embedding) != len(probe):
+        return False
+    dot = sum(a * b for a, b in zip(embedding, probe))
+    norms = (sum(a * a for a in embedding) * sum(b * b for b in probe)) ** 0.5
+    return bool(norms) and dot / norms >= PROBE_MIN_SIMILARITY
+
+
+def measure_encode_seconds(encoder: SentenceTransformer, repeats: int = 5) -> float:
+    """Return the median time to encode a single short query, after one untimed call."""
+    encoder.encode(PROBE_TEXT)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        encoder.encode(PROBE_TEXT)
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2]
@@ -0,0 +1,138 @@
+import ast
+import posixpath
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Directories whose files are not part of a package's importable API
+NON_API_DIRS = {'test', 'tests', 'testing', 'example', 'examples', 'doc', 'docs',
+                'benchmarks', 'scripts', 'tutorials'}
+NON_API_FILES = {'setup.py', 'conftest.py', 'noxfile.py', 'fabfile.py'}
+
+# Depth of nested package __init__ files followed through star imports
+MAX_STAR_DEPTH = 3
+
+
+def is_api_path(path: str) -> bool:
+    """Return whether a file can belong to a package's API: not a test, example or setup script."""
+    parts = path.lower().split('/')
+    name = parts[-1]
+    if name in NON_API_FILES or name.startswith('test_') or name.endswith('_test.py'):
+        return False
+    return not any(part in NON_API_DIRS for part in parts[:-1])
+
+
+def find_package_init(paths: Iterable[str], repo: str) -> Optional[str]:
+    """Return the path of the top-level package __init__.py of a repository, or None.
+
+    Packages named like the repository are preferred, then the least nested one.
+    """
+    package_name = repo.lower().replace('-', '_')
+    inits = [path for path in paths if path.split('/')[-1] == '__init__.py' and is_api_path(path)]
+    if not inits:
+        return None
+    return min(inits, key=lambda path: (posixpath.basename(posixpath.dirname(path)).lower() != package_name,
+                                        path.count('/'), path))
+
+
+def _module_paths(package_dir: str, module: str) -> Tuple[str, str]:
+    """Return the two files a dotted module path relative to a package directory may live in."""
+    base = posixpath.join(package_dir, *module.split('.')) if module else package_dir
+    return f'{base}.py', f'{base}/__init__.py'
+
+
+def _module_statements(tree: ast.Module) -> Iterator[ast.stmt]:
+    """Yield the statements run at import time, including those in if, try and with blocks."""
+    stack = list(reversed(tree.body))
+    while stack:
+        node = stack.pop()
+        yield node
+        if isinstance(node, (ast.If, ast.Try, ast.With)):
+            blocks = [node.body, getattr(node, 'orelse', []), getattr(node, 'finalbody', [])]
+            blocks += [handler.body for handler in getattr(node, 'handlers', [])]
+            stack.extend(reversed([child for block in blocks for child in block]))
+
+
+def _literal_all(tree: ast.Module) -> Optional[List[str]]:
+    """Return the names of a module's literal __all__, extended with `+=`, or None if it has none."""
+    names: Optional[List[str]] = None
+    for node in _module_statements(tree):
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == '__all__' for t in node.targets):
+            value, names = node.value, []
+        elif (isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name)
+              and node.target.id == '__all__' and names is not None):
+            value = node.value
+        else:
+            continue
+        try:
+            names.extend(str(name) for name in ast.literal_eval(value))
+        except ValueError:
+            return None
+    return names
+
+
+def _top_level_names(tree: ast.Module) -> List[str]:
+    """Return the public functions and classes a module defines at top level."""
+    return [node.name for node in _module_statements(tree)
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+            and not node.name.startswith('_')]
+
+
+def package_exports(init_path: str, read: Callable[[str], Optional[str]], package_name: str,
+                    depth: int = 0, root_dir: Optional[str] = None) -> Dict[str, Tuple[Optional[str], str]]:
+    """Return the names a package exports, with the module each one is imported from.
+
+    The exports are the package's literal `__all__` if it has one, otherwise every name its
+    __init__ imports from within the package or defines. Star imports contribute the
+    `__all__` or the public top-level definitions of the imported module.
+
+    Args:
+        init_path: Path of the package __init__.py in the repository
+        read: Callable returning the source of a repository file, or None if it does not exist
+        package_name: Importable name of the top-level package, for absolute imports
+        depth: Nesting depth of star imports of subpackages (used internally)
+        root_dir: Directory of the top-level package, for absolute imports in subpackages
+
+    Returns:
+        A map from each exported name to the path of the file defining it (None if
+        unknown) and the name it is defined under there
+    """
+    source = read(init_path)
+    if source is None:
+        return {}
+    tree = ast.parse(source)
+    package_dir = posixpath.dirname(init_path)
+    root_dir = package_dir if root_dir is None else root_dir
+    exports: Dict[str, Tuple[Optional[str], str]] = {}
+
+    for node in _module_statements(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            exports[node.name] = (init_path, node.name)
+        # `from . import submodule` imports modules, not definitions
+        if not isinstance(node, ast.ImportFrom) or not node.module:
+            continue
+        if node.level == 1:
+            py_path, init = _module_paths(package_dir, node.module)
+        elif not node.level and node.module.split('.')[0] == package_name:
+            py_path, init = _module_paths(root_dir, node.module.partition('.')[2])
+        else:
+            # Imports from other packages, or relative to a parent package, are not exported code
+            continue
+
+        if any(alias.name == '*' for alias in node.names):
+            module_source = read(py_path)
+            if module_source is not None:
+                module_tree = ast.parse(module_source)
+                names = _literal_all(module_tree) or _top_level_names(module_tree)
+                exports.update((name, (py_path, name)) for name in names)
+            elif depth < MAX_STAR_DEPTH:
+                nested = package_exports(init, read, package_name, depth + 1, root_dir)
+                public = {name: value for name, value in nested.items() if not name.startswith('_')}
+                exports.update(public)
+            continue
+
+        for alias in node.names:
+            exports[alias.asname or alias.name] = (py_path if read(py_path) is not None else init, alias.name)
+
+    declared = _literal_all(tree)
+    if declared is not None:
+        return {name: exports.get(name, (None, name)) for name in declared}
+    return {name: value for name, value in exports.items() if not name.startswith('_')}
@@ -0,0 +1,73 @@
+import ast
+import textwrap
+from typing import List, Optional, Tuple
+
+
+def paginate(text: str, offset: int, max_chars: int) -> Tuple[str, Optional[int]]:
+    """Return one page of text and the offset of the next page.
+
+    Pages end at a line break when one falls in the second half of the page, so that
+    code is not split mid-line.
+
+    Args:
+        text: Full text to paginate
+        offset: Character offset where the page starts
+        max_chars: Maximum number of characters in the page (0 disables pagination)
+
+    Returns:
+        The page and the offset of the next page, or None if this is the last page
+    """
+    offset = max(offset, 0)
+    if max_chars <= 0:
+        return text[offset:], None
+    end = offset + max_chars
+    if end >= len(text):
+        return text[offset:], None
+    line_break = text.rfind('\n', offset + max_chars // 2, end)
+    if line_break != -1:
+        end = line_break + 1
+    return text[offset:end], end
+
+
+def page_notice(offset: int, next_offset: Optional[int], total: int) -> str:
+    """Describe how to fetch the continuation of a truncated page."""
+    if next_offset is None:
+        return ""
+    return (f'\n\n[Truncated: showing characters {offset}-{next_offset} of {total}. '
+            f'Call again with offset={next_offset} for the next page.]')
+
+
+def class_outline(source: str) -> str:
+    """Return the outline of a class: its signature and the signature of each method.
+
+    Each entry is followed by the first line of its docstring. If the source cannot be
+    parsed, it is returned unchanged.
+    """
+    try:
+        tree = ast.parse(textwrap.dedent(source))
+    except SyntaxError:
+        return source
+    node = next((node for node in tree.body if isinstance(node, ast.ClassDef)), None)
+    if node is None:
+        return source
+
+    bases = ', '.join(ast.unparse(base) for base in node.bases + node.keywords)
+    lines: List[str] = [f'class {node.name}({bases}):' if bases else f'class {node.name}:']
+    lines.extend(_docstring_header(node, indent='    '))
+    for child in node.body:
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            prefix = 'async def' if isinstance(child, ast.AsyncFunctionDef) else 'def'
+            returns = f' -> {ast.unparse(child.returns)}' if child.returns else ''
+            decorators = [f'    @{ast.unparse(decorator)}' for decorator in child.decorator_list]
+            lines.extend(decorators)
+            lines.append(f'    {prefix} {child.name}({ast.unparse(child.args)}){returns}: ...')
+            lines.extend(_docstring_header(child, indent='        '))
+    return '\n'.join(lines)
+
+
+def _docstring_header(node: ast.AST, indent: str) -> List[str]:
+    """Return the first docstring line of a node as a comment, if it has one."""
+    docstring = ast.get_docstring(node) # type: ignore
+    if not docstring:
+        return []
+    return [f'{indent}# {docstring.strip().splitlines()[0]}']
@@ -1,5 +1,25 @@
 import argparse
-from qdrant_client import QdrantClient
+import json
+from typing import Any, Dict, List
+from qdrant_client import QdrantClient, models
+
+from .db_utils import SPECIAL_POINTS, read_metadata, string_to_uuid
+from .versions import alias_targets, module_names
+
+
+def _payload_bytes(payload: Any) -> int:
+    """Return the size of a payload serialized as JSON."""
+    return len(json.dumps(payload or {}, default=str).encode('utf-8'))
+
+
+def _vector_bytes(vector: Any) -> int:
+    """Return the size of a point's vectors: 4 bytes per dense value, 8 per sparse entry."""
+    if isinstance(vector, dict):
+        return sum(_vector_bytes(value) for value in vector.values())
+    if isinstance(vector, models.SparseVector):
+        return 8 * len(vector.indices)
+    return 4 * len(vector or [])
+
 
 class QdrantLister:
     """A class for listing collections in a Qdrant database."""
@@ -22,20 +42,106 @@ class QdrantLister:
         collections = self.client.get_collections()
         return [collection.name for collection in collections.collections]
 
+    def list_aliases(self) -> Dict[str, str]:
+        """List the aliases in the Qdrant database.
+
+        Returns:
+            Map from each alias to the collection version it points to
+        """
+        return alias_targets(self.client)
+
+    def list_modules(self) -> List[str]:
+        """List the names that servers query: aliases and unversioned collections.
+
+        Returns:
+            Sorted list of module collection names
+        """
+        return module_names(self.client)
+
+    def collection_stats(self, collection_name: str, sample_size: int = 64) -> Dict[str, Any]:
+        """Return capacity statistics and build information of a collection.
+
+        Qdrant does not report sizes, so payload and vector bytes are estimates: the
+        metadata, symbol table and cross-reference points are measured, and the
+        documentation points are extrapolated from a sample.
+
+        Args:
+            collection_name: Name of the collection
+            sample_size: Number of documentation points sampled
+
+        Returns:
+            Point, indexed vector and segment counts, estimated payload and vector bytes,
+            and the build date, source commit and last query time from the metadata point
+        """
+        info = self.client.get_collection(collection_name)
+        special_ids = [string_to_uuid(name) for name in SPECIAL_POINTS]
+        special = self.client.retrieve(collection_name=collection_name, ids=special_ids,
+                                       with_payload=True, with_vectors=True)
+        sample, _ = self.client.scroll(
+            collection_name=collection_name,
+            scroll_filter=models.Filter(must_not=[models.HasIdCondition(has_id=special_ids)]),
+            limit=sample_size,
+            with_payload=True,
+            with_vectors=True,
+        )
+        points = info.points_count or 0
+        docs = max(points - len(special), 0)
+        payload_bytes = sum(_payload_bytes(record.payload) for record in special)
+        vector_bytes = sum(_vector_bytes(record.vector) for record in special)
+        if sample:
+            payload_bytes += docs * sum(_payload_bytes(record.payload) for record in sample) / len(sample)
+            vector_bytes += docs * sum(_vector_bytes(record.vector) for record in sample) / len(sample)
+
+        metadata = read_metadata(self.client, collection_name,
+                                 with_payload=["created_at", "source_commit", "last_queried_at"]) or {}
+        return {
+            'collection': collection_name,
+            'points_count': points,
+            'indexed_vectors_count': info.indexed_vectors_count or 0,
+            'segments_count': info.segments_count,
+            'payload_bytes': int(payload_bytes),
+            'vector_bytes': int(vector_bytes),
+            'created_at': metadata.get('created_at'),
+            'source_commit': metadata.get('source_commit'),
+            'last_queried_at': metadata.get('last_queried_at'),
+        }
+
+
+def print_collections(lister: QdrantLister, stats: bool = False):
+    """Print the collections, marking the live version of each alias, optionally with statistics."""
+    collections = lister.list_collections()
+    if not collections:
+        print("No collections found in Qdrant.")
+        return
+
+    aliases = {collection: alias for alias, collection in lister.list_aliases().items()}
+    if not stats:
+        print("Collections in Qdrant:")
+        for collection in collections:
+            print(f"- {collection}" + (f" (live as '{aliases[collection]}')" if collection in aliases else ""))
+        return
+
+    rows = [lister.collection_stats(collection) for collection in collections]
+    print(f"{'Collection':<44} {'Alias':<16} {'Points':>8} {'Indexed':>8} {'Segs':>5} "
+          f"{'Payload MB':>10} {'Vector MB':>10}  {'Built':<19}  {'Commit':<8}  Last queried")
+    for row in rows:
+        print(f"{row['collection']:<44} {aliases.get(row['collection'], ''):<16} {row['points_count']:>8} "
+              f"{row['indexed_vectors_count']:>8} {row['segments_count']:>5} "
+              f"{row['payload_bytes'] / 2**20:>10.2f} {row['vector_bytes'] / 2**20:>10.2f}  "
+              f"{row['created_at'] or '-':<19}  {(row['source_commit'] or '-')[:8]:<8}  "
+              f"{row['last_queried_at'] or '-'}")
+    print(f"Total: {len(rows)} collections, {sum(row['points_count'] for row in rows)} points, "
+          f"{sum(row['payload_bytes'] for row in rows) / 2**20:.2f} MB payload, "
+          f"{sum(row['vector_bytes'] for row in rows) / 2**20:.2f} MB vectors (estimated)")
+
+
 def main():
     parser = argparse.ArgumentParser(description='List Qdrant database collections')
     parser.add_argument('--qdrant-url', help='Qdrant server URL', default='http://localhost:6333')
+    parser.add_argument('--stats', action='store_true', help='Show points, indexed vectors, segments, estimated payload and vector size, build date, source commit and last query time')
     args = parser.parse_args()
     
-    lister = QdrantLister(qdrant_url=args.qdrant_url)
-    collections = lister.list_collections()
-    
-    if collections:
-        print("Collections in Qdrant:")
-        for collection in collections:
-            print(f"- {collection}")
-    else:
-        print("No collections found in Qdrant.")
+    print_collections(QdrantLister(qdrant_url=args.qdrant_url), stats=args.stats)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,178 @@
+import contextvars
+import functools
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Name of the tool whose call is being handled, so that stage timings can be attributed to it
+current_tool: contextvars.ContextVar[str] = contextvars.ContextVar('current_tool', default='')
+
+
+class Histogram:
+    """A Prometheus-style histogram with fixed bucket upper bounds."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Record one observation."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket that contains it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float('inf')
+
+
+class ServerMetrics:
+    """Latency and throughput metrics of the tools served by one process.
+
+    Records histograms of total latency, per-stage time (encode, sparse, qdrant, format) and
+    payload bytes, and counters of calls, errors and result cache hits, all labelled
+    by tool name.
+    """
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels: str):
+        """Record an observation in the histogram with the given name and labels."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(buckets)
+            self._histograms[key].observe(value)
+
+    def inc(self, name: str, amount: int = 1, **labels: str):
+        """Increment the counter with the given name and labels."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        """Time a stage of the current tool call, such as 'encode', 'sparse', 'qdrant' or 'format'."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('mcp_pack_stage_seconds', time.perf_counter() - start,
+                         tool=current_tool.get(), stage=stage)
+
+    def instrument(self, tool: str) -> Callable[[Callable], Callable]:
+        """Return a decorator recording calls, errors, latency and payload size of an async tool."""
+        def decorator(fn: Callable) -> Callable:
+            @functools.wraps(fn)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                token = current_tool.set(tool)
+                start = time.perf_counter()
+                self.inc('mcp_pack_tool_calls_total', tool=tool)
+                try:
+                    result = await fn(*args, **kwargs)
+                except Exception:
+                    self.inc('mcp_pack_tool_errors_total', tool=tool)
+                    raise
+                finally:
+                    self.observe('mcp_pack_tool_latency_seconds', time.perf_counter() - start, tool=tool)
+                    current_tool.reset(token)
+                self.observe('mcp_pack_tool_payload_bytes', len(json.dumps(result, default=str)),
+                             buckets=BYTES_BUCKETS, tool=tool)
+                return result
+            return wrapper
+        return decorator
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return all counters and histograms as JSON-serializable data, for merging into another process's metrics."""
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, list(labels), list(histogram.buckets), histogram.counts[:], histogram.sum,
+                                histogram.count] for (name, labels), histogram in self._histograms.items()],
+            }
+
+    def merge(self, snapshot: Dict[str, Any]):
+        """Add the counters and histograms of a snapshot to these metrics."""
+        with self._lock:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(tuple(label) for label in labels))
+                self._counters[key] = self._counters.get(key, 0) + value
+            for name, labels, buckets, counts, total, count in snapshot['histograms']:
+                key = (name, tuple(tuple(label) for label in labels))
+                if key not in self._histograms:
+                    self._histograms[key] = Histogram(tuple(buckets))
+                histogram = self._histograms[key]
+                histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                histogram.sum += total
+                histogram.count += count
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f'# TYPE {name} counter')
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f'{name}{_format_labels(labels)} {value}')
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f'# TYPE {name} histogram')
+                for (metric, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_format_labels(labels + (("le", str(bound)),))} {cumulative}')
+                    lines.append(f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {histogram.count}')
+                    lines.append(f'{name}_sum{_format_labels(labels)} {histogram.sum}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a summary of all metrics, with approximate p50 and p99 for histograms."""
+        with self._lock:
+            counters = {_format_key(key): value for key, value in self._counters.items()}
+            histograms = {
+                _format_key(key): {
+                    'count': histogram.count,
+                    'mean': histogram.sum / histogram.count if histogram.count else 0.0,
+                    'p50': histogram.quantile(0.5),
+                    'p99': histogram.quantile(0.99),
+                }
+                for key, histogram in self._histograms.items()
+            }
+        return {'counters': counters, 'histograms': histograms}
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    """Format labels as a Prometheus label set."""
+    if not labels:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def _format_key(key: Tuple[str, Tuple[Tuple[str, str], ...]]) -> str:
+    """Format a metric name and its labels as a single string."""
+    name, labels = key
+    return name + _format_labels(labels)
@@ -0,0 +1,149 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+class _Node:
+    """A trie node; `names` holds the symbol names whose key ends here."""
+
+    __slots__ = ('children', 'names')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        self.names: List[str] = []
+
+
+def _deletes(key: str) -> Set[str]:
+    """Return the key and every string obtained by deleting one character from it."""
+    return {key} | {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Return the Levenshtein distance between two strings."""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(current[j - 1] + 1, previous[j] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+class NameIndex:
+    """A trie of symbol names for prefix completion and approximate name lookup.
+
+    Names are keyed case-insensitively, and qualified names ('Sim.run') are also
+    keyed by their last component. Typos are matched through an index of one-character
+    deletions, which finds most names within two edits with a few dictionary lookups;
+    when it finds nothing, the trie is walked with a Levenshtein row per node, pruning
+    branches that exceed the distance limit.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.root = _Node()
+        self.names = set(names)
+        self._by_key: Dict[str, List[str]] = defaultdict(list)
+        self._deletes: Dict[str, Set[str]] = defaultdict(set)
+        for name in sorted(self.names):
+            self._insert(name.lower(), name)
+            if '.' in name:
+                self._insert(name.rsplit('.', 1)[1].lower(), name)
+
+    def _insert(self, key: str, name: str):
+        """Add a name under a key."""
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, _Node())
+        if name not in node.names:
+            node.names.append(name)
+            self._by_key[key].append(name)
+            for variant in _deletes(key):
+                self._deletes[variant].add(key)
+
+    def _find(self, key: str) -> _Node | None:
+        """Return the node of a key, or None."""
+        node = self.root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def complete(self, prefix: str, limit: int = 20) -> List[str]:
+        """Return up to limit names starting with prefix (case-insensitive), shortest first."""
+        node = self._find(prefix.lower())
+        if node is None:
+            return []
+        found: List[str] = []
+        # Breadth-first, so that shorter completions come first
+        level = [node]
+        while level and len(found) < limit:
+            next_level = []
+            for current in level:
+                found.extend(name for name in sorted(current.names) if name not in found)
+                next_level.extend(current.children[char] for char in sorted(current.children))
+            level = next_level
+        return found[:limit]
+
+    def within_distance(self, key: str, max_distance: int) -> List[Tuple[int, str]]:
+        """Return (distance, name) for every name whose key is within max_distance edits of key."""
+        key = key.lower()
+        matches: List[Tuple[int, str]] = []
+        first_row = list(range(len(key) + 1))
+
+        def walk(node: _Node, char: str, previous_row: List[int]):
+            row = [previous_row[0] + 1]
+            for i in range(1, len(key) + 1):
+                row.append(min(row[i - 1] + 1, previous_row[i] + 1,
+                               previous_row[i - 1] + (key[i - 1] != char)))
+            if row[-1] <= max_distance:
+                matches.extend((row[-1], name) for name in node.names)
+            if min(row) <= max_distance:
+                for next_char, child in node.children.items():
+                    walk(child, next_char, row)
+
+        for char, child in self.root.children.items():
+            walk(child, char, first_row)
+        return matches
+
+    def resolve(self, name: str, limit: int = 5) -> Tuple[str | None, List[str]]:
+        """Resolve a name that has no exact match.
+
+        Case and qualification variants ('odict', 'sciris.ODict', 'ODICT') resolve to a
+        single name when unambiguous. A package or module prefix is dropped, so 'sciris.odict'
+        resolves to the top-level 'odict' even when a class also has an 'odict' method. Otherwise the closest names by edit distance
+        are suggested, followed by completions of the name as a prefix.
+
+        Returns:
+            The resolved name or None, and the suggested names
+        """
+        if name in self.names:
+            return name, [name]
+
+        # Drop leading qualifiers one at a time ('sciris.utils.odict' -> 'utils.odict' -> 'odict')
+        parts = name.split('.')
+        for start in range(len(parts)):
+            key = '.'.join(parts[start:])
+            names = self._by_key.get(key.lower())
+            if names:
+                if len(names) == 1:
+                    return names[0], list(names)
+                # Prefer the name qualified exactly as what is left: 'requests.get' is the top-level
+                # 'get', not 'Session.get', whose key is only its last component
+                qualified = [candidate for candidate in names if candidate.lower() == key.lower()]
+                if len(qualified) > 1:
+                    qualified = [candidate for candidate in qualified if candidate == key]
+                if len(qualified) == 1:
+                    return qualified[0], list(qualified)
+                return None, sorted(names)[:limit]
+
+        key = parts[-1].lower()
+        max_distance = 1 if len(key) <= 4 else 2
+        candidates = {candidate for variant in _deletes(key) for candidate in self._deletes.get(variant, ())}
+        matches = {(distance, match_name) for candidate in candidates
+                   if (distance := edit_distance(key, candidate)) <= max_distance
+                   for match_name in self._by_key[candidate]}
+        if not matches:
+            matches = set(self.within_distance(key, max_distance))
+        suggestions = [match_name for _, match_name in sorted(matches, key=lambda match: (match[0], len(match[1]), match[1]))]
+        suggestions += [completion for completion in self.complete(key, limit) if completion not in suggestions]
+        return None, suggestions[:limit]
@@ -0,0 +1,124 @@
+import contextvars
+import cProfile
+import functools
+import io
+import os
+import pstats
+import random
+import threading
+import time
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar('T')
+
+# Profile of the sampled tool call being handled, if any
+current_profile: contextvars.ContextVar[Optional[cProfile.Profile]] = contextvars.ContextVar(
+    'current_profile', default=None)
+
+
+def write_hotspots(stats: pstats.Stats, path: str, top_n: int):
+    """Write the top_n functions by cumulative time of a profile to a text file."""
+    stream = io.StringIO()
+    stats.stream = stream # type: ignore
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top_n)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(stream.getvalue())
+
+
+def run_profiled(fn: Callable[[], T]) -> T:
+    """Run fn, profiling it when it runs on behalf of a sampled tool call.
+
+    Tool work runs in worker threads and cProfile only profiles the thread that
+    enables it, so the profile is enabled around the blocking work itself.
+    """
+    profile = current_profile.get()
+    if profile is None:
+        return fn()
+    try:
+        profile.enable()
+    except ValueError:
+        # Another profiler is already active (e.g. a concurrent sampled call on Python 3.12+)
+        return fn()
+    try:
+        return fn()
+    finally:
+        profile.disable()
+
+
+class ToolProfiler:
+    """Profiles a random sample of tool calls with cProfile.
+
+    Each sampled call is written as a .prof file to the output directory, and a
+    hotspots.txt summary aggregating all sampled calls is kept up to date.
+    """
+
+    def __init__(self, output_dir: str, sample_rate: float = 0.1, top_n: int = 30,
+                 summary_every: int = 20):
+        """Initialize the ToolProfiler instance.
+
+        Args:
+            output_dir: Directory where profiles and the hotspot summary are written
+            sample_rate: Fraction of tool calls to profile
+            top_n: Number of functions listed in the hotspot summary
+            summary_every: Number of sampled calls between rewrites of the summary
+        """
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.top_n = top_n
+        self.summary_every = summary_every
+        self.samples = 0
+        self._aggregate: Optional[pstats.Stats] = None
+        self._lock = threading.Lock()
+        os.makedirs(output_dir, exist_ok=True)
+
+    def instrument(self, tool: str) -> Callable[[Callable], Callable]:
+        """Return a decorator profiling a sample of the calls of an async tool."""
+        def decorator(fn: Callable) -> Callable:
+            @functools.wraps(fn)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if random.random() >= self.sample_rate:
+                    return await fn(*args, **kwargs)
+                profile = cProfile.Profile()
+                token = current_profile.set(profile)
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    current_profile.reset(token)
+                    self._record(tool, profile)
+            return wrapper
+        return decorator
+
+    def _record(self, tool: str, profile: cProfile.Profile):
+        """Write the profile of one call and add it to the aggregate."""
+        profile.create_stats()
+        if not profile.stats: # type: ignore
+            # Served from the result cache without any profiled work
+            return
+        with self._lock:
+            self.samples += 1
+            filename = f'{time.strftime("%Y%m%d-%H%M%S")}_{tool}_{self.samples}.prof'
+            profile.dump_stats(os.path.join(self.output_dir, filename))
+            if self._aggregate is None:
+                self._aggregate = pstats.Stats(profile)
+            else:
+                self._aggregate.add(profile)
+            if self.samples % self.summary_every == 0:
+                write_hotspots(self._aggregate, os.path.join(self.output_dir, 'hotspots.txt'), self.top_n)
+
+    def write_summary(self):
+        """Write the hotspot summary of all sampled calls so far."""
+        with self._lock:
+            if self._aggregate is not None:
+                write_hotspots(self._aggregate, os.path.join(self.output_dir, 'hotspots.txt'), self.top_n)
+
+
+def profile_run(output_dir: str, name: str, fn: Callable[[], T], top_n: int = 30) -> T:
+    """Profile a whole run of fn, writing name.prof and name_hotspots.txt to output_dir."""
+    os.makedirs(output_dir, exist_ok=True)
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(fn)
+    finally:
+        profile.dump_stats(os.path.join(output_dir, f'{name}.prof'))
+        write_hotspots(pstats.Stats(profile), os.path.join(output_dir, f'{name}_hotspots.txt'), top_n)
+        print(f"Profile written to {output_dir}")
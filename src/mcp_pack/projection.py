@@ -0,0 +1,133 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Dimensions compared in the recall report, besides the chosen one and the full dimension
+REPORT_DIMS = (32, 64, 96, 128, 192, 256)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale vectors to unit length, leaving zero vectors unchanged."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class Projection:
+    """A PCA projection of embeddings to fewer dimensions, applied to documents and queries alike.
+
+    Embeddings are centered on the corpus mean, projected on the leading principal
+    components and scaled back to unit length for cosine search.
+    """
+
+    def __init__(self, mean: Any, components: Any, component_variance: Optional[List[float]] = None):
+        """Initialize the Projection instance.
+
+        Args:
+            mean: Mean embedding of the corpus the projection was fitted on
+            components: Principal components, one row per output dimension
+            component_variance: Fraction of the corpus variance along each component
+        """
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.asarray(components, dtype=np.float32)
+        self.component_variance = list(component_variance or [])
+
+    @property
+    def dims(self) -> int:
+        """Number of output dimensions."""
+        return self.components.shape[0]
+
+    @property
+    def explained_variance(self) -> float:
+        """Fraction of the corpus variance kept by the projection."""
+        return float(sum(self.component_variance))
+
+    @classmethod
+    def fit(cls, vectors: Any, dims: int) -> 'Projection':
+        """Fit a projection to dims dimensions on a corpus of embeddings (one per row)."""
+        vectors = np.asarray(vectors, dtype=np.float64)
+        mean = vectors.mean(axis=0)
+        _, singular_values, components = np.linalg.svd(vectors - mean, full_matrices=False)
+        variance = singular_values ** 2
+        ratios = variance / variance.sum() if variance.sum() else np.zeros_like(variance)
+        return cls(mean, components[:dims], ratios[:dims].tolist())
+
+    def truncate(self, dims: int) -> 'Projection':
+        """Return the projection on the first dims components only."""
+        return Projection(self.mean, self.components[:dims], self.component_variance[:dims])
+
+    def apply(self, vectors: Any) -> np.ndarray:
+        """Project one embedding or a matrix of embeddings, returning unit-length vectors."""
+        return _normalize((np.asarray(vectors, dtype=np.float32) - self.mean) @ self.components.T)
+
+    def to_payload(self) -> Dict[str, Any]:
+        """Return the projection as a JSON-serializable payload for the metadata point."""
+        return {
+            'method': 'pca',
+            'dims': self.dims,
+            'input_dims': int(self.mean.shape[0]),
+            'explained_variance': self.explained_variance,
+            'component_variance': self.component_variance,
+            'mean': self.mean.tolist(),
+            'components': self.components.tolist(),
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Optional[Dict[str, Any]]) -> Optional['Projection']:
+        """Load a projection stored by to_payload, or return None if there is none."""
+        if not payload:
+            return None
+        return cls(payload['mean'], payload['components'], payload.get('component_variance'))
+
+
+def _top_k(queries: np.ndarray, corpus: np.ndarray, k: int) -> np.ndarray:
+    """Return the indices of the k nearest corpus vectors of each query by cosine similarity."""
+    scores = _normalize(queries) @ _normalize(corpus).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def recall_report(vectors: np.ndarray, queries: np.ndarray, dims: Iterable[int],
+                  k: int = 10) -> List[Dict[str, Any]]:
+    """Measure search recall against stored vector size for several projection dimensions.
+
+    Recall is the fraction of the exact top k of each query in the full-dimension space
+    that exact search in the reduced space also returns.
+
+    Args:
+        vectors: Document embeddings the projections are fitted on
+        queries: Query embeddings
+        dims: Output dimensions to compare
+        k: Number of neighbors compared per query
+
+    Returns:
+        One row per dimension (and the full dimension) with the recall at k, the kept
+        variance, and the float32 bytes per vector and for the whole corpus
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    queries = np.asarray(queries, dtype=np.float32)
+    full_dims = vectors.shape[1]
+    k = min(k, len(vectors))
+    truth = _top_k(queries, vectors, k)
+
+    rows = []
+    reduced = sorted({d for d in dims if 0 < d < min(full_dims, len(vectors))})
+    # One decomposition serves every dimension: the leading components do not depend on how many are kept
+    largest = Projection.fit(vectors, reduced[-1]) if reduced else None
+    for dim in reduced:
+        projection = largest.truncate(dim)
+        found = _top_k(projection.apply(queries), projection.apply(vectors), k)
+        recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(truth, found)])
+        rows.append({'dims': dim, 'recall': float(recall), 'explained_variance': projection.explained_variance})
+    rows.append({'dims': full_dims, 'recall': 1.0, 'explained_variance': 1.0})
+    for row in rows:
+        row['bytes_per_vector'] = 4 * row['dims']
+        row['corpus_mb'] = row['bytes_per_vector'] * len(vectors) / 2**20
+    return rows
+
+
+def print_recall_report(rows: List[Dict[str, Any]], chosen: Optional[int] = None, k: int = 10):
+    """Print a recall report, marking the chosen dimension."""
+    print(f"{'Dims':>5} {'Bytes/vec':>10} {'Vectors MB':>11} {'Variance':>9} {f'Recall@{k}':>10}")
+    for row in rows:
+        marker = '  <- indexed' if row['dims'] == chosen else ''
+        print(f"{row['dims']:>5} {row['bytes_per_vector']:>10} {row['corpus_mb']:>11.2f} "
+              f"{row['explained_variance']:>9.1%} {row['recall']:>10.1%}{marker}")
@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+# Weight of the latest batch in the running estimate of the scoring cost per pair
+COST_SMOOTHING = 0.2
+
+# Uncached candidates scored per query even when the cost estimate exceeds the budget, so
+# that the estimate keeps being measured and recovers once scoring is fast again
+MIN_SCORED_PAIRS = 2
+
+
+def rerank_text(payload: Dict[str, Any], max_chars: int = 1000) -> str:
+    """Return the text a search hit is scored on: its name, signature and docstring."""
+    text = f'{payload.get("name", "")}{payload.get("signature") or ""}\n{payload.get("docstring") or ""}'
+    return text[:max_chars]
+
+
+class Reranker:
+    """Rescores vector search candidates with a cross-encoder under a per-query time budget.
+
+    The query-document pairs of one query are scored in a single batch and their scores
+    are cached. Only as many uncached candidates as the running cost estimate fits in the
+    budget are scored, but never fewer than MIN_SCORED_PAIRS; if scoring still overruns the
+    budget, the candidates are returned in vector order and the scores and the cost
+    estimate are updated when the batch completes.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_RERANK_MODEL, candidates: int = 20,
+                 budget_ms: float = 100.0, cache_size: int = 8192, max_length: int = 256,
+                 max_workers: int = 2, cache_folder: Optional[str] = None, local_files_only: bool = False):
+        """Initialize the Reranker instance.
+
+        Args:
+            model_name: CrossEncoder model name or path to a local model directory
+            candidates: Number of vector search candidates fetched for reranking
+            budget_ms: Time budget in milliseconds for scoring the candidates of one query
+            cache_size: Maximum number of cached pair scores
+            max_length: Maximum number of tokens of a query-document pair
+            max_workers: Number of batches scored concurrently
+            cache_folder: Directory where model files are cached
+            local_files_only: Load the model only from a local directory or the cache
+        """
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model_name, max_length=max_length, device="cpu",
+                                  cache_folder=cache_folder, local_files_only=local_files_only)
+        self.candidates = candidates
+        self.budget = budget_ms / 1000
+        self.cache_size = cache_size
+        self.reranked = 0
+        self.partial = 0
+        self.timeouts = 0
+        self._cost_per_pair = 0.0
+        self._scores: OrderedDict[Hashable, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rerank")
+
+    def warm_up(self):
+        """Score a batch outside the budget, so that kernel initialization is not timed."""
+        self.model.predict([("warm up", "warm up")] * 2)
+
+    def _score(self, query: str, texts: List[Tuple[Hashable, str]], namespace: Hashable) -> Dict[Hashable, float]:
+        """Score query-document pairs in one batch, caching the scores and the cost per pair."""
+        start = time.perf_counter()
+        scores = self.model.predict([(query, text) for _, text in texts])
+        cost = (time.perf_counter() - start) / len(texts)
+        with self._lock:
+            self._cost_per_pair = cost if not self._cost_per_pair else (
+                COST_SMOOTHING * cost + (1 - COST_SMOOTHING) * self._cost_per_pair)
+            result = {}
+            for (point_id, _), score in zip(texts, scores):
+                result[point_id] = float(score)
+                self._scores[(namespace, query, point_id)] = float(score)
+            while len(self._scores) > self.cache_size:
+                self._scores.popitem(last=False)
+        return result
+
+    def rerank(self, query: str, hits: Sequence[Any], namespace: Hashable = None) -> Tuple[List[Any], bool]:
+        """Order search hits by cross-encoder score.
+
+        Args:
+            query: Search query
+            hits: Hits in vector order, with `id` and `payload` attributes
+            namespace: Key separating cached scores, e.g. the collection name and version
+
+        Returns:
+            The reordered hits, and whether all of them were reranked within the budget.
+            Candidates beyond those affordable in the budget keep their vector order after
+            the reranked ones.
+        """
+        if len(hits) < 2:
+            return list(hits), True
+        query = ' '.join(query.split())
+
+        scores: Dict[Hashable, float] = {}
+        with self._lock:
+            for hit in hits:
+                key = (namespace, query, hit.id)
+                if key in self._scores:
+                    self._scores.move_to_end(key)
+                    scores[hit.id] = self._scores[key]
+            cost_per_pair = self._cost_per_pair
+
+        # Score as many of the top uncached candidates as the budget is expected to allow
+        missing = [hit for hit in hits if hit.id not in scores]
+        affordable = max(int(self.budget / cost_per_pair), MIN_SCORED_PAIRS) if cost_per_pair else len(missing)
+        if affordable < len(missing):
+            self.partial += 1
+            missing = missing[:affordable]
+        if missing:
+            future = self._executor.submit(self._score, query, [(hit.id, rerank_text(hit.payload or {}))
+                                                                for hit in missing], namespace)
+            try:
+                scores.update(future.result(timeout=self.budget))
+            except FutureTimeoutError:
+                with self._lock:
+                    # The batch took longer than the budget; score half as many next time
+                    self._cost_per_pair = max(self._cost_per_pair, 2 * self.budget / len(missing))
+                    self.timeouts += 1
+                return list(hits), False
+
+        head = sorted((hit for hit in hits if hit.id in scores), key=lambda hit: scores[hit.id], reverse=True)
+        tail = [hit for hit in hits if hit.id not in scores]
+        if len(head) < 2:
+            return list(hits), False
+        self.reranked += 1
+        return head + tail, not tail
+
+    def stats(self) -> Dict[str, Any]:
+        """Return reranking counts, the scoring cost estimate and the number of cached scores."""
+        with self._lock:
+            return {
+                'reranked': self.reranked,
+                'partial': self.partial,
+                'timeouts': self.timeouts,
+                'cost_per_pair_ms': self._cost_per_pair * 1000,
+                'cached_scores': len(self._scores),
+                'budget_ms': self.budget * 1000,
+            }
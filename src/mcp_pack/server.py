@@ -1,12 +1,24 @@
 from mcp.server.fastmcp import FastMCP
 from qdrant_client import QdrantClient, models
-from qdrant_client.models import Record
-from sentence_transformers import SentenceTransformer
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import functools
+import json
 import os
+import signal
+import sys
+import time
 import argparse
 import importlib
-from .db_utils import string_to_uuid
+from .cache import QueryEmbeddingCache, ToolResultCache, Uncached
+from .db_utils import SPECIAL_POINTS, string_to_uuid
+from .encoders import load_encoder, measure_encode_seconds, verify_encoder
+from .formatting import class_outline, page_notice, paginate
+from .metrics import ServerMetrics, current_tool
+from .profiling import ToolProfiler, run_profiled
+from .rerank import Reranker
+from .snapshot import CollectionSnapshot
+from .sparse import SPARSE_VECTOR_NAME, query_sparse_vector
 
 search_docstring_desc_template = """
             Retrieves relevant docstrings from {module_name} module functions or classes based on a search query.
@@ -27,14 +39,40 @@ search_docstring_desc_template = """
 
 search_docstring_fn_template = """search_{module_name}_docstring"""
 
+search_docstrings_batch_desc_template = """
+            Runs several docstring searches over the {module_name} module in a single call.
+            
+            Use this instead of repeated search_{module_name}_docstring calls when a question has
+            several related parts. Every query is searched like search_{module_name}_docstring.
+            
+            Args:
+                queries (List[str]): Search queries describing the {module_name} functionality you're looking for.
+                    Example: ["Load a saved object", "Ordered dictionary", "Parallel map"]
+                limit (int, optional): Maximum number of docstrings to return per query. Defaults to 3.
+            
+            Returns:
+                List[Dict[str, Any]]: One entry per query, in order, containing:
+                    - 'query': The search query
+                    - 'results': Formatted docstrings; objects already returned for an earlier
+                      query are listed by name only, with a reference to that query
+    """
+
+search_docstrings_batch_fn_template = """search_{module_name}_docstrings_batch"""
+
 get_source_code_desc_template = """
             Retrieves the source code for a specific function or class from the {module_name} module.
             
             This tool searches for the exact function or class name and returns its source code.
+            Long source code is returned in pages; the end of a truncated page says which offset
+            to request next. For large classes, request the outline first to see the method
+            signatures, then fetch the full source only if needed.
             
             Args:
                 name (str): The exact name of the function or class you want to retrieve source code for.
                     Examples: "MyClass", "my_function", "process_data"
+                offset (int, optional): Character offset of the page to return. Defaults to 0.
+                outline (bool, optional): For classes, return only the class and method signatures
+                    with the first line of each docstring. Defaults to False.
             
             Returns:
                 str: The source code of the specified function or class, or an error message if not found.
@@ -63,11 +101,13 @@ search_docs_desc_template = """
             Args:
                 topic (str): Description of the task or topic you want to learn more about with {module_name}.
                     Examples: "Common use cases", "Working with main features", "Typical workflows"
+                offset (int, optional): Character offset of the page of the doc to return. Defaults to 0.
             
             Returns:
                 Dict[str, Any]: A dictionary containing:
                     - 'name': The name of the doc file or example
-                    - 'result': The complete doc related to the search query
+                    - 'result': The doc related to the search query, or one page of it
+                    - 'next_offset': Offset of the next page, or None if the doc is complete
             
             Note:
                 The returned examples may need adaptation for your specific use case.
@@ -75,23 +115,6 @@ search_docs_desc_template = """
 
 search_doc_fn_template = """search_{module_name}_docs"""
 
-get_module_docstring_template = """
-            Returns the docstring of a given Python function or class from a specified module.
-            
-            Args:
-                module_name (str): The name of the Python module.
-                obj_name (str): The name of the function or class within the module.
-            
-            Returns:
-                str: The docstring of the object, or None if no docstring is present.
-            
-            Example:
-                >>> get_docstring("math", "sqrt")
-                'Return the square root of x.'
-            """
-
-get_module_docstring_fn_template = """get_{module_name}_docstring"""
-
 get_module_functions_template = """
             Returns a list of all function names in the {module_name} module.            
             
@@ -105,6 +128,47 @@ get_module_functions_template = """
 
 get_module_functions_fn_template = """get_{module_name}_functions"""
 
+get_related_desc_template = """
+            Returns the call graph and class hierarchy around a function or class of the {module_name} module.
+            
+            Use this instead of reading source code to find out what calls a function, what it calls,
+            or which classes derive from a class.
+            
+            Args:
+                name (str): The name of the function or class, e.g. "my_function", "MyClass.method" or,
+                    for a name defined in several modules, "{module_name}.submodule.MyClass.method".
+            
+            Returns:
+                Dict[str, Any]: A dictionary containing:
+                    - 'name': The full name (module path and qualified name) of the definition
+                    - 'callers': Full names of the functions and methods that call it
+                    - 'callees': Full names of the {module_name} functions and classes it calls
+                    - 'bases': Full names of its base classes
+                    - 'subclasses': Full names of the classes that directly derive from it
+                    - 'imported_by': Files that import it
+                If several definitions match the name, 'candidates' lists their full names instead
+                (and 'more_candidates' how many were left out); call again with one of them.
+            """
+
+get_related_fn_template = """get_{module_name}_related"""
+
+# Excludes the metadata, symbol table and cross-reference points from every search; collections
+# built by earlier versions stored them with zero vectors, which dense searches can return
+NOT_SPECIAL_POINTS = [models.HasIdCondition(has_id=[string_to_uuid(point) for point in SPECIAL_POINTS])]
+
+complete_name_desc_template = """
+            Completes a partial function or class name of the {module_name} module.
+            
+            Args:
+                prefix (str): The beginning of the name (case-insensitive), e.g. "load" or "MyClass.ru".
+                limit (int, optional): Maximum number of names to return. Defaults to 20.
+            
+            Returns:
+                List[str]: Matching names and qualified names, shortest first.
+            """
+
+complete_name_fn_template = """complete_{module_name}_name"""
+
 class ModuleQueryServer:
     """
     A configurable server for providing AI agents with module documentation and examples.
@@ -112,13 +176,31 @@ class ModuleQueryServer:
     This server provides semantic search capabilities over module documentation, source code,
     and usage examples to help AI agents access relevant information and reduce hallucinations.
     """
+
+    # Seconds between checks of the collection version used to invalidate cached results
+    version_check_interval: float = 5.0
+
+    # Candidates fetched per result from each of the dense and sparse indexes before fusion
+    hybrid_prefetch_factor: int = 5
     
     def __init__(
         self, 
         module_name: str,
         qdrant_url: str = "http://localhost:6333",
-        encoder_model: str = "all-MiniLM-L6-v2",
-        collection_name: Optional[str] = None
+        encoder_model: str | List[str] = "all-MiniLM-L6-v2",
+        collection_name: Optional[str] = None,
+        encoder_backend: str = "torch",
+        encoder_threads: Optional[int] = None,
+        model_cache_dir: Optional[str] = None,
+        query_cache_size: int = 1024,
+        result_cache_bytes: int = 64 * 1024 * 1024,
+        result_cache_ttl: float = 300.0,
+        max_response_chars: int = 20000,
+        profiler: Optional[ToolProfiler] = None,
+        reranker: Optional[Reranker] = None,
+        local_files_only: bool = False,
+        warmup_queries: Optional[List[str]] = None,
+        shared_with: Optional["ModuleQueryServer"] = None
     ):
         """
         Initialize the ModuleQueryServer for a specific Python module.
@@ -126,53 +208,333 @@ class ModuleQueryServer:
         Args:
             module_name: Name of the Python module this server provides information about
             qdrant_url: URL for the Qdrant vector database
-            encoder_model: SentenceTransformer model to use for encoding queries
+            encoder_model: SentenceTransformer model to use for encoding queries, or several models;
+                each collection is then queried with the fastest one whose embeddings match
+                vectors stored in the collection
             collection_name: Name of the Qdrant collection (defaults to module_name)
+            encoder_backend: Inference backend for the encoder ('torch' or 'onnx')
+            encoder_threads: Number of CPU threads used by the encoder
+            model_cache_dir: Directory where model and tokenizer files are cached
+            query_cache_size: Maximum number of query embeddings to cache (0 disables caching)
+            result_cache_bytes: Memory budget for cached tool results (0 disables caching)
+            result_cache_ttl: Seconds before a cached tool result expires (0 means no expiry)
+            max_response_chars: Maximum characters of source code or docs per response page (0 disables paging)
+            profiler: Profiler sampling tool calls (optional)
+            reranker: Cross-encoder reranking the candidates of docstring searches (optional)
+            local_files_only: Load the encoder only from a local model directory or the cache,
+                without contacting the Hugging Face Hub
+            warmup_queries: Queries searched at startup, before serving, to fill the query cache
+            shared_with: Existing server whose MCP instance, encoder, caches and Qdrant client
+                are reused, so that one process can serve several modules
         """
         self.module_name = module_name
         self.qdrant_url = qdrant_url
         self.collection_name = collection_name or module_name
-        
-        # Initialize MCP server
-        self.mcp = FastMCP(f'{self.module_name}_pack')
-        
-        # Initialize encoder
-        self.encoder = SentenceTransformer(encoder_model)
+        self.max_response_chars = max_response_chars
+        self.warmup_queries = warmup_queries or []
+
+        # Set once the warm-up has run; reported by the readiness endpoint
+        self.ready = False
+
+        self._client: Optional[QdrantClient] = None
+
+        if shared_with is not None:
+            # Register this module's tools on the other server and share its heavy resources
+            self.mcp = shared_with.mcp
+            self.encoders = shared_with.encoders
+            self.query_caches = shared_with.query_caches
+            self.encode_seconds = shared_with.encode_seconds
+            self.result_cache = shared_with.result_cache
+            self.metrics = shared_with.metrics
+            self.profiler = shared_with.profiler
+            self.reranker = shared_with.reranker
+            self._client = shared_with.get_qdrant_client()
+            self.group = shared_with.group
+            self.group.append(self)
+        else:
+            # Initialize MCP server
+            self.mcp = FastMCP(f'{self.module_name}_pack')
+
+            # Initialize encoders, timing each so that the fastest matching one is used
+            model_names = [encoder_model] if isinstance(encoder_model, str) else list(encoder_model)
+            self.encoders = {
+                model_name: load_encoder(model_name, backend=encoder_backend, num_threads=encoder_threads,
+                                         cache_folder=model_cache_dir, local_files_only=local_files_only)
+                for model_name in model_names
+            }
+            # Encode time of each encoder, measured when an encoder is first selected
+            self.encode_seconds: Dict[str, float] = {}
+
+            # Cache query embeddings per encoder, shared by all search tools
+            self.query_caches = {model_name: QueryEmbeddingCache(encoder, max_size=query_cache_size)
+                                 for model_name, encoder in self.encoders.items()}
+
+            # Cache tool results per collection version
+            self.result_cache = ToolResultCache(max_bytes=result_cache_bytes, ttl=result_cache_ttl)
+
+            # Latency and throughput metrics of every registered tool
+            self.metrics = ServerMetrics()
+            self.profiler = profiler
+            self.reranker = reranker
+
+            # Servers of all modules served by this MCP instance
+            self.group = [self]
+
+        # Encoder and dense vector used for this collection, chosen by select_encoder
+        self.encoder_model = next(iter(self.encoders))
+        self.vector_name: Optional[str] = None
+        self._encoder_selected = False
+
+        # Metadata, symbol table and statistics of the collection, held in memory per version
+        self.snapshot = CollectionSnapshot(self.get_qdrant_client, self.collection_name,
+                                           check_interval=self.version_check_interval)
+        self.snapshot.on_change(lambda: self.result_cache.invalidate(self.collection_name))
+        # A new version may add or drop vectors, so the encoder is chosen again
+        self.snapshot.on_change(lambda: setattr(self, '_encoder_selected', False))
+
+    @property
+    def encoder(self):
+        """The encoder used for this collection's queries."""
+        return self.encoders[self.encoder_model]
+
+    @property
+    def query_cache(self) -> QueryEmbeddingCache:
+        """The query embedding cache of this collection's encoder."""
+        return self.query_caches[self.encoder_model]
         
     def get_qdrant_client(self):
-        """Create and return a Qdrant client with the configured URL."""
-        return QdrantClient(url=self.qdrant_url)
+        """Return a Qdrant client with the configured URL, creating it on first use."""
+        if self._client is None:
+            self._client = QdrantClient(url=self.qdrant_url)
+        return self._client
     
-    def register_tools(self):
-        """Register all query tools with the MCP server."""
+    def reopen_qdrant_client(self, shared_with: Optional["ModuleQueryServer"] = None):
+        """Drop the current Qdrant client, e.g. one inherited by a forked worker process.
 
-        @self.mcp.tool(name=f"get_{self.module_name}_summary".format(module_name=self.module_name),
-                       description=f"Get a high level summary of the {self.module_name} module.")
-        async def get_module_summary() -> str:
+        Args:
+            shared_with: Server whose (new) client to use instead of creating one on next use
+        """
+        self._client = shared_with.get_qdrant_client() if shared_with is not None else None
 
-            client = self.get_qdrant_client()
-        
-            result: list[Record] = client.retrieve(
-                collection_name=self.collection_name,
-                ids=[string_to_uuid("readme")]  
-            )
+    def check_collection(self, select_encoder: bool = True):
+        """
+        Verify that the collection exists and choose the encoder that matches its vectors.
 
-            return result[0].payload["readme_content"]
+        Args:
+            select_encoder: Whether to choose the encoder now, which runs the encoders on the
+                probe text; otherwise it is chosen by warm_up or the first query
 
+        Raises:
+            RuntimeError: If the collection is missing or no loaded encoder matches its vectors
+        """
+        if not self.get_qdrant_client().collection_exists(self.collection_name):
+            raise RuntimeError(f"Collection '{self.collection_name}' does not exist in Qdrant at {self.qdrant_url}")
+        if select_encoder:
+            self.select_encoder()
 
-        @self.mcp.tool(name = search_docstring_fn_template.format(module_name=self.module_name), 
-                    description = search_docstring_desc_template.format(module_name = self.module_name))
-        async def search_module_docstring(query: str, limit: int = 3) -> List[str]:
+    def select_encoder(self):
+        """
+        Choose the encoder and dense vector this collection is queried with.
 
-            client = self.get_qdrant_client()
-            
-            hits = client.query_points(
+        Collections record the model and a probe embedding of each named dense vector. The
+        fastest loaded encoder that reproduces one of the probe embeddings is used. Collections
+        with a single unnamed vector are only checked for the embedding dimension.
+
+        Raises:
+            RuntimeError: If no loaded encoder matches the collection's vectors
+        """
+        records = self.snapshot.encoders()
+        if records is None:
+            self.encoder_model, self.vector_name = next(iter(self.encoders)), None
+            vectors = self.snapshot.info().config.params.vectors
+            expected = vectors.size if isinstance(vectors, models.VectorParams) else None
+            projection = self.snapshot.projection()
+            if projection is not None:
+                # Queries are projected like the documents, so the encoder must match the projection input
+                expected = projection.mean.shape[0]
+            dimension = self.encoder.get_sentence_embedding_dimension()
+            if expected is not None and expected != dimension:
+                raise RuntimeError(
+                    f"Collection '{self.collection_name}' was built from {expected}-dimensional embeddings, but the "
+                    f"encoder produces {dimension}-dimensional embeddings. Use the model the collection was built with."
+                )
+            self._encoder_selected = True
+            return
+
+        if len(self.encoders) > 1 and not self.encode_seconds:
+            # Shared by the servers of a group, so the encoders are timed once
+            self.encode_seconds.update({model_name: measure_encode_seconds(encoder)
+                                        for model_name, encoder in self.encoders.items()})
+        for model_name in sorted(self.encoders, key=lambda name: self.encode_seconds.get(name, 0.0)):
+            for name, record in records.items():
+                if verify_encoder(self.encoders[model_name], record):
+                    self.encoder_model, self.vector_name = model_name, name
+                    self._encoder_selected = True
+                    return
+        raise RuntimeError(
+            f"No loaded encoder ({', '.join(self.encoders)}) matches the vectors of collection "
+            f"'{self.collection_name}', which were computed with {', '.join(r.get('model', '?') for r in records.values())}. "
+            f"Start the server with one of these models, or add vectors of another with add_encoder."
+        )
+
+    def warm_up(self):
+        """
+        Run the first encodes and searches before serving, so that the first tool call does not
+        pay for lazy kernel initialization or the first Qdrant connection.
+
+        Searches the warm-up queries, which also fills the query embedding cache.
+        """
+        start = time.perf_counter()
+        if not self._encoder_selected:
+            self.select_encoder()
+        # Short and maximum-length inputs initialize the kernels used for either
+        self.encoder.encode(["warm up", "warm up " * 512])
+        if self.reranker is not None:
+            self.reranker.warm_up()
+        token = current_tool.set("warm_up")
+        try:
+            for query in self.warmup_queries or [self.module_name]:
+                self._search_docstring(query, 3)
+        finally:
+            current_tool.reset(token)
+        self.ready = True
+        print(f"Warmed up {self.module_name} in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+    def collection_stats(self) -> Dict[str, Any]:
+        """Return point counts and build information of the served collection."""
+        return self.snapshot.stats()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Return hit-rate statistics for the query embedding and tool result caches."""
+        return {
+            'query_embeddings': self.query_cache.stats() if len(self.query_caches) == 1 else
+                {model_name: cache.stats() for model_name, cache in self.query_caches.items()},
+            'tool_results': self.result_cache.stats(),
+        }
+
+    def metrics_stats(self) -> Dict[str, Any]:
+        """Return a summary of the tool metrics together with cache statistics."""
+        stats = {**self.metrics.stats(), 'caches': self.cache_stats()}
+        if self.reranker is not None:
+            stats['reranker'] = self.reranker.stats()
+        return stats
+
+    def _tool(self, name: str, description: str) -> Callable[[Callable], Callable]:
+        """Register a tool with the MCP server, instrumented with latency and throughput metrics."""
+        def decorator(fn: Callable) -> Callable:
+            @functools.wraps(fn)
+            async def recorded(*args: Any, **kwargs: Any) -> Any:
+                # Record that the collection is in use, so that clean_db does not prune it as unused
+                self.snapshot.mark_queried()
+                return await fn(*args, **kwargs)
+
+            tool = recorded
+            if self.profiler is not None:
+                tool = self.profiler.instrument(name)(tool)
+            return self.mcp.tool(name=name, description=description)(self.metrics.instrument(name)(tool))
+        return decorator
+
+    def _embed(self, text: str) -> List[float]:
+        """Return the cached embedding of a query, projected like the collection's vectors."""
+        if not self._encoder_selected:
+            self.select_encoder()
+        embedding = self.query_cache.encode(text)
+        projection = self.snapshot.projection(self.vector_name)
+        return projection.apply(embedding).tolist() if projection is not None else embedding
+
+    def _embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Return the cached embeddings of several queries, projected like the collection's vectors."""
+        if not self._encoder_selected:
+            self.select_encoder()
+        embeddings = self.query_cache.encode_many(texts)
+        projection = self.snapshot.projection(self.vector_name)
+        return projection.apply(embeddings).tolist() if projection is not None else embeddings
+
+    def _search_query(self, query: str, limit: int, dense: Optional[List[float]] = None,
+                      sparse: Optional[models.SparseVector] = None) -> Dict[str, Any]:
+        """
+        Return the query arguments for a search, shared by query_points and QueryRequest.
+
+        Collections with lexical sparse vectors are searched with a dense and a sparse
+        prefetch fused by reciprocal rank fusion in a single Qdrant request; older
+        collections fall back to a dense-only search. Vectors computed by the caller
+        (for a batch of queries) are passed in and not timed again.
+        """
+        if dense is None:
+            with self.metrics.stage("encode"):
+                dense = self._embed(query)
+        if sparse is None:
+            with self.metrics.stage("sparse"):
+                sparse = query_sparse_vector(query)
+        if not sparse.indices or not self.snapshot.has_sparse_vectors():
+            return {"query": dense, "using": self.vector_name}
+
+        prefetch_limit = max(limit * self.hybrid_prefetch_factor, 20)
+        return {
+            "prefetch": [
+                models.Prefetch(query=dense, using=self.vector_name, limit=prefetch_limit),
+                models.Prefetch(query=sparse, using=SPARSE_VECTOR_NAME, limit=prefetch_limit),
+            ],
+            "query": models.FusionQuery(fusion=models.Fusion.RRF),
+        }
+
+    async def _cached(self, tool: str, args: Dict[str, Any], compute: Callable[[], Any]) -> Any:
+        """Serve a tool call from the result cache, computing and coalescing on a miss."""
+        version = await asyncio.to_thread(self.snapshot.version)
+        key = ToolResultCache.make_key(tool, args, self.collection_name, version)
+
+        computed = False
+        def compute_and_mark() -> Any:
+            nonlocal computed
+            computed = True
+            return run_profiled(compute)
+
+        result = await self.result_cache.get_or_compute(key, compute_and_mark)
+        if not computed:
+            self.metrics.inc('mcp_pack_tool_cache_hits_total', tool=current_tool.get())
+        return result
+
+    def _get_summary(self) -> str:
+        """Return the README content of the collection's in-memory metadata point."""
+        return self.snapshot.metadata().get("readme_content", "No README found")
+
+    def _candidates(self, limit: int) -> int:
+        """Return the number of search hits to fetch for a result of the given size."""
+        return max(limit, self.reranker.candidates) if self.reranker is not None else limit
+
+    def _rerank(self, query: str, hits: List[Any], limit: int) -> Tuple[List[Any], bool]:
+        """Reorder search candidates with the reranker, if any, and keep the top limit.
+
+        Returns:
+            The hits, and False if the reranking budget was exceeded and vector order was kept
+        """
+        if self.reranker is None:
+            return hits[:limit], True
+        with self.metrics.stage("rerank"):
+            hits, complete = self.reranker.rerank(query, hits, namespace=(self.collection_name, self.snapshot.version()))
+        if not complete:
+            self.metrics.inc('mcp_pack_rerank_fallbacks_total', tool=current_tool.get())
+        return hits[:limit], complete
+
+    def _search_docstring(self, query: str, limit: int) -> List[str] | Uncached:
+        """
+        Return formatted docstrings of the objects most similar to the query.
+
+        Results whose reranking exceeded the time budget are wrapped in Uncached, so
+        that the degraded order is not served from the result cache.
+        """
+        search = self._search_query(query, self._candidates(limit))
+        with self.metrics.stage("qdrant"):
+            hits = self.get_qdrant_client().query_points(
                 collection_name=self.collection_name,
-                query=self.encoder.encode(query).tolist(),
+                **search,
+                query_filter=models.Filter(must_not=NOT_SPECIAL_POINTS),
                 with_payload=True,
-                limit=limit
+                limit=self._candidates(limit)
             ).points
-            
+        hits, complete = self._rerank(query, hits, limit)
+        
+        with self.metrics.stage("format"):
             result = []
             for i, hit in enumerate(hits):
                 if i > 0:
@@ -182,115 +544,236 @@ class ModuleQueryServer:
                        f'TYPE: {hit.payload["type"]}\n' # type: ignore
                        f'DOCSTRING:\n {hit.payload["docstring"]}\n') # type: ignore
                 result.append(msg)
-                
-            return result
-        
-        @self.mcp.tool(name = get_source_code_fn_template.format(module_name = self.module_name), 
-                       description = get_source_code_desc_template.format(module_name = self.module_name))
-        async def get_module_source_code(name: str) -> str:
-            client = self.get_qdrant_client()
             
-            # Search for exact match by name
-            hits = client.query_points(
+        return result if complete else Uncached(result)
+
+    def _search_docstrings_batch(self, queries: List[str], limit: int) -> List[Dict[str, Any]] | Uncached:
+        """Run several docstring searches with one encoder pass and one Qdrant request."""
+        candidates = self._candidates(limit)
+        with self.metrics.stage("encode"):
+            embeddings = self._embed_many(queries)
+        with self.metrics.stage("sparse"):
+            sparse_vectors = [query_sparse_vector(query) for query in queries]
+        requests = [
+            models.QueryRequest(**self._search_query(query, candidates, dense=embedding, sparse=sparse),
+                                filter=models.Filter(must_not=NOT_SPECIAL_POINTS), with_payload=True, limit=candidates)
+            for query, embedding, sparse in zip(queries, embeddings, sparse_vectors)
+        ]
+        with self.metrics.stage("qdrant"):
+            responses = self.get_qdrant_client().query_batch_points(
                 collection_name=self.collection_name,
-                query=self.encoder.encode(name).tolist(),
+                requests=requests
+            )
+        reranked = [self._rerank(query, response.points, limit) for query, response in zip(queries, responses)]
+
+        # Objects already returned for an earlier query are only referenced by name
+        with self.metrics.stage("format"):
+            seen: Dict[Any, int] = {}
+            groups = []
+            for query_number, (query, (hits, _)) in enumerate(zip(queries, reranked), start=1):
+                results = []
+                for hit in hits:
+                    if hit.id in seen:
+                        results.append(f'NAME: {hit.payload["name"]} (see results of query {seen[hit.id]})') # type: ignore
+                        continue
+                    seen[hit.id] = query_number
+                    results.append(f'NAME: {hit.payload["name"]}\n' # type: ignore
+                                   f'TYPE: {hit.payload["type"]}\n' # type: ignore
+                                   f'DOCSTRING:\n {hit.payload["docstring"]}\n') # type: ignore
+                groups.append({'query': query, 'results': results})
+        return groups if all(complete for _, complete in reranked) else Uncached(groups)
+
+    def _find_by_name(self, name: str) -> Optional[Any]:
+        """Return the point whose name (qualified name if dotted), or that of a definition merged into it, matches exactly, or None."""
+        with self.metrics.stage("encode"):
+            query = self._embed(name)
+        with self.metrics.stage("qdrant"):
+            hits = self.get_qdrant_client().query_points(
+                collection_name=self.collection_name,
+                query=query,
+                using=self.vector_name,
                 query_filter=models.Filter(
-                    must=[
+                    should=[
                         models.FieldCondition(
-                            key="name",
+                            key="qualname" if "." in name else "name",
                             match=models.MatchValue(value=name)
-                        )
-                    ]
-                ),
-                with_payload=True,
-                limit=1
-            ).points
-            
-            if not hits:
-                return f"No function or class named '{name}' found in {self.module_name} module."
-            
-            hit = hits[0]
-            return (f'NAME: {hit.payload["name"]}\n'
-                    f'TYPE: {hit.payload["type"]}\n'
-                    f'SOURCE CODE:\n{hit.payload["source_code"]}')
-        
-        @self.mcp.tool(name = get_docstring_fn_template.format(module_name = self.module_name), 
-                       description = get_docstring_desc_template.format(module_name = self.module_name))
-        async def get_module_docstring(name: str) -> str:
-            client = self.get_qdrant_client()
-            
-            # Search for exact match by name
-            hits = client.query_points(
-                collection_name=self.collection_name,
-                query=self.encoder.encode(name).tolist(),
-                query_filter=models.Filter(
-                    must=[
+                        ),
+                        # Definitions merged into this point by deduplication at ingestion
                         models.FieldCondition(
-                            key="name",
+                            key="alias_qualnames" if "." in name else "alias_names",
                             match=models.MatchValue(value=name)
                         )
-                    ]
+                    ],
+                    must_not=NOT_SPECIAL_POINTS
                 ),
                 with_payload=True,
                 limit=1
             ).points
-            
-            if not hits:
-                return f"No function or class named '{name}' found in {self.module_name} module."
-            
-            hit = hits[0]
-            return (f'NAME: {hit.payload["name"]}\n'
-                    f'TYPE: {hit.payload["type"]}\n'
-                    f'DOCSTRING:\n{hit.payload["docstring"]}')
+        return hits[0] if hits else None
+
+    def _lookup(self, name: str) -> Tuple[Optional[Any], str]:
+        """
+        Find the point of a function or class, resolving case and qualification variants
+        of its name ('ODict', 'sciris.odict') through the in-memory name trie.
+
+        Returns:
+            The point or None, and a note for the response: how the name was resolved, or
+            the closest names when it could not be resolved
+        """
+        names = self.snapshot.names()
+        with self.metrics.stage("resolve"):
+            # Collections built without a name list are looked up by the exact name only
+            resolved, suggestions = names.resolve(name) if names.names else (name, [])
+        hit = self._find_by_name(resolved) if resolved is not None else None
+        if hit is not None:
+            note = f"(Resolved '{name}' to '{resolved}')\n" if resolved != name else ""
+            canonical = hit.payload.get("qualname" if "." in resolved else "name") # type: ignore
+            if canonical != resolved:
+                # Matched a definition merged into this point by deduplication
+                canonical = hit.payload.get("qualname") or hit.payload["name"] # type: ignore
+                note += f"(Resolved '{resolved}' to duplicate '{canonical}' in {hit.payload.get('file')})\n" # type: ignore
+            return hit, note
+        message = f"No function or class named '{name}' found in {self.module_name} module."
+        suggestions = [suggestion for suggestion in suggestions if suggestion != name]
+        if suggestions:
+            message += f" Did you mean: {', '.join(suggestions)}?"
+        return None, message
+
+    def _page(self, text: str, offset: int) -> str:
+        """Return one page of a long response, ending with how to fetch the next page."""
+        with self.metrics.stage("format"):
+            page, next_offset = paginate(text, offset, self.max_response_chars)
+            return page + page_notice(offset, next_offset, len(text))
+
+    def _get_source_code(self, name: str, outline: bool = False) -> str:
+        """Return the source code, or for classes optionally the outline, of the named object."""
+        hit, note = self._lookup(name)
+        if hit is None:
+            return note
         
-        @self.mcp.tool(name = search_doc_fn_template.format(module_name = self.module_name), 
-                       description = search_docs_desc_template.format(module_name = self.module_name))
-        async def search_module_docs(topic: str) -> Dict[str, Any]:
-            client = self.get_qdrant_client()
-            
-            notebooks = client.query_points(
+        if outline and hit.payload["type"] == "class": # type: ignore
+            return (f'{note}NAME: {hit.payload["name"]}\n' # type: ignore
+                    f'TYPE: {hit.payload["type"]}\n' # type: ignore
+                    f'OUTLINE:\n{class_outline(hit.payload["source_code"])}') # type: ignore
+        return (f'{note}NAME: {hit.payload["name"]}\n'
+                f'TYPE: {hit.payload["type"]}\n'
+                f'SOURCE CODE:\n{hit.payload["source_code"]}')
+
+    def _get_docstring(self, name: str) -> str:
+        """Return the docstring of the named function or class.
+
+        Exported names are answered from the in-memory symbol table; other names are
+        resolved and looked up in Qdrant.
+        """
+        symbol = (self.snapshot.symbols() or {}).get(name)
+        if symbol is not None:
+            return (f'NAME: {name}\n'
+                    f'TYPE: {symbol["kind"]}\n'
+                    f'DOCSTRING:\n{symbol["docstring"]}')
+
+        hit, note = self._lookup(name)
+        if hit is None:
+            return note
+        
+        return (f'{note}NAME: {hit.payload["name"]}\n'
+                f'TYPE: {hit.payload["type"]}\n'
+                f'DOCSTRING:\n{hit.payload["docstring"]}')
+
+    def _search_docs(self, topic: str) -> Dict[str, Any]:
+        """Return the documentation file most similar to the topic."""
+        with self.metrics.stage("encode"):
+            query = self._embed(topic)
+        with self.metrics.stage("qdrant"):
+            notebooks = self.get_qdrant_client().query_points(
                 collection_name=self.collection_name,
-                query=self.encoder.encode(topic).tolist(),
+                query=query,
+                using=self.vector_name,
                 query_filter=models.Filter(
                     must=[
                         models.FieldCondition(
                             key="type",
                             match=models.MatchValue(value="doc")
                         )
-                    ]
+                    ],
+                    must_not=NOT_SPECIAL_POINTS
                 ),
                 with_payload=True,
                 limit=1
             ).points
-            
-            if not notebooks:
-                return {
-                    'name': 'No examples found',
-                    'type': 'none',
-                    'result': f'No usage examples related to "{topic}" in {self.module_name}'
-                }
-            
-            result = {
-                'name': notebooks[0].payload['name'],  # type: ignore
-                'type': notebooks[0].payload['type'],  # type: ignore
-                'result': notebooks[0].payload['source_code'] # type: ignore
+        
+        if not notebooks:
+            return {
+                'name': 'No examples found',
+                'type': 'none',
+                'result': f'No usage examples related to "{topic}" in {self.module_name}'
             }
-            
-            return result
+        
+        return {
+            'name': notebooks[0].payload['name'],  # type: ignore
+            'type': notebooks[0].payload['type'],  # type: ignore
+            'result': notebooks[0].payload['source_code'] # type: ignore
+        }
+    
+    def register_tools(self, select_encoder: bool = True):
+        """Register all query tools with the MCP server.
 
-        @self.mcp.tool(name = get_module_docstring_fn_template.format(module_name = self.module_name),
-                       description = get_module_docstring_template.format(module_name = self.module_name))
-        async def get_module_docstring(obj_name:str) -> str:
-            try:
-                module = importlib.import_module(self.module_name)
-                obj = getattr(module, obj_name)
-                return obj.__doc__
-            except (ModuleNotFoundError, AttributeError) as e:
-                return f"Error: {e}"
+        Args:
+            select_encoder: Whether to choose the encoder now (see check_collection). A prefork
+                parent passes False, so that it runs no inference before forking the workers.
+        """
+
+        # Check the collection and load its metadata point, symbol table and collection info
+        # at startup so that summary and symbol lookups are memory reads
+        self.check_collection(select_encoder=select_encoder)
+        self.snapshot.preload()
+        print(f"Serving {self.module_name}: {self.collection_stats()}", file=sys.stderr)
 
-        @self.mcp.tool(name = get_module_functions_fn_template.format(module_name = self.module_name),
+        @self._tool(name=f"get_{self.module_name}_summary".format(module_name=self.module_name),
+                       description=f"Get a high level summary of the {self.module_name} module.")
+        async def get_module_summary() -> str:
+            return await asyncio.to_thread(self._get_summary)
+
+        @self._tool(name = search_docstring_fn_template.format(module_name=self.module_name), 
+                    description = search_docstring_desc_template.format(module_name = self.module_name))
+        async def search_module_docstring(query: str, limit: int = 3) -> List[str]:
+            return await self._cached("search_docstring", {"query": query, "limit": limit},
+                                      lambda: self._search_docstring(query, limit))
+        
+        @self._tool(name = search_docstrings_batch_fn_template.format(module_name=self.module_name),
+                       description = search_docstrings_batch_desc_template.format(module_name = self.module_name))
+        async def search_module_docstrings_batch(queries: List[str], limit: int = 3) -> List[Dict[str, Any]]:
+            return await self._cached("search_docstrings_batch", {"queries": queries, "limit": limit},
+                                      lambda: self._search_docstrings_batch(queries, limit))
+        
+        @self._tool(name = get_source_code_fn_template.format(module_name = self.module_name), 
+                       description = get_source_code_desc_template.format(module_name = self.module_name))
+        async def get_module_source_code(name: str, offset: int = 0, outline: bool = False) -> str:
+            source_code = await self._cached("get_source_code", {"name": name, "outline": outline},
+                                             lambda: self._get_source_code(name, outline))
+            return self._page(source_code, offset)
+        
+        @self._tool(name = get_docstring_fn_template.format(module_name = self.module_name), 
+                       description = get_docstring_desc_template.format(module_name = self.module_name))
+        async def get_module_docstring(name: str) -> str:
+            return await self._cached("get_docstring", {"name": name},
+                                      lambda: self._get_docstring(name))
+        
+        @self._tool(name = search_doc_fn_template.format(module_name = self.module_name), 
+                       description = search_docs_desc_template.format(module_name = self.module_name))
+        async def search_module_docs(topic: str, offset: int = 0) -> Dict[str, Any]:
+            doc = await self._cached("search_docs", {"topic": topic},
+                                     lambda: self._search_docs(topic))
+            page, next_offset = paginate(doc['result'], offset, self.max_response_chars)
+            return {**doc, 'result': page, 'next_offset': next_offset}
+
+        @self._tool(name = get_module_functions_fn_template.format(module_name = self.module_name),
                        description = get_module_functions_template.format(module_name = self.module_name))
         async def get_module_functions() -> list:
+            symbols = await asyncio.to_thread(self.snapshot.symbols)
+            if symbols is not None:
+                return list(symbols)
+
+            # Collections built without a symbol table fall back to importing the module
             try:
                 module = importlib.import_module(self.module_name)
                 functions: list[str] = [name for name, obj in vars(module).items() if callable(obj)]
@@ -298,11 +781,108 @@ class ModuleQueryServer:
             except ModuleNotFoundError as e:
                 return [f"Error: {e}"]
                     
+        @self._tool(name = get_related_fn_template.format(module_name = self.module_name),
+                       description = get_related_desc_template.format(module_name = self.module_name))
+        async def get_module_related(name: str) -> Dict[str, Any]:
+            xref = await asyncio.to_thread(self.snapshot.xref)
+            if xref is None:
+                return {'name': name, 'error': f"No cross-reference index for {self.module_name}; rebuild it with create_db."}
+            related = xref.related(name)
+            if related is None:
+                return {'name': name, 'error': f"No references to '{name}' found in {self.module_name} module."}
+            return related
+                    
+        @self._tool(name = complete_name_fn_template.format(module_name = self.module_name),
+                       description = complete_name_desc_template.format(module_name = self.module_name))
+        async def complete_module_name(prefix: str, limit: int = 20) -> List[str]:
+            names = await asyncio.to_thread(self.snapshot.names)
+            return names.complete(prefix, limit)
+
+    def sse_app(self, collect_metrics: Optional[Callable[[], Awaitable[ServerMetrics]]] = None):
+        """
+        Return the Starlette app serving the MCP SSE transport, a Prometheus /metrics endpoint,
+        a /healthz liveness endpoint and a /readyz readiness endpoint.
+
+        Args:
+            collect_metrics: Async callable returning the metrics /metrics renders (defaults to
+                this process's metrics; worker processes pass one that merges all workers)
+        """
+        from starlette.requests import Request
+        from starlette.responses import JSONResponse, PlainTextResponse
+        from starlette.routing import Route
+
+        async def metrics_endpoint(request: Request) -> PlainTextResponse:
+            metrics = await collect_metrics() if collect_metrics is not None else self.metrics
+            return PlainTextResponse(metrics.render_prometheus(),
+                                     media_type="text/plain; version=0.0.4")
+
+        async def health_endpoint(request: Request) -> PlainTextResponse:
+            return PlainTextResponse("ok")
+
+        async def ready_endpoint(request: Request) -> JSONResponse:
+            # Ready once every module is warmed up and its collection is reachable
+            status: Dict[str, Any] = {}
+            for server in self.group:
+                try:
+                    reachable = await asyncio.wait_for(asyncio.to_thread(
+                        server.get_qdrant_client().collection_exists, server.collection_name), timeout=2.0)
+                except Exception:
+                    reachable = False
+                status[server.module_name] = {"warmed_up": server.ready, "collection_reachable": reachable}
+            ready = all(module["warmed_up"] and module["collection_reachable"] for module in status.values())
+            return JSONResponse({"ready": ready, "modules": status}, status_code=200 if ready else 503)
+
+        app = self.mcp.sse_app()
+        app.router.routes.append(Route("/metrics", endpoint=metrics_endpoint, methods=["GET"]))
+        app.router.routes.append(Route("/healthz", endpoint=health_endpoint, methods=["GET"]))
+        app.router.routes.append(Route("/readyz", endpoint=ready_endpoint, methods=["GET"]))
+        return app
+
+    def dump_stats(self, *args: Any):
+        """Print tool metrics and cache statistics to stderr (stdout carries the stdio protocol)."""
+        print(f"Server statistics: {json.dumps(self.metrics_stats(), default=str)}", file=sys.stderr)
+
     def run(self, transport: str = "stdio", port: int = 8000):
-        """Start the MCP server with the specified transport."""
-        if transport == "sse":
-            self.mcp.settings.port = port
-        self.mcp.run(transport=transport) # type: ignore
+        """Start the MCP server with the specified transport, after warming up every module."""
+        for server in self.group:
+            server.warm_up()
+        try:
+            if transport == "sse":
+                import uvicorn
+
+                self.mcp.settings.port = port
+                uvicorn.run(self.sse_app(), host=self.mcp.settings.host, port=port,
+                            log_level=self.mcp.settings.log_level.lower())
+            else:
+                # In stdio mode, statistics are dumped on SIGUSR1 and at shutdown
+                if hasattr(signal, "SIGUSR1"):
+                    signal.signal(signal.SIGUSR1, self.dump_stats)
+                self.mcp.run(transport=transport) # type: ignore
+        finally:
+            self.dump_stats()
+            if self.profiler is not None:
+                self.profiler.write_summary()
+
+def create_module_servers(modules: List[Tuple[str, Optional[str]]], **kwargs) -> List[ModuleQueryServer]:
+    """
+    Create servers for several modules that share one MCP instance, encoder, caches and Qdrant client.
+
+    Args:
+        modules: (module_name, collection_name) pairs; a None collection name defaults to the module name
+        **kwargs: Further ModuleQueryServer arguments, applied to the shared resources
+
+    Returns:
+        One ModuleQueryServer per module. Register tools on each and run the first one.
+    """
+    servers: List[ModuleQueryServer] = []
+    for module_name, collection_name in modules:
+        servers.append(ModuleQueryServer(
+            module_name,
+            collection_name=collection_name,
+            shared_with=servers[0] if servers else None,
+            **kwargs
+        ))
+    return servers
 
 # Example usage
 if __name__ == "__main__":
@@ -317,4 +897,4 @@ if __name__ == "__main__":
     server.register_tools()
 
     # Pass the transport and port arguments to the run method
-    server.run(transport=args.transport, port=args.port)
\ No newline at end of file
+    server.run(transport=args.transport, port=args.port)
@@ -0,0 +1,208 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import CollectionInfo, Record
+
+from .db_utils import TIMESTAMP_FORMAT, string_to_uuid
+from .sparse import SPARSE_VECTOR_NAME
+from .names import NameIndex
+from .projection import Projection
+from .xref import XrefGraph
+
+
+class CollectionSnapshot:
+    """An in-memory view of a collection's metadata point, symbol table, cross-reference graph and statistics.
+
+    The snapshot is tied to the collection version, the build ID that create_db writes to
+    the metadata point. The version is re-read at most every `check_interval` seconds;
+    everything else is loaded once and reloaded only after the version changes.
+    """
+
+    # Seconds between writes of the last query time to the metadata point
+    usage_write_interval: float = 3600.0
+
+    def __init__(self, get_client: Callable[[], QdrantClient], collection_name: str,
+                 check_interval: float = 5.0):
+        """Initialize the CollectionSnapshot instance.
+
+        Args:
+            get_client: Callable returning the Qdrant client to use
+            collection_name: Name of the Qdrant collection
+            check_interval: Seconds between checks of the collection version
+        """
+        self.get_client = get_client
+        self.collection_name = collection_name
+        self.check_interval = check_interval
+        self._on_change: List[Callable[[], None]] = []
+        self._version: Optional[str] = None
+        self._checked_at = float('-inf')
+        self._metadata: Optional[Dict[str, Any]] = None
+        self._info: Optional[CollectionInfo] = None
+        self._symbols: Optional[Dict[str, Dict[str, Any]]] = None
+        self._symbols_loaded = False
+        self._names: NameIndex = NameIndex([])
+        self._xref: Optional[XrefGraph] = None
+        self._xref_loaded = False
+        self._projections: Dict[Optional[str], Optional[Projection]] = {}
+        self._usage_written_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def on_change(self, callback: Callable[[], None]):
+        """Register a callback run whenever the collection version changes."""
+        self._on_change.append(callback)
+
+    def _retrieve(self, point_name: str, with_payload: Any = True) -> Optional[Dict[str, Any]]:
+        """Return the payload of a named point, or None if it does not exist."""
+        records: list[Record] = self.get_client().retrieve(
+            collection_name=self.collection_name,
+            ids=[string_to_uuid(point_name)],
+            with_payload=with_payload
+        )
+        return (records[0].payload or {}) if records else None
+
+    def version(self) -> Optional[str]:
+        """Return the build ID (or creation time) of the collection, rechecking it periodically."""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._version
+
+        try:
+            payload = self._retrieve("readme", with_payload=["build_id", "created_at"]) or {}
+        except Exception:
+            # A transient Qdrant error is not a new version: keep serving the last known one
+            with self._lock:
+                self._checked_at = now
+                return self._version
+        version = payload.get("build_id") or payload.get("created_at")
+
+        with self._lock:
+            changed = version != self._version
+            if changed:
+                self._version = version
+                self._metadata = None
+                self._info = None
+                self._symbols_loaded = False
+                self._xref_loaded = False
+                self._projections = {}
+            self._checked_at = now
+        if changed:
+            for callback in self._on_change:
+                callback()
+        return version
+
+    def mark_queried(self):
+        """Record in the metadata point that the collection is in use, at most once per interval.
+
+        clean_db uses the last query time to drop collections nobody queries. The write runs
+        in a background thread, so tool calls do not wait for it.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._usage_written_at < self.usage_write_interval:
+                return
+            self._usage_written_at = now
+        threading.Thread(target=self._write_last_queried, daemon=True).start()
+
+    def _write_last_queried(self):
+        """Write the current time as last_queried_at to the metadata point."""
+        try:
+            self.get_client().set_payload(
+                collection_name=self.collection_name,
+                payload={"last_queried_at": time.strftime(TIMESTAMP_FORMAT)},
+                points=[string_to_uuid("readme")],
+            )
+        except Exception:
+            # Usage tracking is best effort; retry at the next interval
+            self._usage_written_at = float('-inf')
+
+    def metadata(self) -> Dict[str, Any]:
+        """Return the payload of the metadata point (README, repository and build info)."""
+        self.version()
+        if self._metadata is None:
+            self._metadata = self._retrieve("readme") or {}
+        return self._metadata
+
+    def info(self) -> CollectionInfo:
+        """Return the Qdrant collection info (configuration and point counts)."""
+        self.version()
+        if self._info is None:
+            self._info = self.get_client().get_collection(self.collection_name)
+        return self._info
+
+    def symbols(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Return the public symbol table keyed by name, or None if the collection has none."""
+        self.version()
+        if not self._symbols_loaded:
+            payload = self._retrieve("symbols")
+            self._symbols = {symbol["name"]: symbol for symbol in payload["symbols"]} if payload else None
+            # Collections built before names were stored only know their public symbols
+            self._names = NameIndex(payload.get("names") or self._symbols) if payload else NameIndex([])
+            self._symbols_loaded = True
+        return self._symbols
+
+    def names(self) -> NameIndex:
+        """Return the trie of all function and class names for completion and fuzzy lookups."""
+        self.symbols()
+        return self._names
+
+    def xref(self) -> Optional[XrefGraph]:
+        """Return the cross-reference graph, or None if the collection has none."""
+        self.version()
+        if not self._xref_loaded:
+            payload = self._retrieve("xref")
+            # Indexes built before definitions were keyed by module are not loaded
+            self._xref = XrefGraph(payload["index"]) if payload and "definitions" in payload["index"] else None
+            self._xref_loaded = True
+        return self._xref
+
+    def encoders(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Return the encoder records of the named dense vectors, or None if the collection has one unnamed vector."""
+        return self.metadata().get("encoders") or None
+
+    def projection(self, vector_name: Optional[str] = None) -> Optional[Projection]:
+        """Return the PCA projection a dense vector was reduced with (the unnamed one by default), or None."""
+        self.version()
+        if vector_name not in self._projections:
+            if vector_name is None:
+                payload = self.metadata().get("projection")
+            else:
+                payload = (self.encoders() or {}).get(vector_name, {}).get("projection")
+            self._projections[vector_name] = Projection.from_payload(payload)
+        return self._projections[vector_name]
+
+    def has_sparse_vectors(self) -> bool:
+        """Return whether the collection stores lexical sparse vectors for hybrid search."""
+        try:
+            return SPARSE_VECTOR_NAME in (self.info().config.params.sparse_vectors or {})
+        except Exception:
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        """Return point counts and build information of the collection."""
+        metadata = self.metadata()
+        info = self.info()
+        return {
+            'collection': self.collection_name,
+            'build_id': metadata.get('build_id'),
+            'created_at': metadata.get('created_at'),
+            'source_commit': metadata.get('source_commit'),
+            'repository': metadata.get('repository'),
+            'total_docs': metadata.get('total_docs'),
+            'points_count': info.points_count,
+            'indexed_vectors_count': info.indexed_vectors_count,
+            'segments_count': info.segments_count,
+            'hybrid_search': self.has_sparse_vectors(),
+            'encoders': {name: {'model': record.get('model'), 'dims': record.get('dims')}
+                         for name, record in (self.encoders() or {}).items()},
+            'symbols': len(self.symbols() or {}),
+            'xref': self.xref() is not None,
+        }
+
+    def preload(self):
+        """Load the metadata point, collection info, symbol table and cross-reference graph into memory."""
+        self.metadata()
+        self.info()
+        self.symbols()
+        self.xref()
@@ -0,0 +1,66 @@
+import re
+import zlib
+from collections import Counter
+from typing import List
+
+from qdrant_client import models
+
+# Name of the sparse lexical vector stored next to the dense embedding of each point
+SPARSE_VECTOR_NAME = "lexical"
+
+# BM25 term frequency saturation and document length normalization parameters.
+# The inverse document frequency is applied by Qdrant through the IDF modifier.
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|[0-9]+")
+_SUBWORD_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase lexical tokens.
+
+    Identifiers are kept whole (e.g. 'loadobj', 'load_obj') and are also split on
+    underscores and camel case, so 'loadObj' matches both 'loadobj' and 'obj'.
+    """
+    tokens = []
+    for word in _WORD_RE.findall(text):
+        tokens.append(word.lower())
+        parts = _SUBWORD_RE.findall(word)
+        if len(parts) > 1:
+            tokens.extend(part.lower() for part in parts)
+    return tokens
+
+
+def token_index(token: str) -> int:
+    """Map a token to a stable sparse vector index."""
+    return zlib.crc32(token.encode('utf-8'))
+
+
+def document_sparse_vectors(texts: List[str]) -> List[models.SparseVector]:
+    """Build BM25-weighted sparse vectors for a corpus of documents.
+
+    Args:
+        texts: Lexical text of each document (name, header, signature)
+
+    Returns:
+        One sparse vector per document
+    """
+    counts = [Counter(token_index(token) for token in tokenize(text)) for text in texts]
+    lengths = [sum(count.values()) for count in counts]
+    avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+    vectors = []
+    for count, length in zip(counts, lengths):
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length) if avg_length else BM25_K1
+        vectors.append(models.SparseVector(
+            indices=list(count.keys()),
+            values=[tf * (BM25_K1 + 1) / (tf + norm) for tf in count.values()],
+        ))
+    return vectors
+
+
+def query_sparse_vector(text: str) -> models.SparseVector:
+    """Build the sparse vector of a query, with one unit weight per distinct token."""
+    indices = sorted({token_index(token) for token in tokenize(text)})
+    return models.SparseVector(indices=indices, values=[1.0] * len(indices))
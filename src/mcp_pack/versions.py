@@ -0,0 +1,124 @@
+import re
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from qdrant_client import QdrantClient, models
+
+# Collection versions are named '<alias>__v<build ID>', with build IDs sorting by build time
+VERSION_SEPARATOR = '__v'
+_VERSION_PATTERN = re.compile(rf'^(?P<name>.+){re.escape(VERSION_SEPARATOR)}(?P<build_id>\d{{14}}_[0-9a-f]{{8}})$')
+
+
+def new_build_id() -> str:
+    """Return a unique build ID that sorts by build time ('20261018093000_1f2e3d4c')."""
+    return f"{time.strftime('%Y%m%d%H%M%S', time.gmtime())}_{uuid.uuid4().hex[:8]}"
+
+
+def versioned_name(name: str, build_id: str) -> str:
+    """Return the name of the collection holding one build of a module."""
+    return f'{name}{VERSION_SEPARATOR}{build_id}'
+
+
+def split_versioned_name(collection_name: str) -> Optional[tuple[str, str]]:
+    """Return the alias name and build ID of a versioned collection, or None for other collections."""
+    match = _VERSION_PATTERN.match(collection_name)
+    return (match['name'], match['build_id']) if match else None
+
+
+def alias_targets(client: QdrantClient) -> Dict[str, str]:
+    """Return the collection each alias points to."""
+    return {alias.alias_name: alias.collection_name for alias in client.get_aliases().aliases}
+
+
+def list_versions(client: QdrantClient, name: str) -> List[str]:
+    """Return the versioned collections of a module, oldest first."""
+    versions = []
+    for collection in client.get_collections().collections:
+        parts = split_versioned_name(collection.name)
+        if parts and parts[0] == name:
+            versions.append(collection.name)
+    return sorted(versions)
+
+
+def module_names(client: QdrantClient) -> List[str]:
+    """Return the names that servers query: aliases and unversioned collections."""
+    unversioned = [collection.name for collection in client.get_collections().collections
+                   if split_versioned_name(collection.name) is None]
+    return sorted(set(alias_targets(client)) | set(unversioned))
+
+
+def wait_until_indexed(client: QdrantClient, collection_name: str, timeout: float = 300.0,
+                       interval: float = 0.5) -> bool:
+    """Wait until Qdrant has finished optimizing a collection, so that it serves at full speed.
+
+    Returns:
+        True if no optimization is running, False if the timeout expired first
+
+    Raises:
+        RuntimeError: If Qdrant reports the collection as failed
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        status = client.get_collection(collection_name).status
+        if status == models.CollectionStatus.RED:
+            raise RuntimeError(f"Qdrant failed to optimize collection '{collection_name}'")
+        if status != models.CollectionStatus.YELLOW:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+
+def switch_alias(client: QdrantClient, name: str, collection_name: str) -> Optional[str]:
+    """Point the alias of a module at a new collection version in one atomic operation.
+
+    Queries issued through the alias see either the previous or the new version, never
+    neither. A plain collection named like the alias, as created before versioning, is
+    deleted first, since an alias cannot shadow a collection; that one switch is not atomic.
+
+    Args:
+        client: Qdrant client
+        name: Alias that servers query (the module's collection name)
+        collection_name: Collection version the alias should point to
+
+    Returns:
+        The collection the alias pointed to before, if any
+    """
+    previous = alias_targets(client).get(name)
+    if previous is None and client.collection_exists(name):
+        print(f"Replacing unversioned collection '{name}' with alias '{name}' -> '{collection_name}'")
+        client.delete_collection(name)
+
+    operations: List[models.AliasOperations] = []
+    if previous is not None:
+        operations.append(models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=name)))
+    operations.append(models.CreateAliasOperation(
+        create_alias=models.CreateAlias(collection_name=collection_name, alias_name=name)))
+    client.update_collection_aliases(change_aliases_operations=operations)
+    return previous
+
+
+def prune_versions(client: QdrantClient, name: str, keep: int = 2, dry_run: bool = False) -> List[str]:
+    """Delete old collection versions of a module.
+
+    The newest keep versions are kept, so that the previous build remains available for a
+    rollback and for queries that started before the switch. The version the alias points
+    to is never deleted.
+
+    Args:
+        client: Qdrant client
+        name: Alias of the module
+        keep: Number of most recent versions to keep (at least 1)
+        dry_run: Only return the collections that would be deleted
+
+    Returns:
+        Names of the deleted collections
+    """
+    live = alias_targets(client).get(name)
+    versions = list_versions(client, name)
+    stale = [version for version in versions[:-max(keep, 1)] if version != live]
+    if not dry_run:
+        for version in stale:
+            client.delete_collection(version)
+    return stale
@@ -0,0 +1,286 @@
+import asyncio
+import gc
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from .metrics import ServerMetrics
+    from .server import ModuleQueryServer
+
+# Workers that exit sooner than this after starting are restarted with a delay
+MIN_WORKER_UPTIME = 1.0
+
+# Response headers not copied when relaying a forwarded message
+HOP_BY_HOP_HEADERS = ('connection', 'content-length', 'keep-alive', 'transfer-encoding')
+
+# Path of the JSON snapshot of one worker's metrics, which /metrics merges across workers
+WORKER_METRICS_PATH = "/metrics/worker"
+
+# Seconds /metrics waits for the metrics of each other worker
+METRICS_TIMEOUT = 2.0
+
+
+def message_path(index: int) -> str:
+    """Return the path where worker index receives the messages of its SSE sessions."""
+    return f"/w{index}/messages/"
+
+
+def _forwarder(socket_path: str, path: str):
+    """Return an ASGI app that relays session messages to the worker listening on socket_path."""
+    import httpx
+    from starlette.requests import Request
+    from starlette.responses import Response
+
+    client = httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(uds=socket_path), base_url="http://worker")
+
+    async def forward(scope, receive, send):
+        request = Request(scope, receive)
+        try:
+            response = await client.post(
+                f"{path}?{scope.get('query_string', b'').decode()}",
+                content=await request.body(),
+                headers={"content-type": request.headers.get("content-type", "application/json")}
+            )
+            relayed = Response(response.content, status_code=response.status_code,
+                               headers={k: v for k, v in response.headers.items()
+                                        if k.lower() not in HOP_BY_HOP_HEADERS})
+        except httpx.TransportError:
+            relayed = Response("Worker unavailable", status_code=503)
+        await relayed(scope, receive, send)
+
+    return forward
+
+
+def _metrics_collector(metrics: "ServerMetrics", socket_paths: List[str], index: int):
+    """Return an async callable merging the metrics of this worker with those of the others.
+
+    Prometheus scrapes reach an arbitrary worker through the shared port, so every worker
+    renders the sum over all workers. Workers that do not answer in time are left out, and
+    the counts of a restarted worker start again from zero.
+    """
+    import httpx
+    from .metrics import ServerMetrics
+
+    clients = [httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(uds=path), base_url="http://worker",
+                                 timeout=METRICS_TIMEOUT)
+               for other, path in enumerate(socket_paths) if other != index]
+
+    async def fetch(client) -> Optional[Dict]:
+        try:
+            response = await client.get(WORKER_METRICS_PATH)
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPError, ValueError):
+            return None
+
+    async def collect() -> "ServerMetrics":
+        merged = ServerMetrics()
+        merged.merge(metrics.snapshot())
+        for snapshot in await asyncio.gather(*(fetch(client) for client in clients)):
+            if snapshot is not None:
+                merged.merge(snapshot)
+        return merged
+
+    return collect
+
+
+class PreforkServer:
+    """Serves the SSE transport from several worker processes that share one listening port.
+
+    The servers (and with them the encoder and the preloaded collection snapshots) are
+    created in the parent, so forked workers share the model weights copy-on-write. An
+    SSE session lives in the worker that accepted its stream; messages posted to another
+    worker are forwarded to it over a per-worker Unix socket. /metrics, served by whichever
+    worker accepts the scrape, merges the metrics of all workers over the same sockets.
+    Workers that exit are restarted, and SIGHUP restarts them one at a time.
+    """
+
+    def __init__(self, build_servers: Callable[[], List["ModuleQueryServer"]], workers: int,
+                 port: int = 8000, host: Optional[str] = None, preload: bool = True,
+                 graceful_timeout: float = 10.0):
+        """Initialize the PreforkServer instance.
+
+        Args:
+            build_servers: Callable creating the servers, with tools registered; the first one is run
+            workers: Number of worker processes
+            port: Port to listen on
+            host: Host to listen on (defaults to the FastMCP host setting)
+            preload: Whether to create the servers once in the parent instead of in every worker
+            graceful_timeout: Seconds a stopping worker waits for open connections to close
+        """
+        self.build_servers = build_servers
+        self.workers = workers
+        self.port = port
+        self.host = host
+        self.preload = preload
+        self.graceful_timeout = graceful_timeout
+        self.servers: Optional[List["ModuleQueryServer"]] = None
+        self._pids: Dict[int, int] = {}
+        self._started_at: Dict[int, float] = {}
+        self._sockets: List[socket.socket] = []
+        self._socket_paths: List[str] = []
+        self._listener: Optional[socket.socket] = None
+        self._stopping = False
+        self._restart_requested = False
+
+    def _bind(self, host: str):
+        """Create the shared listening socket and the per-worker Unix sockets."""
+        self._listener = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind((host, self.port))
+        self._listener.listen(2048)
+
+        run_dir = tempfile.mkdtemp(prefix="mcp_pack-")
+        for index in range(self.workers):
+            path = os.path.join(run_dir, f"w{index}.sock")
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.bind(path)
+            sock.listen(2048)
+            self._sockets.append(sock)
+            self._socket_paths.append(path)
+
+    def _spawn(self, index: int):
+        """Fork worker index."""
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                self._worker_main(index)
+                code = 0
+            except BaseException as e:
+                print(f"Worker {index} failed: {e}", file=sys.stderr)
+            finally:
+                os._exit(code)
+        self._pids[index] = pid
+        self._started_at[index] = time.monotonic()
+
+    def _worker_main(self, index: int):
+        """Serve the SSE transport in worker index until it is told to stop."""
+        import uvicorn
+        from starlette.requests import Request
+        from starlette.responses import JSONResponse
+        from starlette.routing import Mount, Route
+
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, signal.SIG_DFL)
+
+        servers = self.servers if self.servers is not None else self.build_servers()
+        # Connections inherited from the parent must not be shared between processes
+        for server in servers:
+            server.reopen_qdrant_client(servers[0] if server is not servers[0] else None)
+        # Warm up after the fork: kernel thread pools started in the parent would not survive it
+        for server in servers:
+            server.warm_up()
+
+        server = servers[0]
+        server.mcp.settings.message_path = message_path(index)
+        app = server.sse_app(collect_metrics=_metrics_collector(server.metrics, self._socket_paths, index))
+
+        async def worker_metrics(request: Request) -> JSONResponse:
+            return JSONResponse(server.metrics.snapshot())
+
+        app.router.routes.append(Route(WORKER_METRICS_PATH, endpoint=worker_metrics, methods=["GET"]))
+        for other, path in enumerate(self._socket_paths):
+            if other != index:
+                app.router.routes.append(Mount(message_path(other), app=_forwarder(path, message_path(other))))
+
+        config = uvicorn.Config(app, log_level=server.mcp.settings.log_level.lower(),
+                                timeout_graceful_shutdown=int(self.graceful_timeout))
+        print(f"Worker {index} (pid {os.getpid()}) serving", file=sys.stderr)
+        try:
+            uvicorn.Server(config).run(sockets=[self._listener, self._sockets[index]])
+        finally:
+            server.dump_stats()
+            if server.profiler is not None:
+                server.profiler.write_summary()
+
+    def _stop_worker(self, index: int):
+        """Stop worker index gracefully and wait for it to exit."""
+        pid = self._pids.pop(index, None)
+        if pid is None:
+            return
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while time.monotonic() < deadline:
+            if os.waitpid(pid, os.WNOHANG)[0]:
+                return
+            time.sleep(0.1)
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+
+    def _reap(self):
+        """Restart workers that exited."""
+        while self._pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            index = next((i for i, worker_pid in self._pids.items() if worker_pid == pid), None)
+            if index is None:
+                continue
+            del self._pids[index]
+            if self._stopping:
+                continue
+            print(f"Worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}, restarting", file=sys.stderr)
+            if time.monotonic() - self._started_at[index] < MIN_WORKER_UPTIME:
+                time.sleep(MIN_WORKER_UPTIME)
+            self._spawn(index)
+
+    def _on_signal(self, signum: int, frame):
+        """Handle SIGHUP by restarting the workers and SIGINT/SIGTERM by stopping."""
+        if signum == signal.SIGHUP:
+            self._restart_requested = True
+        else:
+            self._stopping = True
+
+    def run(self):
+        """Start the workers and supervise them until SIGINT or SIGTERM."""
+        if self.preload:
+            # Load the encoder and collection snapshots once; workers share them copy-on-write
+            self.servers = self.build_servers()
+            settings = self.servers[0].mcp.settings
+        else:
+            from mcp.server.fastmcp.server import Settings
+            settings = Settings()
+        self._bind(self.host or settings.host)
+
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self._on_signal)
+        # Keep the garbage collector from touching (and so copying) objects loaded before the fork
+        gc.freeze()
+        try:
+            for index in range(self.workers):
+                self._spawn(index)
+            print(f"Serving SSE on {self.host or settings.host}:{self.port} with {self.workers} workers "
+                  f"(parent pid {os.getpid()}, SIGHUP restarts the workers)", file=sys.stderr)
+
+            while not self._stopping:
+                if self._restart_requested:
+                    self._restart_requested = False
+                    for index in range(self.workers):
+                        self._stop_worker(index)
+                        if self._stopping:
+                            break
+                        self._spawn(index)
+                self._reap()
+                time.sleep(0.2)
+        finally:
+            self._stopping = True
+            for index in list(self._pids):
+                self._stop_worker(index)
+            for sock in [self._listener, *self._sockets]:
+                if sock is not None:
+                    sock.close()
+            if self._socket_paths:
+                shutil.rmtree(os.path.dirname(self._socket_paths[0]), ignore_errors=True)
@@ -0,0 +1,308 @@
+import ast
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+# Nodes whose bodies belong to their own documentation item
+_DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+# Kinds of references: a name of the enclosing module (or of a star import), an absolute
+# dotted path reached through an import, and an attribute of self/cls or of super()
+LOCAL, IMPORT, SELF, SUPER = 'local', 'import', 'self', 'super'
+
+# Maximum number of candidates listed for an ambiguous name
+MAX_CANDIDATES = 20
+
+# Fields analyze_python_file records for build_xref_index; the index replaces them once built
+REFERENCE_FIELDS = ('calls', 'bases', 'imports', 'star_imports')
+
+
+def module_path(file_path: str) -> str:
+    """Return the dotted module path of a repository file ('src/sciris/sc_utils.py' -> 'sciris.sc_utils')."""
+    parts = (file_path[:-3] if file_path.endswith('.py') else file_path).split('/')
+    if parts[0] == 'src' and len(parts) > 1:
+        parts = parts[1:]
+    if parts[-1] == '__init__':
+        parts = parts[:-1]
+    return '.'.join(parts)
+
+
+def import_table(tree: ast.AST, module: str, is_package: bool = False) -> Tuple[Dict[str, str], List[str]]:
+    """Return the absolute dotted path each imported name refers to, and the star-imported modules.
+
+    Args:
+        tree: Parsed module
+        module: Dotted path of the module, for resolving relative imports
+        is_package: Whether the module is a package __init__
+
+    Returns:
+        A map from each local name to what it was imported as (`from .utils import wma as w`
+        in sciris.sc_math maps 'w' to 'sciris.utils.wma'; `import numpy as np` maps 'np' to
+        'numpy'), and the modules imported with `from ... import *`
+    """
+    package = module if is_package else module.rpartition('.')[0]
+    table: Dict[str, str] = {}
+    stars: List[str] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    table[alias.asname] = alias.name
+                else:
+                    # `import a.b` binds 'a'
+                    first = alias.name.split('.')[0]
+                    table[first] = first
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ''
+            if node.level:
+                parents = package.split('.') if package else []
+                parents = parents[:len(parents) - node.level + 1] if node.level > 1 else parents
+                base = '.'.join(filter(None, ['.'.join(parents), base]))
+            for alias in node.names:
+                if alias.name == '*':
+                    stars.append(base)
+                else:
+                    table[alias.asname or alias.name] = f'{base}.{alias.name}' if base else alias.name
+    return table, stars
+
+
+def _own_nodes(node: ast.AST) -> Iterator[ast.AST]:
+    """Walk the body of a definition without descending into nested definitions."""
+    stack = list(ast.iter_child_nodes(node))
+    while stack:
+        child = stack.pop()
+        if isinstance(child, _DEFINITIONS):
+            # Decorators and base classes of a nested definition are evaluated in this scope
+            stack.extend(child.decorator_list)
+            if isinstance(child, ast.ClassDef):
+                stack.extend(child.bases)
+            continue
+        yield child
+        stack.extend(ast.iter_child_nodes(child))
+
+
+def _dotted(node: ast.AST) -> Optional[List[str]]:
+    """Return the parts of a dotted name ('np.linalg.norm'), with 'super()' for a super() receiver."""
+    parts: List[str] = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+    elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'super':
+        parts.append('super()')
+    else:
+        return None
+    return parts[::-1]
+
+
+def _reference(node: ast.AST, table: Dict[str, str]) -> Optional[List[str]]:
+    """Return the kind and path of the definition an expression may name, or None if its receiver is unknown."""
+    parts = _dotted(node)
+    if not parts:
+        return None
+    head, rest = parts[0], parts[1:]
+    if head in ('self', 'cls'):
+        return [SELF, rest[0]] if len(rest) == 1 else None
+    if head == 'super()':
+        return [SUPER, rest[0]] if len(rest) == 1 else None
+    if head in table:
+        return [IMPORT, '.'.join([table[head], *rest])]
+    # A module-level name, or a method of one ('Sim.run'); attributes of variables are dropped at resolution
+    return [LOCAL, '.'.join(parts)] if len(parts) <= 2 else None
+
+
+def extract_references(node: ast.AST, table: Dict[str, str]) -> Tuple[List[List[str]], List[List[str]]]:
+    """Return the references called by a function or class body and those of its base classes.
+
+    Each reference is a [kind, path] pair, resolved to a definition by build_xref_index.
+    Calls of attributes of other objects (`d.update()`, `self.sim.run()`) are left out,
+    since their target cannot be known without types.
+    """
+    calls = {tuple(reference) for child in _own_nodes(node) if isinstance(child, ast.Call)
+             for reference in [_reference(child.func, table)] if reference}
+    bases = []
+    if isinstance(node, ast.ClassDef):
+        bases = [reference or [LOCAL, ast.unparse(base)] for base in node.bases
+                 for reference in [_reference(base, table)]]
+    return sorted(list(call) for call in calls), bases
+
+
+class _Resolver:
+    """Resolves references of analyzed documentation items to definition IDs ('module.qualname')."""
+
+    def __init__(self, code_docs: List[Dict[str, Any]]):
+        self.ids: Dict[str, Dict[str, Any]] = {}
+        self.by_qualname: Dict[str, List[str]] = defaultdict(list)
+        for doc in code_docs:
+            definition_id = self.id_of(doc)
+            self.ids.setdefault(definition_id, doc)
+            self.by_qualname[self.qualname(doc)].append(definition_id)
+        self.bases: Dict[str, List[str]] = {}
+        for definition_id, doc in self.ids.items():
+            if doc['type'] == 'class':
+                self.bases[definition_id] = [base for base in map(lambda ref: self.resolve(doc, ref), doc.get('bases', []))
+                                             if base in self.ids]
+
+    @staticmethod
+    def qualname(doc: Dict[str, Any]) -> str:
+        """Return the qualified name of a definition within its module."""
+        return doc.get('qualname') or doc['name']
+
+    @classmethod
+    def id_of(cls, doc: Dict[str, Any]) -> str:
+        """Return the ID of a definition: its module path and qualified name."""
+        module = module_path(doc['file'])
+        return f"{module}.{cls.qualname(doc)}" if module else cls.qualname(doc)
+
+    def absolute(self, path: str) -> Optional[str]:
+        """Resolve an absolute dotted path, including re-exports of a package ('sciris.odict')."""
+        if path in self.ids:
+            return path
+        parts = path.split('.')
+        for split in range(len(parts) - 1, 0, -1):
+            package, qualname = '.'.join(parts[:split]), '.'.join(parts[split:])
+            candidates = [definition_id for definition_id in self.by_qualname.get(qualname, [])
+                          if definition_id.startswith(package + '.')]
+            if len(candidates) == 1:
+                return candidates[0]
+            if candidates:
+                return None
+        return None
+
+    def member(self, class_id: str, attr: str, seen: Optional[Set[str]] = None) -> Optional[str]:
+        """Resolve an attribute of a class, looking through its base classes in the repository."""
+        seen = seen if seen is not None else set()
+        if class_id in seen:
+            return None
+        seen.add(class_id)
+        if f'{class_id}.{attr}' in self.ids:
+            return f'{class_id}.{attr}'
+        for base in self.bases.get(class_id, []):
+            found = self.member(base, attr, seen)
+            if found:
+                return found
+        return None
+
+    def enclosing_class(self, doc: Dict[str, Any]) -> Optional[str]:
+        """Return the ID of the innermost class a definition is nested in."""
+        module_id = self.id_of(doc)[:-len(self.qualname(doc))]
+        parts = self.qualname(doc).split('.')[:-1]
+        while parts:
+            candidate = module_id + '.'.join(parts)
+            if self.ids.get(candidate, {}).get('type') == 'class':
+                return candidate
+            parts.pop()
+        return None
+
+    def resolve(self, doc: Dict[str, Any], reference: List[str]) -> Optional[str]:
+        """Resolve a reference made by a definition to a definition ID, or None."""
+        kind, path = reference
+        if kind == IMPORT:
+            return self.absolute(path)
+        if kind in (SELF, SUPER):
+            class_id = self.enclosing_class(doc)
+            if class_id is None:
+                return None
+            if kind == SELF:
+                return self.member(class_id, path)
+            return next(filter(None, (self.member(base, path) for base in self.bases.get(class_id, []))), None)
+
+        head, _, attr = path.partition('.')
+        module = self.id_of(doc)[:-len(self.qualname(doc)) - 1]
+        scopes = [module, *doc.get('star_imports', [])]
+        for scope in scopes:
+            target = self.absolute(f'{scope}.{head}' if scope else head)
+            if target is None:
+                continue
+            if not attr:
+                return target
+            if self.ids[target]['type'] == 'class':
+                return self.member(target, attr)
+            return None
+        return None
+
+
+def build_xref_index(docs: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Build the cross-reference index of the functions and classes of a repository.
+
+    Definitions are identified by module path and qualified name ('sciris.sc_odict.odict.keys').
+    Calls are resolved through the imports of their module, `self`/`cls`/`super()` and star
+    imports; calls that do not resolve to a definition in the repository are dropped.
+
+    Args:
+        docs: Analyzed documentation items with 'calls', 'bases', 'imports' and 'star_imports'
+
+    Returns:
+        The qualified name of every definition, and maps from definition ID to its callees,
+        callers, base classes, direct subclasses and the files that import it
+    """
+    code_docs = [doc for doc in docs if doc.get('type') in ('function', 'class')]
+    resolver = _Resolver(code_docs)
+
+    index: Dict[str, Dict[str, Set[str]]] = {
+        key: defaultdict(set) for key in ('callees', 'callers', 'bases', 'subclasses', 'imported_by')
+    }
+    for definition_id, doc in resolver.ids.items():
+        for reference in doc.get('calls', []):
+            callee = resolver.resolve(doc, reference)
+            if callee is not None and callee != definition_id:
+                index['callees'][definition_id].add(callee)
+                index['callers'][callee].add(definition_id)
+        for reference in doc.get('bases', []):
+            base = resolver.resolve(doc, reference)
+            index['bases'][definition_id].add(base or reference[1])
+            if base is not None:
+                index['subclasses'][base].add(definition_id)
+
+    files_seen: Set[str] = set()
+    for doc in code_docs:
+        if doc['file'] in files_seen:
+            continue
+        files_seen.add(doc['file'])
+        for path in doc.get('imports', []):
+            imported = resolver.absolute(path)
+            if imported is not None:
+                index['imported_by'][imported].add(doc['file'])
+
+    return {
+        'definitions': {definition_id: resolver.qualname(doc) for definition_id, doc in resolver.ids.items()},
+        **{key: {name: sorted(values) for name, values in entries.items()} for key, entries in index.items()},
+    }
+
+
+class XrefGraph:
+    """In-memory cross-reference graph answering callers, callees and class hierarchy of a definition."""
+
+    def __init__(self, index: Dict[str, Dict[str, Any]]):
+        self.index = index
+        self.definitions: Dict[str, str] = index.get('definitions', {})
+
+    def find(self, name: str) -> List[str]:
+        """Return the IDs of the definitions a name refers to.
+
+        The name is matched as a full ID ('sciris.sc_odict.odict'), then as a qualified
+        name within a module ('odict', 'Sim.run'), then as a dotted suffix of IDs
+        ('sc_odict.odict').
+        """
+        if name in self.definitions:
+            return [name]
+        matches = sorted(definition_id for definition_id, qualname in self.definitions.items() if qualname == name)
+        if matches:
+            return matches
+        return sorted(definition_id for definition_id in self.definitions if definition_id.endswith('.' + name))
+
+    def related(self, name: str) -> Dict[str, Any] | None:
+        """Return the callers, callees, base classes, subclasses and importing files of a definition.
+
+        Returns None if no definition has the name. For a name shared by several definitions
+        ('__init__'), returns their IDs as 'candidates' instead, to be looked up one by one.
+        """
+        matches = self.find(name)
+        if not matches:
+            return None
+        if len(matches) > 1:
+            return {'name': name, 'candidates': matches[:MAX_CANDIDATES], 'more_candidates': max(len(matches) - MAX_CANDIDATES, 0)}
+        definition_id = matches[0]
+        related = {key: self.index.get(key, {}).get(definition_id, []) for key in
+                   ('callers', 'callees', 'bases', 'subclasses', 'imported_by')}
+        return {'name': definition_id, **related}
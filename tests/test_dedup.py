@@ -0,0 +1,104 @@
+"""Check which definitions create_db merges as duplicates before embedding them."""
+
+import textwrap
+
+import pytest
+
+pytest.importorskip("qdrant_client")
+pytest.importorskip("dotenv")
+
+from mcp_pack.create_db import GitModuleHelpDB  # noqa: E402
+from mcp_pack.dedup import deduplicate  # noqa: E402
+
+# An abstract method and its override share the docstring, as in requests.adapters
+ADAPTERS = textwrap.dedent('''
+    class BaseAdapter:
+        """The Base Transport Adapter"""
+
+        def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+            """Sends PreparedRequest object. Returns Response object.
+
+            :param request: The :class:`PreparedRequest <PreparedRequest>` being sent.
+            :param stream: (optional) Whether to stream the request content.
+            :param timeout: (optional) How long to wait for the server to send data before giving up.
+            """
+            raise NotImplementedError
+
+
+    class HTTPAdapter(BaseAdapter):
+        """The built-in HTTP Adapter for urllib3."""
+
+        def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+            """Sends PreparedRequest object. Returns Response object.
+
+            :param request: The :class:`PreparedRequest <PreparedRequest>` being sent.
+            :param stream: (optional) Whether to stream the request content.
+            :param timeout: (optional) How long to wait for the server to send data before giving up.
+            """
+            conn = self.get_connection_with_tls_context(request, verify, proxies=proxies, cert=cert)
+            self.cert_verify(conn, request.url, verify, cert)
+            url = self.request_url(request, proxies)
+            resp = conn.urlopen(method=request.method, url=url, body=request.body, retries=self.max_retries)
+            return self.build_response(request, resp)
+''')
+
+# Two names for one implementation, as in requests.models
+MODELS = textwrap.dedent('''
+    class Response:
+        """The Response object, which contains a server's response to an HTTP request."""
+
+        def __bool__(self):
+            """Returns True if :attr:`status_code` is less than 400.
+
+            This attribute checks if the status code of the response is between
+            400 and 600 to see if there was a client error or a server error.
+            """
+            return self.ok
+
+        def __nonzero__(self):
+            """Returns True if :attr:`status_code` is less than 400.
+
+            This attribute checks if the status code of the response is between
+            400 and 600 to see if there was a client error or a server error.
+            """
+            return self.ok
+''')
+
+
+def _analyze(files: dict) -> list:
+    """Return the definitions create_db extracts from the given {path: source} files."""
+    db = GitModuleHelpDB.__new__(GitModuleHelpDB)
+    db._get_github_file_content = lambda owner, repo, path: files[path]
+    return [doc for path in files for doc in db.analyze_python_file('psf', 'requests', path)]
+
+
+def _qualnames(docs: list) -> set:
+    return {doc['qualname'] for doc in docs}
+
+
+def test_override_and_base_method_both_survive():
+    docs, counts = deduplicate(_analyze({'src/requests/adapters.py': ADAPTERS}))
+
+    assert {'BaseAdapter.send', 'HTTPAdapter.send'} <= _qualnames(docs)
+    assert counts['near'] == 0
+    override = next(doc for doc in docs if doc['qualname'] == 'HTTPAdapter.send')
+    assert 'build_response' in override['source_code']
+    assert not override.get('alias_qualnames')
+
+
+def test_methods_of_different_names_are_not_merged():
+    docs, _ = deduplicate(_analyze({'src/requests/models.py': MODELS}))
+
+    assert {'Response.__bool__', 'Response.__nonzero__'} <= _qualnames(docs)
+
+
+def test_vendored_copy_is_merged_into_the_canonical_definition():
+    docs, counts = deduplicate(_analyze({
+        'src/requests/adapters.py': ADAPTERS,
+        'src/requests/_vendor/adapters.py': ADAPTERS,
+    }))
+
+    assert counts['exact'] == 4
+    send = next(doc for doc in docs if doc['qualname'] == 'HTTPAdapter.send')
+    assert send['file'] == 'src/requests/adapters.py'
+    assert [alias['file'] for alias in send['aliases']] == ['src/requests/_vendor/adapters.py']
@@ -0,0 +1,75 @@
+"""Check that the quantized ONNX encoder can query collections built with the PyTorch one, and vice versa."""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("optimum")
+
+from mcp_pack.encoders import PROBE_MIN_SIMILARITY, load_encoder  # noqa: E402
+
+MODEL = "all-MiniLM-L6-v2"
+
+# Docstring headers of unrelated functions, as create_db embeds them
+CORPUS = [
+    "odict: An ordered dictionary that can be indexed by key or by position.",
+    "loadobj: Load a pickled object from a file, decompressing it if needed.",
+    "saveobj: Save an object to a compressed pickle file.",
+    "wma: Return the weighted moving average of an array, ignoring NaN values.",
+    "smooth: Smooth a signal with a Gaussian kernel of the given width.",
+    "daterange: Return the list of dates between a start and an end date.",
+    "parallelize: Run a function on many arguments in parallel processes.",
+    "tic: Start a timer; toc prints the time elapsed since tic.",
+    "readcsv: Read a CSV file into a list of rows.",
+    "urlopen: Download the contents of a web page.",
+    "Sim: A simulation of disease transmission in a population of agents.",
+    "plot_result: Plot a simulation result over time with confidence bounds.",
+]
+
+QUERIES = [
+    "ordered dictionary indexed by position",
+    "save an object to disk compressed",
+    "moving average that skips missing values",
+    "run a function in parallel",
+    "how long did my code take",
+    "fetch a web page",
+]
+
+TOP_K = 3
+
+
+@pytest.fixture(scope="module")
+def encoders():
+    try:
+        return load_encoder(MODEL, backend="torch"), load_encoder(MODEL, backend="onnx")
+    except OSError as e:
+        pytest.skip(f"Cannot load {MODEL}: {e}")
+
+
+def _top_k(queries: np.ndarray, corpus: np.ndarray) -> list:
+    """Return the indices of the TOP_K corpus embeddings closest to each query."""
+    scores = queries @ corpus.T
+    return [list(row) for row in np.argsort(-scores, axis=1)[:, :TOP_K]]
+
+
+def test_backends_embed_alike(encoders):
+    torch_encoder, onnx_encoder = encoders
+    torch_vectors = torch_encoder.encode(CORPUS + QUERIES, normalize_embeddings=True)
+    onnx_vectors = onnx_encoder.encode(CORPUS + QUERIES, normalize_embeddings=True)
+
+    similarities = np.sum(torch_vectors * onnx_vectors, axis=1)
+    assert similarities.min() >= PROBE_MIN_SIMILARITY, (
+        f"Least similar text: {(CORPUS + QUERIES)[int(similarities.argmin())]!r} ({similarities.min():.4f})")
+
+
+@pytest.mark.parametrize("build, query", [("torch", "onnx"), ("onnx", "torch")])
+def test_collection_built_with_one_backend_can_be_queried_with_the_other(encoders, build, query):
+    by_backend = dict(zip(("torch", "onnx"), encoders))
+    corpus = by_backend[build].encode(CORPUS, normalize_embeddings=True)
+    same = _top_k(by_backend[build].encode(QUERIES, normalize_embeddings=True), corpus)
+    crossed = _top_k(by_backend[query].encode(QUERIES, normalize_embeddings=True), corpus)
+
+    for text, expected, found in zip(QUERIES, same, crossed):
+        assert found[0] == expected[0], f"{text!r}: top hit {CORPUS[found[0]]!r}, expected {CORPUS[expected[0]]!r}"
+        assert set(found) == set(expected), f"{text!r}: top {TOP_K} differ"
@@ -0,0 +1,44 @@
+"""Check that the CLI starts without importing the heavy dependencies of its subcommands."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+# Modules that only the subcommands needing them may import
+HEAVY_MODULES = ("torch", "sentence_transformers", "nbconvert", "openai")
+
+# Cumulative import time of the mcp_pack CLI, generous enough for slow CI machines
+IMPORT_BUDGET_SECONDS = 0.5
+
+
+def import_times(*args: str) -> dict:
+    """Run the CLI under `python -X importtime` and return the cumulative seconds per imported module."""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(SRC), os.environ.get("PYTHONPATH")]))}
+    result = subprocess.run([sys.executable, "-X", "importtime", "-m", "mcp_pack", *args],
+                            capture_output=True, text=True, env=env, timeout=120)
+    assert result.returncode == 0, result.stderr
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+@pytest.mark.parametrize("args", [("--version",), ("list_db", "--help")])
+def test_cli_startup_skips_heavy_imports(args):
+    times = import_times(*args)
+
+    loaded = [module for module in times if module.split(".")[0] in HEAVY_MODULES]
+    assert not loaded, f"mcp_pack {' '.join(args)} imported {', '.join(sorted(loaded))}"
+
+    startup = max(seconds for module, seconds in times.items() if module.startswith("mcp_pack"))
+    assert startup < IMPORT_BUDGET_SECONDS, f"mcp_pack imports took {startup:.3f}s"
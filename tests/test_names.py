@@ -0,0 +1,27 @@
+"""Check how the server's name index resolves qualification and case variants of names."""
+
+from mcp_pack.names import NameIndex
+
+# Top-level functions, and methods of the same names, as in requests
+NAMES = ['get', 'post', 'Session', 'Session.get', 'Session.post', 'LookupDict', 'LookupDict.get', 'odict', 'ODict']
+
+
+def test_package_qualified_function_resolves_to_top_level_function():
+    assert NameIndex(NAMES).resolve('requests.get')[0] == 'get'
+
+
+def test_package_qualified_method_resolves_to_method():
+    assert NameIndex(NAMES).resolve('requests.Session.get')[0] == 'Session.get'
+
+
+def test_method_name_without_top_level_function_is_ambiguous():
+    names = [name for name in NAMES if name != 'get']
+    resolved, suggestions = NameIndex(names).resolve('requests.get')
+    assert resolved is None
+    assert suggestions == ['LookupDict.get', 'Session.get']
+
+
+def test_case_variants_prefer_exact_case():
+    index = NameIndex(NAMES)
+    assert index.resolve('sciris.ODict')[0] == 'ODict'
+    assert index.resolve('sciris.Odict')[0] is None